@@ -2,14 +2,20 @@ import pygame
 import random
 import sys
 
-# Инициализация Pygame
-pygame.init()
+from merge_fruit.pool import BallPool
+from merge_fruit.timestep import FixedTimestep, interpolate
+
+# Инициализация Pygame: только экран, звук игре не нужен
+pygame.display.init()
 
 # Константы
 WIDTH = 800
 HEIGHT = 600
 BASKET_HEIGHT = 100
 FPS = 60
+# Частота физики не зависит от частоты отрисовки FPS
+PHYSICS_HZ = 60
+MAX_SUBSTEPS = 5
 
 # Цвета
 WHITE = (255, 255, 255)
@@ -26,20 +32,28 @@ pygame.display.set_caption("Merge Fruit")
 clock = pygame.time.Clock()
 
 class Ball:
+    # Без __dict__: радиус и цвет - ссылки на общие BALL_SIZES и COLORS
+    __slots__ = ('x', 'y', 'size_idx', 'radius', 'color', 'prev_x', 'prev_y', 'speed', 'active')
+
     def __init__(self, x, size_idx):
         self.x = x
         self.y = -BALL_SIZES[size_idx]
         self.size_idx = size_idx
         self.radius = BALL_SIZES[size_idx]
         self.color = COLORS[size_idx]
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.speed = 5
         self.active = True
 
-    def update(self, balls):
+    def update(self, balls, k=1.0):
+        # k - доля кадра FPS, которую занимает шаг физики
         if not self.active:
             return
+        self.prev_x = self.x
+        self.prev_y = self.y
         
-        self.y += self.speed
+        self.y += self.speed * k
         
         # Проверка столкновений с другими шариками
         for other in balls:
@@ -57,13 +71,17 @@ class Ball:
             self.y = HEIGHT - BASKET_HEIGHT - self.radius
             self.speed = 0
 
-    def draw(self):
+    def draw(self, alpha=1.0):
         if self.active:
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.radius)
+            pygame.draw.circle(screen, self.color, interpolate(self, alpha), self.radius)
 
 def main():
-    balls = []
+    pool = BallPool(Ball)
+    balls = pool.balls
     dropping_ball = None
+    timestep = FixedTimestep(PHYSICS_HZ, MAX_SUBSTEPS)
+    k = timestep.dt * FPS
+    frame_time = 0.0
     
     while True:
         for event in pygame.event.get():
@@ -73,19 +91,21 @@ def main():
             
             if event.type == pygame.MOUSEBUTTONDOWN and dropping_ball is None:
                 x = pygame.mouse.get_pos()[0]
-                dropping_ball = Ball(x, 0)  # Создаем новый шарик в месте клика
+                dropping_ball = pool.acquire(x, 0)  # Создаем новый шарик в месте клика
 
-        # Обновление
-        if dropping_ball:
-            dropping_ball.update(balls)
-            if dropping_ball.speed == 0:  # Шарик достиг дна
-                balls.append(dropping_ball)
-                dropping_ball = None
-        
-        for ball in balls[:]:
-            ball.update(balls)
-            if not ball.active:
-                balls.remove(ball)
+        # Обновление с фиксированным шагом
+        for _ in range(timestep.advance(frame_time)):
+            if dropping_ball:
+                dropping_ball.update(balls, k)
+                if dropping_ball.speed == 0:  # Шарик достиг дна
+                    pool.add(dropping_ball)
+                    dropping_ball = None
+            
+            for ball in balls:
+                ball.update(balls, k)
+            # Слитые шарики выбрасываем один раз за шаг
+            pool.compact()
+        alpha = timestep.alpha
 
         # Отрисовка
         screen.fill(WHITE)
@@ -95,12 +115,12 @@ def main():
         
         # Рисуем шарики
         for ball in balls:
-            ball.draw()
+            ball.draw(alpha)
         if dropping_ball:
-            dropping_ball.draw()
+            dropping_ball.draw(alpha)
         
         pygame.display.flip()
-        clock.tick(FPS)
+        frame_time = clock.tick(FPS) / 1000.0
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
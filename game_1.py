@@ -3,17 +3,28 @@ import random
 import sys
 import math
 
-# Инициализация Pygame
-pygame.init()
+from merge_fruit.ccd import sweep
+from merge_fruit.ladder import SizeLadder
+from merge_fruit.pool import BallPool
+from merge_fruit.timestep import FixedTimestep, interpolate
+from merge_fruit.trajectory import TrajectoryPredictor
+
+# Инициализация Pygame: только экран, звук игре не нужен
+pygame.display.init()
 
 # Константы
 WIDTH = 800
 HEIGHT = 600
 BASKET_HEIGHT = 100
 FPS = 60
+# Частота физики не зависит от частоты отрисовки FPS
+PHYSICS_HZ = 60
+MAX_SUBSTEPS = 5
 GRAVITY = 0.9
 BOUNCE_FACTOR = 0.4
 FRICTION = 0.99
+# Горизонтальная скорость броска на пиксель движения мыши
+THROW_SCALE = 0.1
 
 # Цвета
 WHITE = (255, 255, 255)
@@ -24,6 +35,10 @@ TRAJECTORY_COLOR = (200, 200, 200, 150)
 # Размеры шариков (от маленького к большому)
 BALL_SIZES = [20, 30, 40, 50, 60]
 COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255)]
+# Суммы радиусов, доли импульса и слияния для каждой пары размеров
+ladder = SizeLadder(BALL_SIZES, COLORS)
+# Скорость, с которой выросший шарик отскакивает от места слияния
+MERGE_FORCE = 5
 
 # Настройка экрана
 screen = pygame.display.set_mode((WIDTH, HEIGHT))
@@ -31,29 +46,49 @@ pygame.display.set_caption("Merge Fruit")
 clock = pygame.time.Clock()
 
 class Ball:
+    # Без __dict__: радиус и цвет - ссылки на общие значения лестницы размеров
+    __slots__ = ('x', 'y', 'prev_x', 'prev_y', 'size_idx', 'radius', 'color',
+                 'speed_y', 'speed_x', 'active', 'on_ground')
+
     def __init__(self, x, size_idx):
         self.x = x
         self.y = -BALL_SIZES[size_idx]
+        self.prev_x = self.x
+        self.prev_y = self.y
         self.size_idx = size_idx
-        self.radius = BALL_SIZES[size_idx]
-        self.color = COLORS[size_idx]
+        self.radius = ladder.radius[size_idx]
+        self.color = ladder.colors[size_idx]
         self.speed_y = 0
         self.speed_x = 0
         self.active = True
         self.on_ground = False
 
-    def update(self, balls):
+    def update(self, balls, k=1.0):
+        # k - доля кадра FPS, которую занимает шаг физики
         if not self.active:
             return
+        self.prev_x = self.x
+        self.prev_y = self.y
         
         # Применяем гравитацию, если шарик не на земле
+        move_y = 0
         if not self.on_ground:
-            self.speed_y += GRAVITY
-            self.y += self.speed_y
+            self.speed_y += GRAVITY * k
+            move_y = self.speed_y * k
+        move_x = self.speed_x * k
+        
+        # Быстрый шарик (смещение за шаг больше радиуса) может проскочить
+        # маленький шарик: останавливаем его в момент первого удара
+        if abs(move_x) > self.radius or abs(move_y) > self.radius:
+            t = sweep(self, move_x, move_y, balls, 0, WIDTH, HEIGHT - BASKET_HEIGHT)
+            move_x *= t
+            move_y *= t
+        
+        self.y += move_y
         
         # Применяем горизонтальное движение
-        self.x += self.speed_x
-        self.speed_x *= FRICTION
+        self.x += move_x
+        self.speed_x *= FRICTION ** k
         
         # Проверка столкновений с границами экрана
         if self.x - self.radius < 0:
@@ -67,48 +102,57 @@ class Ball:
         if self.y + self.radius >= HEIGHT - BASKET_HEIGHT:
             self.y = HEIGHT - BASKET_HEIGHT - self.radius
             self.speed_y *= -BOUNCE_FACTOR
-            self.speed_x *= FRICTION
+            self.speed_x *= FRICTION ** k
             
             # Если скорость очень мала, останавливаем шарик
             if abs(self.speed_y) < 1:
                 self.speed_y = 0
                 self.on_ground = True
         
-        # Проверка столкновений с другими шариками
+        # Проверка столкновений с другими шариками: квадраты расстояний
+        # сравниваются с таблицей, корень - только для касаний
         for other in balls:
-            if other != self and other.active:
-                distance = ((self.x - other.x) ** 2 + (self.y - other.y) ** 2) ** 0.5
-                if distance < self.radius + other.radius:
-                    if self.size_idx == other.size_idx and self.size_idx < len(BALL_SIZES) - 1:
+            if other is not self and other.active:
+                dx = self.x - other.x
+                dy = self.y - other.y
+                distance_sq = dx * dx + dy * dy
+                if distance_sq < ladder.reach_sq[self.size_idx][other.size_idx]:
+                    distance = math.sqrt(distance_sq)
+                    # Единичный вектор от соседа к себе (совпавшие центры - вправо)
+                    if distance:
+                        nx = dx / distance
+                        ny = dy / distance
+                    else:
+                        nx, ny = 1.0, 0.0
+                    if self.size_idx == other.size_idx and ladder.can_merge[self.size_idx]:
                         # Слияние шариков
-                        self.size_idx += 1
-                        self.radius = BALL_SIZES[self.size_idx]
-                        self.color = COLORS[self.size_idx]
+                        self.size_idx = ladder.merge_into[self.size_idx]
+                        self.radius = ladder.radius[self.size_idx]
+                        self.color = ladder.colors[self.size_idx]
                         other.active = False
                         
                         # Добавляем эффект отталкивания при слиянии
-                        angle = math.atan2(self.y - other.y, self.x - other.x)
-                        force = 5
-                        self.speed_x = math.cos(angle) * force
-                        self.speed_y = math.sin(angle) * force
+                        self.speed_x = nx * MERGE_FORCE
+                        self.speed_y = ny * MERGE_FORCE
                         self.on_ground = False
                     else:
                         # Физика столкновения
-                        angle = math.atan2(self.y - other.y, self.x - other.x)
-                        overlap = (self.radius + other.radius) - distance
+                        overlap = ladder.reach[self.size_idx][other.size_idx] - distance
                         
                         # Раздвигаем шарики
-                        self.x += math.cos(angle) * overlap * 0.5
-                        self.y += math.sin(angle) * overlap * 0.5
-                        other.x -= math.cos(angle) * overlap * 0.5
-                        other.y -= math.sin(angle) * overlap * 0.5
+                        self.x += nx * overlap * 0.5
+                        self.y += ny * overlap * 0.5
+                        other.x -= nx * overlap * 0.5
+                        other.y -= ny * overlap * 0.5
                         
-                        # Обмен импульсами
-                        total_mass = self.radius + other.radius
-                        new_speed_x1 = (self.speed_x * (self.radius - other.radius) + 2 * other.radius * other.speed_x) / total_mass
-                        new_speed_y1 = (self.speed_y * (self.radius - other.radius) + 2 * other.radius * other.speed_y) / total_mass
-                        new_speed_x2 = (other.speed_x * (other.radius - self.radius) + 2 * self.radius * self.speed_x) / total_mass
-                        new_speed_y2 = (other.speed_y * (other.radius - self.radius) + 2 * self.radius * self.speed_y) / total_mass
+                        # Обмен импульсами: масса пропорциональна радиусу,
+                        # доля, которую каждый берёт у другого, - из таблицы
+                        take = 2 * ladder.share[self.size_idx][other.size_idx]
+                        give = 2 - take
+                        new_speed_x1 = self.speed_x + take * (other.speed_x - self.speed_x)
+                        new_speed_y1 = self.speed_y + take * (other.speed_y - self.speed_y)
+                        new_speed_x2 = other.speed_x + give * (self.speed_x - other.speed_x)
+                        new_speed_y2 = other.speed_y + give * (self.speed_y - other.speed_y)
                         
                         self.speed_x, self.speed_y = new_speed_x1 * BOUNCE_FACTOR, new_speed_y1 * BOUNCE_FACTOR
                         other.speed_x, other.speed_y = new_speed_x2 * BOUNCE_FACTOR, new_speed_y2 * BOUNCE_FACTOR
@@ -116,42 +160,38 @@ class Ball:
                         self.on_ground = False
                         other.on_ground = False
 
-    def draw(self):
+    def draw(self, alpha=1.0):
         if self.active:
-            pygame.draw.circle(screen, self.color, (int(self.x), int(self.y)), self.radius)
+            pygame.draw.circle(screen, self.color, interpolate(self, alpha), self.radius)
 
-def draw_trajectory(start_pos, end_pos):
-    points = []
-    x0, y0 = start_pos
-    x1, y1 = end_pos
-    
-    # Симуляция траектории
-    speed_y = 0
-    y = y0
-    x = x0
-    points.append((x, y))
-    
-    for _ in range(50):  # 50 шагов симуляции
-        speed_y += GRAVITY
-        y += speed_y
-        points.append((x, y))
-        
-        if y + 20 >= HEIGHT - BASKET_HEIGHT:
-            y = HEIGHT - BASKET_HEIGHT - 20
-            speed_y *= -BOUNCE_FACTOR
+# Дуга полёта пересчитывается, только когда сдвинулась мышь или шарики
+predictor = TrajectoryPredictor(GRAVITY, BOUNCE_FACTOR, FRICTION, 0, WIDTH, HEIGHT - BASKET_HEIGHT)
+
+def draw_trajectory(start_pos, end_pos, balls):
+    # Шарик появится над start_pos с той же скоростью, что даст отпускание кнопки
+    radius = BALL_SIZES[0]
+    speed_x = (end_pos[0] - start_pos[0]) * THROW_SCALE
+    points, hit = predictor.predict(start_pos[0], -radius, speed_x, radius, balls)
     
     # Рисуем траекторию
     if len(points) > 1:
         pygame.draw.lines(screen, TRAJECTORY_COLOR, False, points, 1)
     
-    # Рисуем шарик в конечной позиции
-    pygame.draw.circle(screen, TRAJECTORY_COLOR, (int(x), int(y)), 20)
+    # Рисуем шарик в конечной позиции и шарик, которого он коснётся первым
+    x, y = predictor.end
+    pygame.draw.circle(screen, TRAJECTORY_COLOR, (int(x), int(y)), radius)
+    if hit is not None:
+        pygame.draw.circle(screen, TRAJECTORY_COLOR, (int(hit.x), int(hit.y)), hit.radius, 2)
 
 def main():
-    balls = []
+    pool = BallPool(Ball)
+    balls = pool.balls
     dropping_ball = None
     mouse_pressed = False
     start_pos = None
+    timestep = FixedTimestep(PHYSICS_HZ, MAX_SUBSTEPS)
+    k = timestep.dt * FPS
+    frame_time = 0.0
     
     # Создаем поверхность для прозрачной траектории
     trajectory_surface = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
@@ -169,21 +209,23 @@ def main():
             if event.type == pygame.MOUSEBUTTONUP and event.button == 1 and mouse_pressed and dropping_ball is None:
                 mouse_pressed = False
                 end_pos = pygame.mouse.get_pos()
-                dropping_ball = Ball(start_pos[0], 0)
+                dropping_ball = pool.acquire(start_pos[0], 0)
                 # Добавляем горизонтальную скорость в зависимости от движения мыши
-                dropping_ball.speed_x = (end_pos[0] - start_pos[0]) * 0.1
+                dropping_ball.speed_x = (end_pos[0] - start_pos[0]) * THROW_SCALE
 
-        # Обновление
-        if dropping_ball:
-            dropping_ball.update(balls)
-            if dropping_ball.on_ground:  # Шарик остановился
-                balls.append(dropping_ball)
-                dropping_ball = None
-        
-        for ball in balls[:]:
-            ball.update(balls)
-            if not ball.active:
-                balls.remove(ball)
+        # Обновление с фиксированным шагом
+        for _ in range(timestep.advance(frame_time)):
+            if dropping_ball:
+                dropping_ball.update(balls, k)
+                if dropping_ball.on_ground:  # Шарик остановился
+                    pool.add(dropping_ball)
+                    dropping_ball = None
+            
+            for ball in balls:
+                ball.update(balls, k)
+            # Слитые шарики выбрасываем один раз за шаг
+            pool.compact()
+        alpha = timestep.alpha
 
         # Отрисовка
         screen.fill(WHITE)
@@ -193,17 +235,17 @@ def main():
         
         # Рисуем шарики
         for ball in balls:
-            ball.draw()
+            ball.draw(alpha)
         if dropping_ball:
-            dropping_ball.draw()
+            dropping_ball.draw(alpha)
         
         # Рисуем траекторию при зажатой ЛКМ
         if mouse_pressed and start_pos and dropping_ball is None:
             current_pos = pygame.mouse.get_pos()
-            draw_trajectory(start_pos, current_pos)
+            draw_trajectory(start_pos, current_pos, balls)
         
         pygame.display.flip()
-        clock.tick(FPS)
+        frame_time = clock.tick(FPS) / 1000.0
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,199 +1,94 @@
 import pygame
-import random
+import os
 import sys
-import math
 
-# Инициализация Pygame
-pygame.init()
+from merge_fruit.bot import HORIZON, AutoPlayer, LookaheadBot
+from merge_fruit.fonts import load_font
+from merge_fruit.profiler import FrameProfiler
+from merge_fruit.render import Renderer, draw_profile
+from merge_fruit.render_cache import RenderCache
+from merge_fruit.replay import ReplayRecorder, new_seed
+from merge_fruit.runner import GameLoop, IOQueue
+from merge_fruit.savestate import RollingSnapshots, encode, write_file
+from merge_fruit.scene import HUD_RECTS as BASKET_HUD_RECTS, draw_basket
+from merge_fruit.spectator import SpectatorServer
+from merge_fruit.world import (
+    BASKET_WIDTH, HEIGHT, FPS, BALL_SIZES, COLORS, World,
+)
 
-# Константы
-BASKET_WIDTH = 600
-HEIGHT = 800
-FPS = 60
-GRAVITY = 0.9
-BOUNCE_FACTOR = 0.5
-FRICTION = 0.98
-BASKET_HEIGHT = 400
-BALL_SIZES = [20, 30, 40, 50, 60, 70, 80, 90, 100, 110]
-COLORS = [
-    (255,0,0), (0,255,0), (0,0,255), (255,255,0), (255,0,255),
-    (0,255,255), (128,0,128), (255,165,0), (75,0,130), (139,69,19)
-]
+# Инициализация Pygame: только экран, звук игре не нужен
+pygame.display.init()
 
 # Настройка экрана
 screen = pygame.display.set_mode((BASKET_WIDTH, HEIGHT))
 pygame.display.set_caption("Merge Fruit")
-clock = pygame.time.Clock()
 
-# Корзина
-BASKET_TOP = HEIGHT - BASKET_HEIGHT - 20
-BASKET_RECT = pygame.Rect(0, BASKET_TOP, BASKET_WIDTH, BASKET_HEIGHT)
-UPPER_LIMIT = BASKET_TOP +10  # Верхняя граница
+# Шрифты загружаются при первой надписи
+def font():
+    return load_font(36, bold=True)
 
-# Шрифты
-font = pygame.font.SysFont('Arial', 36, bold=True)
-small_font = pygame.font.SysFont('Arial', 24)
+def small_font():
+    return load_font(24)
 
-# Состояние игры
-score = 0
-game_over = False
-countdown_active = False
-countdown_start = 0
-next_ball_idx = random.randint(0, len(BALL_SIZES)-2)
-balls = []
+# Хранилище шариков: "objects" - объекты Ball, "numpy" - массивы BallStore
+BACKEND = "objects"
+# Частота физики не зависит от частоты отрисовки FPS
+PHYSICS_HZ = 60
+MAX_SUBSTEPS = 5
+# False - перерисовывать весь экран каждый кадр
+DIRTY_RECTS = True
+# Показывать попадания и память кэша отрисовки внизу экрана
+DEBUG_CACHE = False
+# Области HUD, которые меняются каждый кадр: общие с окном зрителя плюс
+# профилировщик и отладка, когда они включены
+HUD_RECTS = list(BASKET_HUD_RECTS)
+DEBUG_RECT = (10, HEIGHT - 30, BASKET_WIDTH - 20, 30)
+# Профилировщик кадра: F2 - показать/скрыть, F3 - выгрузить в PROFILE_FILE.csv/.json
+PROFILE_RECT = (BASKET_WIDTH - 310, HEIGHT - 150, 300, 110)
+PROFILE_FILE = "frame_profile"
+# Записывать повторы каждой игры (зерно + броски) в REPLAY_DIR
+RECORD_REPLAYS = True
+REPLAY_DIR = "replays"
+# Скользящие снимки партии в SAVE_DIR: после падения или выхода посреди игры
+# следующий запуск продолжает её
+ROLLING_SAVES = True
+SAVE_DIR = "saves"
+# Порт для зрителей на 127.0.0.1 (python -m merge_fruit watch); None - без сервера
+SPECTATOR_PORT = None
+# Бросает бот (merge_fruit.bot) раз в секунду; поиск идёт в BOT_WORKERS
+# процессах и начинается сразу после броска, так что кадр его не ждёт
+AUTOPLAY = False
+BOT_WORKERS = max(1, (os.cpu_count() or 1) - 1)
 
-class Ball:
-    def __init__(self, x, size_idx):
-        self.size_idx = size_idx
-        self.radius = BALL_SIZES[size_idx]
-        self.color = COLORS[size_idx]
-        self.x = x
-        self.y = -self.radius
-        self.speed_y = 0
-        self.speed_x = 0
-        self.active = True
-        self.on_ground = False
-        self.added_to_score = False
+# Состояние игры (вся физика живёт в World, здесь только отрисовка)
+world = World(seed=new_seed(), backend=BACKEND)
+saves = RollingSnapshots(SAVE_DIR) if ROLLING_SAVES else None
+resumed = saves is not None and saves.resume(world)
+# Повтор продолженной партии начинался бы с середины, такой не пишем
+recorder = ReplayRecorder(world.seed, PHYSICS_HZ, world.params()) if RECORD_REPLAYS and not resumed else None
+profiler = FrameProfiler()
 
-    def update(self):
-        global score, countdown_active, countdown_start
-        
-        if not self.active:
-            return
+# Ввод, физика и отрисовка - задачи asyncio; запись файлов идёт в фоновой
+# очереди, рассылка зрителям - в сервере, кадр их не ждёт
+game_loop = GameLoop(FPS, PHYSICS_HZ, MAX_SUBSTEPS)
+background = game_loop.add_service(IOQueue())
+spectators = (game_loop.add_service(SpectatorServer(port=SPECTATOR_PORT))
+              if SPECTATOR_PORT is not None else None)
 
-        # Физика движения
-        if not self.on_ground:
-            self.speed_y += GRAVITY
-            self.y += self.speed_y
-        
-        self.x += self.speed_x
-        self.speed_x *= FRICTION
+autoplayer = (AutoPlayer(LookaheadBot(BOT_WORKERS, horizon=HORIZON * PHYSICS_HZ // FPS,
+                                      dt=1 / PHYSICS_HZ), PHYSICS_HZ, PHYSICS_HZ)
+              if AUTOPLAY else None)
 
-        # Коллизии с границами
-        if self.x - self.radius < 0:
-            self.x = self.radius
-            self.speed_x *= -BOUNCE_FACTOR
-        elif self.x + self.radius > BASKET_WIDTH:
-            self.x = BASKET_WIDTH - self.radius
-            self.speed_x *= -BOUNCE_FACTOR
-
-        # Проверка верхней границы
-        if self.y - self.radius < UPPER_LIMIT and not countdown_active:
-            countdown_active = True
-            countdown_start = pygame.time.get_ticks()
-
-        # Коллизия с дном корзины
-        if (BASKET_RECT.left <= self.x <= BASKET_RECT.right 
-            and self.y + self.radius > BASKET_RECT.bottom):
-            self.y = BASKET_RECT.bottom - self.radius
-            self.speed_y *= -BOUNCE_FACTOR
-            self.speed_x *= FRICTION
-            
-            if abs(self.speed_y) < 1:
-                self.speed_y = 0
-                #self.on_ground = True
-        if not self.added_to_score:
-            score += self.size_idx + 1
-            self.added_to_score = True
-        # Улучшенная проверка коллизий с корзиной
-        # Проверка левой стенки
-        if (self.x - self.radius < BASKET_RECT.left 
-            and BASKET_RECT.top <= self.y <= BASKET_RECT.bottom):
-            self.x = BASKET_RECT.left + self.radius
-            self.speed_x *= -BOUNCE_FACTOR
-        
-        # Проверка правой стенки
-        elif (self.x + self.radius > BASKET_RECT.right 
-            and BASKET_RECT.top <= self.y <= BASKET_RECT.bottom):
-            self.x = BASKET_RECT.right - self.radius
-            self.speed_x *= -BOUNCE_FACTOR
-        
-        # Проверка нижней стенки
-        # if (BASKET_RECT.left <= self.x <= BASKET_RECT.right 
-        #     and self.y + self.radius > BASKET_RECT.bottom):
-        #     self.y = BASKET_RECT.bottom - self.radius
-        #     self.speed_y *= -BOUNCE_FACTOR
-        #     self.speed_x *= FRICTION
-            
-        #     if abs(self.speed_y) < 1:
-        #         # Усиленная проверка позиции шарика
-        #         in_basket_x = BASKET_RECT.left + self.radius <= self.x <= BASKET_RECT.right - self.radius
-        #         in_basket_y = BASKET_RECT.top + self.radius <= self.y <= BASKET_RECT.bottom - self.radius
-        #         if not (in_basket_x and in_basket_y):
-        #             return "game_over"
-        #         self.speed_y = 0
-        #         self.on_ground = True
-        
-        # Улучшенная физика столкновений шариков
-        for other in balls:
-            if other != self and other.active:
-                dx = other.x - self.x
-                dy = other.y - self.y
-                distance = math.hypot(dx, dy)
-                
-                if distance < self.radius + other.radius:
-                    if self.size_idx == other.size_idx and self.size_idx < len(BALL_SIZES) - 1:
-                        # Слияние шариков
-                        self.size_idx += 1
-                        self.radius = BALL_SIZES[self.size_idx]
-                        self.color = COLORS[self.size_idx]
-                        score += self.size_idx + 1
-                        self.added_to_score = True
-                        other.active = False
-                        
-                        # Добавляем эффект отталкивания при слиянии
-                        angle = math.atan2(dy, dx)
-                        force = 5
-                        self.speed_x = -math.cos(angle) * force
-                        self.speed_y = -math.sin(angle) * force
-                        self.on_ground = False
-                    else:
-                        # Новый расчет физики столкновений
-                        norm = math.hypot(dx, dy)
-                        nx = dx / norm
-                        ny = dy / norm                        
-                        p = 2 * (self.speed_x * nx + self.speed_y * ny - other.speed_x * nx - other.speed_y * ny) / (self.radius + other.radius)
-                        
-                        self.speed_x = (self.speed_x - p * other.radius * nx) * BOUNCE_FACTOR * FRICTION
-                        self.speed_y = (self.speed_y - p * other.radius * ny) * BOUNCE_FACTOR * GRAVITY
-                        other.speed_x = (other.speed_x + p * self.radius * nx) * BOUNCE_FACTOR * FRICTION 
-                        other.speed_y = (other.speed_y + p * self.radius * ny) * BOUNCE_FACTOR * GRAVITY
-                        
-                        # Корректировка позиций
-                        overlap = (self.radius + other.radius) - distance
-                        self.x -= overlap * nx * FRICTION
-                        self.y -= overlap * ny * GRAVITY
-                        other.x += overlap * nx * FRICTION
-                        other.y += overlap * ny * GRAVITY
-        
-        #При остановке в корзине добавляем в счет
-        # if self.on_ground and not self.added_to_score:
-        #     #global score
-        #     score += self.size_idx + 1
-        #     self.added_to_score = True
-
-        return None
-
-def draw_basket():
-    # Боковые стенки
-    pygame.draw.line(screen, (150, 100, 50), (0, BASKET_TOP), (0, HEIGHT), 5)
-    pygame.draw.line(screen, (150, 100, 50), (BASKET_WIDTH, BASKET_TOP), (BASKET_WIDTH, HEIGHT), 5)
-    
-    # Верхняя пунктирная граница
-    dash_length = 15
-    for x in range(0, BASKET_WIDTH, dash_length*2):
-        pygame.draw.line(screen, (150, 100, 50), 
-                        (x, UPPER_LIMIT), 
-                        (x + dash_length, UPPER_LIMIT), 3)
+# Кэш надписей, оверлея и спрайтов шариков
+cache = RenderCache()
+cache.prerender(BALL_SIZES, COLORS)
 
 def draw_game_over():
     # Затемнение
-    overlay = pygame.Surface((BASKET_WIDTH, HEIGHT), pygame.SRCALPHA)
-    overlay.fill((0, 0, 0, 180))
-    screen.blit(overlay, (0, 0))
+    screen.blit(cache.overlay((BASKET_WIDTH, HEIGHT), (0, 0, 0, 180)), (0, 0))
     
     # Текст
-    text = font.render("Game Over", True, (255, 255, 255))
+    text = cache.text(font(), "Game Over", (255, 255, 255))
     screen.blit(text, (BASKET_WIDTH//2 - text.get_width()//2, HEIGHT//2 - 100))
     
     # Кнопки
@@ -204,9 +99,9 @@ def draw_game_over():
     pygame.draw.rect(screen, (200, 0, 0), quit_btn)
     
     # Текст кнопок
-    screen.blit(font.render("Restart", True, (0,0,0)), 
+    screen.blit(cache.text(font(), "Restart", (0,0,0)), 
                (restart_btn.x + 40, restart_btn.y + 10))
-    screen.blit(font.render("Quit", True, (0,0,0)), 
+    screen.blit(cache.text(font(), "Quit", (0,0,0)), 
                (quit_btn.x + 60, quit_btn.y + 10))
     
     # Обработка кликов
@@ -215,74 +110,175 @@ def draw_game_over():
         if restart_btn.collidepoint(mouse_pos):
             reset_game()
         elif quit_btn.collidepoint(mouse_pos):
-            pygame.quit()
-            sys.exit()
+            game_loop.stop()
+
+def run_io(function, *args):
+    # Пока идёт цикл, файлы пишет фоновая очередь, после него - сразу
+    if background is not None:
+        background.submit(function, *args)
+    else:
+        function(*args)
+
+def save_replay():
+    if recorder is None:
+        return
+    data = recorder.close(world.frame)
+    if data is not None:
+        run_io(write_file, os.path.join(REPLAY_DIR, f"{world.seed}.mfr"), data)
+
+def end_session():
+    # Выход посреди игры запоминаем, законченную игру продолжать нечего
+    if saves is not None:
+        if world.game_over:
+            saves.clear()
+        else:
+            saves.save(world)
 
 def reset_game():
-    global score, game_over, countdown_active, countdown_start, balls, next_ball_idx
-    score = 0
-    game_over = False
-    countdown_active = False
-    countdown_start = 0
-    balls = []
-    next_ball_idx = random.randint(0, len(BALL_SIZES)-2)
+    global recorder
+    save_replay()
+    if saves is not None:
+        # Через ту же очередь, чтобы не обогнать ещё не записанный снимок
+        run_io(saves.clear)
+    world.reset(seed=new_seed())
+    if autoplayer is not None:
+        autoplayer.reset()
+    if RECORD_REPLAYS:
+        recorder = ReplayRecorder(world.seed, PHYSICS_HZ, world.params())
+    renderer.invalidate()
 
 def draw_hud():
-    global game_over
     # Следующий шарик
-    pygame.draw.circle(screen, COLORS[next_ball_idx], (BASKET_WIDTH - 50, 50), 30)
+    cache.draw_circle(screen, COLORS[world.next_ball_idx], (BASKET_WIDTH - 50, 50), 30)
     
     # Счет
-    score_text = font.render(f"Score: {score}", True, (0, 0, 0))
+    score_text = cache.text(font(), f"Score: {world.score}", (0, 0, 0))
     screen.blit(score_text, (20, 20))
     
     # Таймер
-    if countdown_active and not game_over:
-        elapsed = pygame.time.get_ticks() - countdown_start
-        if elapsed >= 3000:
-            game_over = True
-        else:
-            timer = 3 - elapsed // 1000
-            timer_text = font.render(str(timer), True, (255, 0, 0))
-            screen.blit(timer_text, (BASKET_WIDTH//2 - 15, 100))
+    left = world.countdown_left()
+    if left is not None:
+        timer = 3 - int(world.time - world.countdown_start)
+        timer_text = cache.text(font(), str(timer), (255, 0, 0))
+        screen.blit(timer_text, (BASKET_WIDTH//2 - 15, 100))
 
-# Основной цикл
-while True:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            pygame.quit()
-            sys.exit()
-        
-        if event.type == pygame.MOUSEBUTTONUP and not game_over:
-            x, y = event.pos
-            balls.append(Ball(x, next_ball_idx))
-            next_ball_idx = random.randint(0, len(BALL_SIZES)-2)
+def draw_cache_stats():
+    # Отладочный счётчик; сама строка меняется каждый кадр и в кэш не идёт
+    stats = cache.stats()
+    line = (f"cache hits {stats['hit_rate']:.1%}  texts {stats['texts']}  "
+            f"sprites {stats['sprites']}  {stats['bytes'] // 1024} KiB")
+    screen.blit(small_font().render(line, True, (90, 90, 90)), DEBUG_RECT[:2])
 
-    # Обновление
-    if not game_over:
-        for ball in balls:
-            ball.update()
-        
-        # Проверка высоты шариков
-        for ball in balls:
-            if ball.y - ball.radius <= UPPER_LIMIT:
-                break
-        else:
-            countdown_active = False
+def solver_iterations():
+    # Итерации решателя контактов за всю игру (0 при старой схеме)
+    stats = world.solver_stats()
+    return stats['total_iterations'] if stats else 0
 
-    # Отрисовка
-    screen.fill((255, 255, 255))
-    draw_basket()
-    
-    for ball in balls:
-        if ball.active:
-            pygame.draw.circle(screen, ball.color, 
-                              (int(ball.x), int(ball.y)), ball.radius)
-    
-    draw_hud()
-    
-    if game_over:
-        draw_game_over()
+def toggle_profiler():
+    profiler.toggle()
+    if profiler.enabled:
+        profiler.begin()
+        HUD_RECTS.append(PROFILE_RECT)
+    else:
+        HUD_RECTS.remove(PROFILE_RECT)
+    renderer.invalidate()
+
+if DEBUG_CACHE:
+    HUD_RECTS.append(DEBUG_RECT)
+
+renderer = Renderer(screen, draw_basket, DIRTY_RECTS, cache)
 
-    pygame.display.flip()
-    clock.tick(FPS)
\ No newline at end of file
+def quit_game():
+    save_replay()
+    end_session()
+    if autoplayer is not None:
+        autoplayer.bot.close()
+    pygame.quit()
+    sys.exit()
+
+def poll():
+    # Выключенный профилировщик стоит одну проверку на фазу
+    prof = profiler if profiler.enabled else None
+    if prof:
+        prof.resume()
+
+    for event in pygame.event.get():
+        if event.type == pygame.QUIT:
+            return False
+        
+        if event.type == pygame.MOUSEBUTTONUP and not world.game_over:
+            x, y = event.pos
+            if world.drop(x) is not None and recorder is not None:
+                recorder.record(world.frame, x)
+
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F2:
+            toggle_profiler()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            profiler.export_csv(PROFILE_FILE + ".csv")
+            profiler.export_json(PROFILE_FILE + ".json")
+
+    if prof:
+        prof.mark('events')
+
+def update(dt):
+    # Один шаг физики с фиксированным dt
+    prof = profiler if profiler.enabled else None
+    if prof:
+        prof.resume()
+        pairs_tested = world.pairs_tested
+        merges = world.merges
+        iterations = solver_iterations()
+
+    if autoplayer is not None:
+        x = autoplayer.tick(world)
+        if x is not None and world.drop(x) is not None and recorder is not None:
+            recorder.record(world.frame, x)
+    world.step(dt)
+    if saves is not None and saves.due(world):
+        run_io(write_file, saves.next_path(), encode(world))
+    if spectators is not None:
+        spectators.publish(world)
+    if world.game_over:
+        save_replay()
+
+    if prof:
+        prof.mark('update')
+        prof.count('pairs', world.pairs_tested - pairs_tested)
+        prof.count('merges', world.merges - merges)
+        prof.count('iterations', solver_iterations() - iterations)
+
+def draw(alpha):
+    prof = profiler if profiler.enabled else None
+    if prof:
+        prof.resume()
+
+    renderer.draw_balls(world.balls, alpha, HUD_RECTS)
+    
+    draw_hud()
+    if DEBUG_CACHE:
+        draw_cache_stats()
+    
+    if world.game_over:
+        draw_game_over()
+        renderer.invalidate()
+    if prof:
+        draw_profile(screen, small_font(), prof, PROFILE_RECT)
+        prof.mark('draw')
+
+    renderer.present()
+    if prof:
+        prof.mark('flip')
+        # Следующий кадр копит фазы всех задач с этого момента
+        prof.end()
+        prof.begin()
+
+def main():
+    global background
+    # Основной цикл
+    game_loop.run(poll, update, draw)
+    # Очередь дописана и закрыта, дальше пишем сразу
+    background = None
+    quit_game()
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
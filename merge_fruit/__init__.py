@@ -0,0 +1 @@
+# Общий код для вариантов игры Merge Fruit
@@ -0,0 +1,96 @@
+# Общая точка входа: python -m merge_fruit play|bench|sim|watch ...
+# pygame подключается только в play; sim и bench работают без экрана и
+# импортируют нужные модули уже после разбора аргументов.
+import argparse
+import importlib
+import sys
+
+VARIANTS = ('game', 'game_1', 'game_2')
+BENCHMARKS = ('suite', 'broadphase', 'soa', 'sleep', 'soak', 'stack', 'startup', 'pacing',
+              'hosting', 'savestate', 'stream', 'bot', 'balls', 'seek')
+
+
+def play(args):
+    # Корневые скрипты открывают окно при импорте
+    module = importlib.import_module(args.variant)
+    return module.main()
+
+
+def bench(args):
+    module = importlib.import_module(f"merge_fruit.benchmarks.{args.name}")
+    # Одни замеры читают аргументы из sys.argv, другие принимают argv
+    sys.argv = [f"merge_fruit.benchmarks.{args.name}"] + args.args
+    return module.main()
+
+
+def sim(args):
+    if args.replay:
+        from merge_fruit.replay import main as replay_main
+        return replay_main([args.replay] + ([str(args.frame)] if args.frame is not None else []))
+
+    from merge_fruit.batch import make_policy, play as play_game
+    result = play_game(make_policy(args.policy), args.seed, {'backend': args.backend})
+    print(", ".join(f"{name} {value}" for name, value in result.items()))
+    return 0
+
+
+def watch(args):
+    # Зритель партии game_2 (SPECTATOR_PORT): строка раз в every кадров
+    # или окно с корзиной
+    import asyncio
+    from merge_fruit.spectator import watch as watch_game
+
+    def on_frame(decoder):
+        if decoder.frame % args.every == 0 or decoder.game_over:
+            print(f"frame {decoder.frame}, score {decoder.score},"
+                  f" balls {len(decoder.balls)}", flush=True)
+        return not decoder.game_over
+
+    try:
+        if args.window:
+            from merge_fruit.viewer import view
+            asyncio.run(view(args.host, args.port))
+        else:
+            asyncio.run(watch_game(on_frame, args.host, args.port))
+    except ConnectionError as error:
+        print(f"cannot watch {args.host}:{args.port}: {error}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m merge_fruit")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('play', help="open a game window")
+    command.add_argument('variant', nargs='?', default='game_2', choices=VARIANTS)
+    command.set_defaults(run=play)
+
+    command = commands.add_parser('bench', help="run a benchmark from merge_fruit.benchmarks")
+    command.add_argument('name', choices=BENCHMARKS)
+    command.add_argument('args', nargs=argparse.REMAINDER)
+    command.set_defaults(run=bench)
+
+    command = commands.add_parser('sim', help="play one game (or a replay) headless")
+    command.add_argument('--seed', type=int, default=0)
+    command.add_argument('--policy', default='random', help="random, greedy, search or replay:PATH")
+    command.add_argument('--backend', default='objects', choices=('objects', 'numpy'))
+    command.add_argument('--replay', metavar='PATH', help="recompute a .mfr replay instead")
+    command.add_argument('--frame', type=int, help="stop the replay at this step")
+    command.set_defaults(run=sim)
+
+    command = commands.add_parser('watch', help="follow a running game_2 over loopback")
+    command.add_argument('--host', default='127.0.0.1')
+    command.add_argument('--port', type=int, default=8765)
+    command.add_argument('--every', type=int, default=60, help="print every N frames")
+    command.add_argument('--window', action='store_true', help="draw the basket in a window")
+    command.set_defaults(run=watch)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
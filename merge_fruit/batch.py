@@ -0,0 +1,218 @@
+# Пакетный прогон игр game_2 на всех ядрах для подбора баланса: политика
+# бросков, сетка параметров, свои зёрна у каждой игры, потоковая запись в CSV
+# или Parquet.
+#
+# python -m merge_fruit.batch --games 1000 --policy greedy \
+#     --grid '{"bounce_factor": [0.3, 0.5], "ball_sizes": [[20, 30, 40, 50, 60, 70, 80, 90, 100, 110]]}' \
+#     --out results.csv
+import argparse
+import csv
+import itertools
+import json
+import functools
+import os
+import random
+import sys
+import time
+
+from merge_fruit.bot import LookaheadBot
+from merge_fruit.replay import Replay
+from merge_fruit.world import BASKET_WIDTH, World
+
+# Шагов между бросками (игрок ждёт, пока шарик упадёт)
+DROP_INTERVAL = 60
+# Предел длины одной игры, шагов
+MAX_FRAMES = 60 * 60 * 30
+# Сколько игр отдаётся процессу за раз
+SHARD_SIZE = 25
+FIELDS = ['point', 'params', 'policy', 'seed', 'score', 'frames', 'drops', 'merges',
+          'max_chain', 'max_size_idx', 'game_over']
+
+
+# Политики бросков: policy(world, rng) -> x; rng - свой ГСЧ политики,
+# чтобы не сбивать выбор следующего шарика в World
+
+def random_policy(world, rng):
+    radius = world.ball_sizes[world.next_ball_idx]
+    return rng.uniform(radius, BASKET_WIDTH - radius)
+
+
+def greedy_policy(world, rng):
+    # Бросаем над самым высоким шариком того же размера, чтобы слить их
+    size_idx = world.next_ball_idx
+    best = None
+    for ball in world.balls:
+        if ball.active and ball.size_idx == size_idx and (best is None or ball.y < best.y):
+            best = ball
+    if best is not None:
+        return best.x
+    return random_policy(world, rng)
+
+
+@functools.lru_cache(maxsize=None)
+def replay_xs(path):
+    return [x for _, x in Replay.load(path).events]
+
+
+class ReplayPolicy:
+    # Броски берутся по порядку из записанного повтора, затем - случайные
+    def __init__(self, path):
+        self.xs = replay_xs(path)
+        self.drops = 0
+
+    def __call__(self, world, rng):
+        self.drops += 1
+        if self.drops <= len(self.xs):
+            return self.xs[self.drops - 1]
+        return random_policy(world, rng)
+
+
+def make_policy(name):
+    # Новая политика на каждую игру: у повтора есть свой счётчик бросков
+    if name == 'random':
+        return random_policy
+    if name == 'greedy':
+        return greedy_policy
+    if name == 'search':
+        # Игры уже разнесены по процессам, поиск идёт в процессе игры
+        return LookaheadBot()
+    if name.startswith('replay:'):
+        return ReplayPolicy(name[len('replay:'):])
+    raise ValueError(f"unknown policy {name!r}")
+
+
+def play(policy, seed, params):
+    world = World(seed=seed, **params)
+    rng = random.Random(seed ^ 0x5EED)
+    drops = 0
+    # Самая длинная цепочка слияний за один шаг
+    chains = [0]
+    world.on_merge(lambda event: chains.append(event.chain))
+    while not world.game_over and world.frame < MAX_FRAMES:
+        if world.frame % DROP_INTERVAL == 0:
+            world.drop(policy(world, rng))
+            drops += 1
+        world.step()
+    return {
+        'score': world.score,
+        'frames': world.frame,
+        'drops': drops,
+        'merges': world.merges,
+        'max_chain': max(chains),
+        'max_size_idx': world.max_size_idx(),
+        'game_over': world.game_over,
+    }
+
+
+def run_shard(shard):
+    # Выполняется в процессе пула: список игр (точка сетки, параметры, политика, зерно)
+    rows = []
+    for point, params, policy_name, seed in shard:
+        result = play(make_policy(policy_name), seed, params)
+        result.update(point=point, params=json.dumps(params, sort_keys=True),
+                      policy=policy_name, seed=seed)
+        rows.append(result)
+    return rows
+
+
+def expand_grid(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def make_shards(points, policy, games, base_seed, shard_size=SHARD_SIZE):
+    # Зерно зависит только от номера игры, а не от числа процессов
+    tasks = []
+    for point, params in enumerate(points):
+        for game in range(games):
+            seed = base_seed + point * games + game
+            tasks.append((point, params, policy, seed))
+    return [tasks[i:i + shard_size] for i in range(0, len(tasks), shard_size)]
+
+
+class CsvSink:
+    def __init__(self, path):
+        self.file = open(path, 'w', newline='')
+        self.writer = csv.DictWriter(self.file, FIELDS)
+        self.writer.writeheader()
+
+    def write(self, rows):
+        self.writer.writerows(rows)
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ParquetSink:
+    # Нужен pyarrow; каждая пачка результатов - отдельная группа строк
+    def __init__(self, path):
+        import pyarrow
+        import pyarrow.parquet
+
+        self.pyarrow = pyarrow
+        self.writer = None
+        self.path = path
+        self.parquet = pyarrow.parquet
+
+    def write(self, rows):
+        table = self.pyarrow.Table.from_pylist(rows)
+        if self.writer is None:
+            self.writer = self.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_sink(path):
+    if path.endswith('.parquet'):
+        return ParquetSink(path)
+    return CsvSink(path)
+
+
+def run_batch(points, policy, games, out, workers=None, base_seed=0):
+    # Пул процессов импортируется только здесь: python -m merge_fruit sim
+    # берёт из модуля лишь play() и политики и не должен за него платить
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    shards = make_shards(points, policy, games, base_seed)
+    sink = open_sink(out)
+    done = 0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_shard, shard) for shard in shards]
+            for future in as_completed(futures):
+                rows = future.result()
+                sink.write(rows)
+                done += len(rows)
+    finally:
+        sink.close()
+    elapsed = time.perf_counter() - start
+    return done, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m merge_fruit.batch")
+    parser.add_argument('--games', type=int, default=100, help="games per grid point")
+    parser.add_argument('--policy', default='random',
+                        help="random, greedy, search or replay:PATH")
+    parser.add_argument('--grid', default='{}',
+                        help="JSON: World parameter -> list of values")
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='batch_results.csv', help=".csv or .parquet")
+    args = parser.parse_args(argv)
+
+    points = expand_grid(json.loads(args.grid))
+    done, elapsed = run_batch(points, args.policy, args.games, args.out,
+                              args.workers, args.seed)
+    print(f"{done} games in {elapsed:.1f}s ({done / elapsed:.1f} games/s, "
+          f"{args.workers} workers) -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Бенчмарки физики (запускаются как python -m merge_fruit.benchmarks.<имя>)
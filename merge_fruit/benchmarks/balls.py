@@ -0,0 +1,143 @@
+# Память и доступ к полям у 100 тысяч шариков: шарик game_2.py до __slots__
+# (те же поля в __dict__) против нынешнего и шарики game.py и game_1.py.
+# Сцена собирается BallPool.spawn_many и поштучно; чтение - проход по
+# x, y, radius и active всех шариков, запись - сдвиг x, флаг - on_ground.
+# Запуск: python -m merge_fruit.benchmarks.balls [шарики]
+import gc
+import importlib
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from merge_fruit.pool import BallPool
+from merge_fruit.world import LADDER, Ball
+
+BALLS = 100_000
+REPEATS = 3
+
+
+class DictBall:
+    # Шарик game_2.py до __slots__: поля в __dict__ каждого экземпляра
+    def __init__(self, x, size_idx, ladder=LADDER):
+        self.size_idx = size_idx
+        self.radius = ladder.radius[size_idx]
+        self.color = ladder.colors[size_idx]
+        self.x = x
+        self.y = -self.radius
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.speed_y = 0
+        self.speed_x = 0
+        self.active = True
+        self.on_ground = False
+        self.added_to_score = False
+        self.sleeping = False
+        self.still_frames = 0
+        self.anchor_x = self.x
+        self.anchor_y = self.y
+        self.id = 0
+
+
+def script_ball(name):
+    # game.py и game_1.py импортируются с фиктивным SDL-драйвером, как в suite
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    return importlib.import_module(name).Ball
+
+
+def best(func):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def make_rows(count):
+    rng = random.Random(0)
+    # x как у брошенного шарика: плавающая точка, своя у каждого шарика
+    return [(rng.uniform(20, 580), rng.randrange(5)) for _ in range(count)]
+
+
+def per_ball_bytes(factory, rows):
+    gc.collect()
+    tracemalloc.start()
+    pool = BallPool(factory)
+    pool.spawn_many(rows)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(rows)
+
+
+def one_by_one(factory, rows):
+    pool = BallPool(factory)
+    for row in rows:
+        pool.spawn(*row)
+
+
+def read(balls):
+    total = 0.0
+    for ball in balls:
+        if ball.active:
+            total += ball.x + ball.y + ball.radius
+    return total
+
+
+def write(balls):
+    for ball in balls:
+        ball.x += 1.0
+
+
+def flag(balls):
+    return sum(1 for ball in balls if not ball.on_ground)
+
+
+def measure(factory, rows):
+    count = len(rows)
+    memory = per_ball_bytes(factory, rows)
+    bulk = best(lambda: BallPool(factory).spawn_many(rows))
+    single = best(lambda: one_by_one(factory, rows))
+    balls = BallPool(factory).spawn_many(rows)
+    result = {
+        'bytes': memory,
+        'bulk_ms': bulk * 1000,
+        'single_ms': single * 1000,
+        'read_ns': best(lambda: read(balls)) / count * 1e9,
+        'write_ns': best(lambda: write(balls)) / count * 1e9,
+    }
+    if hasattr(balls[0], 'on_ground'):
+        result['flag_ns'] = best(lambda: flag(balls)) / count * 1e9
+    return result
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else BALLS
+    rows = make_rows(count)
+    kinds = [
+        ("game_2 dict", DictBall, rows),
+        ("game_2 slots", Ball, rows),
+        ("game slots", script_ball('game'), rows),
+        ("game_1 slots", script_ball('game_1'), rows),
+    ]
+    print(f"{count} balls")
+    results = {}
+    for name, factory, kind_rows in kinds:
+        result = results[name] = measure(factory, kind_rows)
+        flag_ns = f", on_ground {result['flag_ns']:5.1f} ns" if 'flag_ns' in result else ""
+        print(f"{name:>13}: {result['bytes']:6.1f} B/ball,"
+              f" build {result['bulk_ms']:6.1f} ms bulk / {result['single_ms']:6.1f} ms one by one,"
+              f" read {result['read_ns']:5.1f} ns, write {result['write_ns']:5.1f} ns{flag_ns}")
+    before = results["game_2 dict"]
+    after = results["game_2 slots"]
+    print(f"game_2 Ball: {before['bytes'] / after['bytes']:.2f}x less memory,"
+          f" read {before['read_ns'] / after['read_ns']:.2f}x,"
+          f" write {before['write_ns'] / after['write_ns']:.2f}x faster")
+    return 0 if after['bytes'] < before['bytes'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# Скорость бота с поиском вперёд на типичных корзинах: позиции набираются
+# случайными бросками (копии мира перед каждым броском), затем на каждой
+# считается полный выбор броска - в этом процессе и в пуле процессов.
+# Полный поиск длиннее кадра, поэтому AutoPlayer начинает его сразу после
+# броска; игре остаются снимок и отправка в пул, они и должны укладываться
+# в бюджет кадра. Запуск: python -m merge_fruit.benchmarks.bot [партий] [процессов]
+import os
+import random
+import sys
+import time
+
+from merge_fruit.batch import DROP_INTERVAL
+from merge_fruit.bot import LookaheadBot
+from merge_fruit.world import BASKET_WIDTH, FPS, World
+
+GAMES = 3
+# Бюджет кадра при 60 Гц
+BUDGET_MS = 1000 / FPS
+
+
+def positions(games):
+    # Копии мира перед каждым броском случайных партий
+    worlds = []
+    for seed in range(games):
+        world = World(seed=seed)
+        rng = random.Random(seed)
+        while not world.game_over:
+            if world.frame % DROP_INTERVAL == 0:
+                worlds.append(world.clone())
+                world.drop(rng.uniform(0, BASKET_WIDTH))
+            world.step()
+    return worlds
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+def measure(worlds, workers):
+    # Полное время выбора и время, которое submit() отнимает у игры
+    with LookaheadBot(workers) as bot:
+        # Запуск пула не считаем
+        bot.choose(worlds[0])
+        latencies = []
+        blocking = []
+        for world in worlds:
+            start = time.perf_counter()
+            decision = bot.submit(world, world.frame + DROP_INTERVAL)
+            blocking.append(time.perf_counter() - start)
+            decision.result()
+            latencies.append(time.perf_counter() - start)
+    return latencies, blocking
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    games = int(argv[0]) if argv else GAMES
+    cores = os.cpu_count()
+    workers = int(argv[1]) if len(argv) > 1 else cores
+    worlds = positions(games)
+    balls = [len(world.active_balls()) for world in worlds]
+    print(f"{len(worlds)} positions, {sum(balls) / len(balls):.1f} balls on average"
+          f" (max {max(balls)}), {cores} cores")
+    failed = False
+    for count in sorted({0, workers}):
+        latencies, blocking = measure(worlds, count)
+        name = f"{count} processes" if count else "in-process"
+        print(f"{name:>14}: {len(latencies) / sum(latencies):6.2f} decisions/s,"
+              f" p99 {percentile(latencies, 0.99) * 1000:7.1f} ms"
+              f" (drop interval {DROP_INTERVAL / FPS * 1000:.0f} ms),"
+              f" game thread p99 {percentile(blocking, 0.99) * 1000:6.2f} ms")
+        if count:
+            failed |= percentile(blocking, 0.99) * 1000 > BUDGET_MS
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# Стоимость прохода столкновений за кадр: полный перебор против сетки
+# Запуск: python -m merge_fruit.benchmarks.broadphase
+import math
+import random
+import sys
+import time
+
+from merge_fruit.broadphase import SpatialHash
+from merge_fruit.world import BALL_SIZES
+
+COUNTS = [50, 100, 500, 1000, 2000, 5000]
+# Полный перебор на больших количествах слишком долгий
+BRUTE_LIMIT = 1000
+FRAMES = 5
+
+
+class Body:
+    def __init__(self, x, y, radius):
+        self.x = x
+        self.y = y
+        self.radius = radius
+        self.active = True
+
+
+def make_scene(count, seed=0):
+    # Плотность постоянная: площадь растёт вместе с числом шариков
+    rng = random.Random(seed)
+    side = math.sqrt(count) * 60
+    return [Body(rng.uniform(0, side), rng.uniform(0, side),
+                 BALL_SIZES[rng.randint(0, 3)])
+            for _ in range(count)]
+
+
+def brute_pass(bodies):
+    hits = 0
+    for ball in bodies:
+        for other in bodies:
+            if other is not ball:
+                if math.hypot(other.x - ball.x, other.y - ball.y) < ball.radius + other.radius:
+                    hits += 1
+    return hits
+
+
+def grid_pass(bodies, grid):
+    hits = 0
+    grid.rebuild(bodies)
+    for ball in bodies:
+        for other in grid.nearby(ball.x, ball.y):
+            if other is not ball:
+                if math.hypot(other.x - ball.x, other.y - ball.y) < ball.radius + other.radius:
+                    hits += 1
+    return hits
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        result = func(*args)
+    return (time.perf_counter() - start) / FRAMES * 1000, result
+
+
+def main():
+    # Ячейка как у сетки World
+    grid = SpatialHash(2 * max(BALL_SIZES))
+    print(f"{'balls':>6} {'grid ms':>9} {'us/ball':>8} {'brute ms':>9}")
+    for count in COUNTS:
+        bodies = make_scene(count)
+        grid_ms, grid_hits = measure(grid_pass, bodies, grid)
+        brute = "-"
+        if count <= BRUTE_LIMIT:
+            brute_ms, brute_hits = measure(brute_pass, bodies)
+            # Сетка не должна терять пересечения
+            assert brute_hits == grid_hits, (brute_hits, grid_hits)
+            brute = f"{brute_ms:.2f}"
+        print(f"{count:>6} {grid_ms:>9.2f} {grid_ms * 1000 / count:>8.2f} {brute:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
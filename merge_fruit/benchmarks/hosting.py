@@ -0,0 +1,55 @@
+# Пропускная способность многокорзинного движка: сколько шагов корзин в секунду
+# делает одно ядро. Корзины играют сами (случайный бросок раз в секунду,
+# после конца игры - новая партия), сначала один шард в этом процессе с общей
+# сеткой и со своей у каждой корзины, затем шарды по процессам.
+# Запуск: python -m merge_fruit.benchmarks.hosting [корзин на процесс] [шагов]
+import os
+import sys
+import time
+
+from merge_fruit.hosting import Shard, ShardedEngine
+
+BASKETS = 32
+FRAMES = 600
+# Шагов за одну команду шарду: обмен по трубе не на каждый шаг
+CHUNK = 60
+
+
+def run_shard(baskets, frames, share_grid):
+    shard = Shard(0, baskets, seed=1, bots=True, share_grid=share_grid)
+    start = time.perf_counter()
+    for _ in range(0, frames, CHUNK):
+        shard.step(CHUNK)
+    return shard.steps / (time.perf_counter() - start)
+
+
+def run_engine(baskets, frames, workers):
+    with ShardedEngine(baskets * workers, workers, seed=1, bots=True) as engine:
+        # Первый шаг ждёт запуска процессов, его не считаем
+        engine.step()
+        start = time.perf_counter()
+        for _ in range(0, frames, CHUNK):
+            engine.step(CHUNK)
+        elapsed = time.perf_counter() - start
+        steps = sum(stats['steps'] for stats in engine.close())
+    return steps / elapsed
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    baskets = int(argv[0]) if argv else BASKETS
+    frames = int(argv[1]) if len(argv) > 1 else FRAMES
+    cores = os.cpu_count()
+    print(f"{baskets} baskets per shard, {frames} steps, {cores} cores")
+    for name, share_grid in (("own grids", False), ("shared grid", True)):
+        rate = run_shard(baskets, frames, share_grid)
+        print(f"{'in-process, ' + name:>26}: {rate:8.0f} basket steps/s")
+    for workers in sorted({1, cores}):
+        rate = run_engine(baskets, frames, workers)
+        print(f"{f'{workers} shard processes':>26}: {rate:8.0f} basket steps/s,"
+              f" {rate / min(workers, cores):8.0f} per core")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
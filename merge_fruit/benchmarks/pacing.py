@@ -0,0 +1,111 @@
+# Ровность кадра у цикла на asyncio под нагрузкой ввода-вывода: та же партия
+# без фоновой работы и с зрителями по локальной петле и записью снимков раз
+# в полсекунды. Отрисовки нет, кадр - это срок планировщика.
+# Запуск: python -m merge_fruit.benchmarks.pacing [секунды] [зрители]
+import asyncio
+import random
+import sys
+
+from merge_fruit.runner import GameLoop, IOQueue
+from merge_fruit.savestate import encode, write_file
+from merge_fruit.spectator import SpectatorServer
+from merge_fruit.world import BASKET_WIDTH, FPS, World
+
+SECONDS = 5
+SPECTATORS = 8
+DROP_EVERY = 20
+SAVE_EVERY = 30
+SAVE_PATH = 'saves/pacing.mfs'
+# Под нагрузкой p99 интервала кадра хуже, чем без неё, не больше чем на столько
+JITTER_LIMIT_MS = 2.0
+# И средний интервал не дальше этого от периода кадра
+DRIFT_LIMIT_MS = 0.1
+
+
+async def spectator(port, received):
+    # Читает поток целиком, не разбирая: нагрузка на сокеты, а не на json
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        while True:
+            data = await reader.read(1 << 16)
+            if not data:
+                break
+            received[0] += len(data)
+    except (asyncio.CancelledError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def run(seconds, spectators, io):
+    world = World(seed=1)
+    rng = random.Random(1)
+    loop = GameLoop(FPS, FPS)
+    background = loop.add_service(IOQueue()) if io else None
+    server = loop.add_service(SpectatorServer(port=0)) if io else None
+    received = [0]
+    clients = []
+
+    def poll():
+        if loop.render_pacer.frames >= seconds * FPS:
+            return False
+        if not clients and server is not None:
+            clients.extend(asyncio.ensure_future(spectator(server.port, received))
+                           for _ in range(spectators))
+        if world.frame % DROP_EVERY == 0:
+            radius = world.ball_sizes[world.next_ball_idx]
+            world.drop(rng.uniform(radius, BASKET_WIDTH - radius))
+
+    def step(dt):
+        world.step(dt)
+        world.countdown_active = False
+        if background is not None:
+            if world.frame % SAVE_EVERY == 0:
+                background.submit(write_file, SAVE_PATH, encode(world))
+            server.publish(world)
+
+    def draw(alpha):
+        pass
+
+    async def main():
+        try:
+            await loop.run_async(poll, step, draw)
+        finally:
+            for client in clients:
+                client.cancel()
+            await asyncio.gather(*clients, return_exceptions=True)
+
+    asyncio.run(main())
+    stats = loop.stats()['render']
+    stats['balls'] = len(world.active_balls())
+    stats['received'] = received[0]
+    stats['writes'] = background.done if background is not None else 0
+    stats['dropped'] = server.dropped if server is not None else 0
+    return stats
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    seconds = float(argv[0]) if argv else SECONDS
+    spectators = int(argv[1]) if len(argv) > 1 else SPECTATORS
+    period = 1000 / FPS
+    failed = False
+    idle = None
+    for name, io in (("idle", False), (f"{spectators} spectators + saves", True)):
+        stats = run(seconds, spectators, io)
+        print(f"{name:>24}: mean {stats['mean_ms']:.2f} ms, p99 {stats['p99_ms']:.2f} ms,"
+              f" max {stats['max_ms']:.2f} ms, overruns {stats['overruns']},"
+              f" {stats['balls']} balls")
+        if io:
+            print(f"{'':>24}  {stats['received'] // 1024} KiB streamed,"
+                  f" {stats['writes']} snapshots written, {stats['dropped']} frames dropped")
+            # Сравниваем с простоем: сон в системе и сам по себе неровный
+            failed |= (stats['p99_ms'] > idle['p99_ms'] + JITTER_LIMIT_MS
+                       or abs(stats['mean_ms'] - period) > DRIFT_LIMIT_MS)
+        else:
+            idle = stats
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
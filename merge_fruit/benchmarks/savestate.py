@@ -0,0 +1,55 @@
+# Сохранение и загрузка стрессового состояния со 100 тысячами шариков
+# для обоих хранилищ.
+# Запуск: python -m merge_fruit.benchmarks.savestate [шарики]
+import os
+import random
+import sys
+import tempfile
+import time
+
+from merge_fruit import savestate
+from merge_fruit.world import BASKET_BOTTOM, BASKET_WIDTH, World
+
+BALLS = 100_000
+REPEATS = 3
+
+
+def make_world(backend, count):
+    rng = random.Random(0)
+    world = World(seed=0, backend=backend)
+    rows = []
+    for _ in range(count):
+        x = rng.uniform(20, BASKET_WIDTH - 20)
+        size_idx = rng.randrange(5)
+        rows.append((x, rng.uniform(0, BASKET_BOTTOM), size_idx))
+    world.place_many(rows)
+    return world
+
+
+def best(func):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    count = int(argv[0]) if argv else BALLS
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'stress.mfs')
+        for backend in ("objects", "numpy"):
+            world = make_world(backend, count)
+            target = World(backend=backend)
+            save_ms = best(lambda: savestate.save(world, path))
+            load_ms = best(lambda: savestate.load(target, path))
+            size = os.path.getsize(path) / 2 ** 20
+            print(f"{backend:>7}: {count} balls, {size:.1f} MiB, "
+                  f"save {save_ms:.1f} ms, load {load_ms:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
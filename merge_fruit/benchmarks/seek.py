@@ -0,0 +1,70 @@
+# Перемотка повтора и копии мира должны играть так же, как партия подряд:
+# от этого зависят seek() проигрывателя и просчёт бросков бота.
+# Запуск: python -m merge_fruit.benchmarks.seek, код 1 при расхождении
+import random
+import sys
+import time
+
+from merge_fruit.replay import Replay, ReplayPlayer
+
+SEEDS = (1, 2, 3, 4)
+FRAMES = 6000
+# Шагов между бросками: при редких бросках корзина успевает уснуть
+DROP_EVERY = (45, 90, 150)
+SNAPSHOT_EVERY = 60
+# Сколько шагов копия и оригинал идут рядом без бросков
+CLONE_STEPS = 60
+
+
+def make_replay(seed, every):
+    rng = random.Random(seed)
+    events = [(frame, rng.uniform(30, 570)) for frame in range(5, FRAMES, every)]
+    return Replay(seed, 60, events, FRAMES)
+
+
+def fingerprint(world):
+    return (world.score, world.frame, world.game_over,
+            [(ball.id, ball.x, ball.y, ball.speed_x, ball.speed_y, ball.sleeping)
+             for ball in world.balls if ball.active])
+
+
+def check_seek(replay):
+    # Доигрываем партию с каждого снимка и сравниваем с игрой подряд
+    player = ReplayPlayer(replay, snapshot_every=SNAPSHOT_EVERY)
+    expected = fingerprint(player.run())
+    diverged = 0
+    for frame in sorted(player.snapshots)[1:]:
+        player.seek(frame)
+        diverged += fingerprint(player.run()) != expected
+    return player.world.score, diverged, len(player.snapshots) - 1
+
+
+def check_clone(replay, frame):
+    world = ReplayPlayer(replay).run(frame)
+    copy = world.clone()
+    for _ in range(CLONE_STEPS):
+        world.step()
+        copy.step()
+    return fingerprint(world) != fingerprint(copy)
+
+
+def main():
+    start = time.perf_counter()
+    failed = 0
+    for seed in SEEDS:
+        for every in DROP_EVERY:
+            score, diverged, seeks = check_seek(make_replay(seed, every))
+            print(f"seed {seed}, drop every {every}: score {score},"
+                  f" {diverged} of {seeks} seeks diverged")
+            failed += diverged
+    clones = 0
+    for seed in range(1, 35):
+        clones += check_clone(make_replay(seed, DROP_EVERY[-1]), 300 + seed * 37)
+    print(f"clones: {clones} of 34 diverged")
+    failed += clones
+    print(f"{time.perf_counter() - start:.1f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
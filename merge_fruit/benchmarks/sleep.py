@@ -0,0 +1,60 @@
+# Сколько шариков обновляется за шаг в почти спокойной корзине: со сном и без.
+# Запуск: python -m merge_fruit.benchmarks.sleep
+import random
+import sys
+import time
+
+import merge_fruit.world as world_module
+from merge_fruit.world import World
+
+FILL_DROPS = 30
+DROPS = 30
+# Шагов между бросками после заполнения корзины
+QUIET_STEPS = 240
+
+
+def step(world):
+    # Переполненная корзина здесь не должна заканчивать игру
+    world.step()
+    world.countdown_active = False
+
+
+def run(sleep_frames):
+    world_module.SLEEP_FRAMES = sleep_frames
+    rng = random.Random(7)
+    world = World(seed=7)
+    for _ in range(FILL_DROPS):
+        world.drop(rng.uniform(40, 560))
+        for _ in range(60):
+            step(world)
+
+    updates = 0
+    steps = 0
+    elapsed = 0.0
+    for _ in range(DROPS):
+        world.drop(rng.uniform(40, 560), 0)
+        for _ in range(QUIET_STEPS):
+            # Подсчёт бодрствующих в замер не входит
+            start = time.perf_counter()
+            step(world)
+            elapsed += time.perf_counter() - start
+            updates += len(world.awake)
+            steps += 1
+    return elapsed / steps * 1000, updates / steps, len(world.balls)
+
+
+def main():
+    default = world_module.SLEEP_FRAMES
+    try:
+        awake_ms, awake_updates, balls = run(10 ** 9)
+        sleep_ms, sleep_updates, _ = run(default)
+    finally:
+        world_module.SLEEP_FRAMES = default
+    print(f"balls {balls}")
+    print(f"without sleep: {awake_ms:.3f} ms/step, {awake_updates:.1f} updates/step")
+    print(f"with sleep:    {sleep_ms:.3f} ms/step, {sleep_updates:.1f} updates/step")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# Шаг физики: объекты Ball против массивов BallStore на 1k и 10k шариков.
+# Касания у путей решаются по-разному, поэтому у объектов две строки: решатель
+# контактов (по умолчанию в World) и старое попарное отталкивание в Ball.update
+# (solver_iterations=0), ближайшее к пакетному расчёту BallStore (одна
+# поправка на пару за шаг, по Якоби). Ускорение numpy считается от второй.
+# Запуск: python -m merge_fruit.benchmarks.soa
+import random
+import sys
+import time
+
+from merge_fruit.solver import SOLVER_ITERATIONS
+from merge_fruit.world import BALL_SIZES, BASKET_BOTTOM, BASKET_WIDTH, World
+
+COUNTS = [1000, 10000]
+STEPS = 10
+
+
+# Строки таблицы: название, бэкенд World, итерации решателя
+SCHEMES = [
+    ("objects, contact solver", "objects", SOLVER_ITERATIONS),
+    ("objects, pairwise", "objects", 0),
+    ("numpy, batched Jacobi", "numpy", 0),
+]
+
+
+def make_world(backend, count, solver_iterations, seed=0):
+    # Столб шариков без перекрытий, сложенный над дном корзины
+    rng = random.Random(seed)
+    world = World(seed=seed, backend=backend, solver_iterations=solver_iterations)
+    spacing = 2 * BALL_SIZES[3]
+    per_row = BASKET_WIDTH // spacing
+    for i in range(count):
+        ball = world.drop(spacing // 2 + (i % per_row) * spacing, rng.randint(0, 3))
+        ball.y = BASKET_BOTTOM - spacing // 2 - (i // per_row) * spacing
+    return world
+
+
+def measure(world):
+    start = time.perf_counter()
+    for _ in range(STEPS):
+        world.step()
+    return (time.perf_counter() - start) / STEPS * 1000
+
+
+def main():
+    for count in COUNTS:
+        print(f"{count} balls")
+        times = {}
+        for name, backend, iterations in SCHEMES:
+            times[name] = measure(make_world(backend, count, iterations))
+            print(f"{name:>24}: {times[name]:9.2f} ms/step")
+        speedup = times["objects, pairwise"] / times["numpy, batched Jacobi"]
+        print(f"{'numpy vs pairwise':>24}: {speedup:9.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
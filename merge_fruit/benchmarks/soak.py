@@ -0,0 +1,129 @@
+# Долгая сессия без экрана: время кадра и память должны оставаться ровными.
+# Одна бесконечная сессия на вариант: шарики бросаются над шариками того же
+# размера, чтобы шли слияния, корзина не заканчивает игру, а как только живых
+# шариков больше CAP, самый старый убирается. Так через пул всё время идут
+# новые и уходящие шарики. Варианты те же, что в suite: game и game_1 со
+# своими списками шариков в BallPool, game_2 (World) и numpy - game_2 на
+# BallStore.
+# Замер начинается, когда корзина заполнилась. Память - число живых блоков
+# аллокатора (sys.getallocatedblocks) в конце каждой минуты: утечка шариков
+# или их списков растит его, а tracemalloc на весь час замедлил бы сессию
+# в разы.
+# Запуск: python -m merge_fruit.benchmarks.soak [минуты] [варианты...]
+import gc
+import random
+import sys
+import time
+
+from merge_fruit.benchmarks.suite import VARIANTS as SUITE_VARIANTS, WorldVariant
+from merge_fruit.world import FPS
+
+MINUTES = 60
+DROP_EVERY = 90
+# Живых шариков в корзине не больше этого
+CAP = 30
+# Разогрев до CAP шариков, но не дольше этого (слияния могут не пустить)
+WARMUP_MINUTES = 10
+# Допустимый рост от первой половины сессии ко второй
+TIME_TOLERANCE = 1.5
+BLOCK_SLACK = 1000
+
+VARIANTS = dict(SUITE_VARIANTS, numpy=lambda: WorldVariant("numpy"))
+DEFAULT_VARIANTS = ('game', 'game_1', 'game_2')
+
+
+def pick_x(variant, size_idx, rng):
+    # Над шариком того же размера, чтобы он слился, иначе куда придётся
+    for ball in variant.balls:
+        if ball.active and ball.size_idx == size_idx:
+            return ball.x
+    return rng.uniform(30, variant.width - 30)
+
+
+def trim(variant):
+    # Лишние шарики уходят по одному, начиная с первых в списке
+    alive = [ball for ball in variant.balls if ball.active]
+    for ball in alive[:max(0, len(alive) - CAP)]:
+        variant.remove(ball)
+
+
+def free_count(variant):
+    # Сколько мёртвых экземпляров (или ячеек BallStore) ждут повторного использования
+    world = getattr(variant, 'world', None)
+    if world is None:
+        return len(variant.pool.free)
+    if world.store is not None:
+        return len(world.store.free)
+    return len(world.pool.free)
+
+
+class Session:
+    def __init__(self, name):
+        self.variant = VARIANTS[name]()
+        self.rng = random.Random(0)
+        self.frame = 0
+
+    def alive(self):
+        return sum(1 for ball in self.variant.balls if ball.active)
+
+    def step(self):
+        variant = self.variant
+        if self.frame % DROP_EVERY == 0:
+            size_idx = self.rng.randint(0, 3)
+            variant.drop(pick_x(variant, size_idx, self.rng), size_idx)
+            trim(variant)
+        variant.step()
+        self.frame += 1
+
+
+def soak(name, minutes):
+    session = Session(name)
+    variant = session.variant
+    frames_per_minute = FPS * 60
+
+    for _ in range(WARMUP_MINUTES * frames_per_minute):
+        session.step()
+        if session.alive() >= CAP:
+            break
+    print(f"{name} warmed up: {session.frame} frames, {session.alive()} balls")
+
+    rows = []
+    for minute in range(int(minutes)):
+        start = time.perf_counter()
+        longest = 0
+        for _ in range(frames_per_minute):
+            session.step()
+            longest = max(longest, len(variant.balls))
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        rows.append((elapsed / frames_per_minute * 1000, blocks, longest))
+        print(f"{name} minute {minute + 1:>3}: {rows[-1][0]:.4f} ms/frame, "
+              f"{blocks} blocks, list {longest}, free {free_count(variant)}")
+
+    half = len(rows) // 2
+    if half == 0:
+        return True
+    first = rows[:half]
+    second = rows[half:]
+    frame_ratio = (sum(r[0] for r in second) / len(second)) / (sum(r[0] for r in first) / len(first))
+    block_growth = max(r[1] for r in second) - max(r[1] for r in first)
+    print(f"{name}: frame time ratio {frame_ratio:.2f}, live block growth {block_growth}")
+    if frame_ratio > TIME_TOLERANCE or block_growth > BLOCK_SLACK:
+        print(f"FAIL {name}: frame time or memory grows over the session")
+        return False
+    return True
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    minutes = float(argv[0]) if argv else MINUTES
+    names = argv[1:] or DEFAULT_VARIANTS
+    failed = False
+    for name in names:
+        failed |= not soak(name, minutes)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
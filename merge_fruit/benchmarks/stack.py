@@ -0,0 +1,58 @@
+# Стопка из сотен одинаковых шариков: за сколько шагов после последнего броска
+# она засыпает при старом попарном отталкивании и при решателе контактов.
+# Запуск: python -m merge_fruit.benchmarks.stack [шарики]
+import random
+import sys
+import time
+
+from merge_fruit.world import World
+
+BALLS = 240
+# Два размера: шарики старшего не сливаются, так что стопка только растёт
+SIZES = [8, 12]
+DROP_EVERY = 3
+# Решатель обязан уложить стопку не дольше этого
+SETTLE_LIMIT = 600
+ITERATIONS = (0, 4, 8, 16)
+
+
+def run(balls, iterations):
+    rng = random.Random(3)
+    world = World(seed=3, ball_sizes=SIZES, solver_iterations=iterations)
+    for _ in range(balls):
+        world.drop(rng.uniform(20, 580), 1)
+        for _ in range(DROP_EVERY):
+            world.step()
+            world.countdown_active = False
+
+    settled = None
+    start = time.perf_counter()
+    for frame in range(SETTLE_LIMIT * 2):
+        world.step()
+        world.countdown_active = False
+        if world.sleeping_count() == len(world.balls):
+            settled = frame + 1
+            break
+    elapsed = (time.perf_counter() - start) / (frame + 1) * 1000
+    return settled, elapsed, world.solver_stats()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    balls = int(argv[0]) if argv else BALLS
+    failed = False
+    print(f"{balls} balls")
+    for iterations in ITERATIONS:
+        settled, ms, stats = run(balls, iterations)
+        name = f"{iterations} iterations" if iterations else "legacy"
+        line = f"{name:>14}: settled {settled if settled else 'never':>5}, {ms:.3f} ms/step"
+        if stats:
+            line += (f", mean iterations {stats['mean_iterations']:.1f},"
+                     f" penetration {stats['penetration']:.2f}")
+            failed |= settled is None or settled > SETTLE_LIMIT
+        print(line)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
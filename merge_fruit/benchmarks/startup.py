@@ -0,0 +1,56 @@
+# Холодный старт инструментов: сколько занимает импорт всего, что нужно
+# sim и bench, и не подтягивается ли при этом pygame.
+# Запуск: python -m merge_fruit.benchmarks.startup
+import subprocess
+import sys
+import time
+
+# Импорт точки входа и модулей sim в свежем интерпретаторе, миллисекунды
+CHILD = """
+import sys, time
+start = time.perf_counter()
+import merge_fruit.__main__, merge_fruit.batch, merge_fruit.replay, merge_fruit.world
+print((time.perf_counter() - start) * 1000, 'pygame' in sys.modules)
+"""
+COMMANDS = (
+    ['-m', 'merge_fruit', 'sim', '--help'],
+    ['-m', 'merge_fruit', 'bench', '--help'],
+)
+REPEATS = 5
+BUDGET_MS = 100
+
+
+def best_import():
+    best = None
+    pygame_loaded = False
+    for _ in range(REPEATS):
+        out = subprocess.run([sys.executable, '-c', CHILD], capture_output=True,
+                             text=True, check=True).stdout.split()
+        best = float(out[0]) if best is None else min(best, float(out[0]))
+        pygame_loaded |= out[1] == 'True'
+    return best, pygame_loaded
+
+
+def best_process(args):
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, capture_output=True, check=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    import_ms, pygame_loaded = best_import()
+    print(f"import sim modules: {import_ms:.1f} ms, pygame loaded: {pygame_loaded}")
+    for args in COMMANDS:
+        print(f"python {' '.join(args)}: {best_process(args):.1f} ms")
+    if pygame_loaded or import_ms > BUDGET_MS:
+        print(f"FAIL: over {BUDGET_MS} ms or pygame imported")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+# Размер потока для зрителей: записываем партии жадной политики до конца игры
+# (корзина к этому времени забита шариками всех размеров), затем читаем
+# записи и считаем байты на кадр против полного JSON-кадра. Декодер
+# проверяется по ходу записи: шарики совпадают с миром с точностью до кванта.
+# Запуск: python -m merge_fruit.benchmarks.stream [партий] [каталог]
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from merge_fruit.batch import DROP_INTERVAL, greedy_policy
+from merge_fruit.spectator import frame_state
+from merge_fruit.stream import QUANT, StreamDecoder, StreamRecorder, read_stream
+from merge_fruit.world import World
+
+SESSIONS = 3
+MAX_FRAMES = 60 * 60 * 5
+# Полной считаем корзину, в которой не меньше этой доли шариков её максимума
+FULL_SHARE = 0.9
+# Бюджет на кадр полной корзины при 60 Гц
+BUDGET = 1024
+
+
+def record(seed, path):
+    world = World(seed=seed)
+    rng = random.Random(seed)
+    recorder = StreamRecorder(world, path)
+    decoder = StreamDecoder()
+    json_bytes = 0
+    error = 0.0
+    while not world.game_over and world.frame < MAX_FRAMES:
+        if world.frame % DROP_INTERVAL == 0:
+            world.drop(greedy_policy(world, rng))
+        world.step()
+        recorder.record()
+        json_bytes += len(json.dumps(frame_state(world), separators=(',', ':')))
+    recorder.close()
+
+    # Проверка декодера на той же записи: последний кадр против мира
+    for data in read_stream(path):
+        decoder.apply(data)
+    for ball in world.balls:
+        if ball.active:
+            remote = decoder.balls[ball.id]
+            error = max(error, abs(remote.x - ball.x), abs(remote.y - ball.y))
+            assert remote.size_idx == ball.size_idx
+    assert len(decoder.balls) == len(world.active_balls())
+    return world.frame, json_bytes, error
+
+
+def analyse(path):
+    # Байты каждого сообщения и число шариков после него
+    decoder = StreamDecoder()
+    sizes = []
+    counts = []
+    start = time.perf_counter()
+    for data in read_stream(path):
+        decoder.apply(data)
+        sizes.append(len(data))
+        counts.append(len(decoder.balls))
+    decode_ms = (time.perf_counter() - start) / len(sizes) * 1000
+    return sizes, counts, decode_ms
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    sessions = int(argv[0]) if argv else SESSIONS
+    with tempfile.TemporaryDirectory() as temp:
+        directory = argv[1] if len(argv) > 1 else temp
+        os.makedirs(directory, exist_ok=True)
+        failed = False
+        for seed in range(sessions):
+            path = os.path.join(directory, f"session-{seed}.mfd")
+            frames, json_bytes, error = record(seed, path)
+            sizes, counts, decode_ms = analyse(path)
+            full = [size for size, count in zip(sizes, counts)
+                    if count >= FULL_SHARE * max(counts)]
+            mean_full = sum(full) / len(full)
+            print(f"session {seed}: {frames} frames, up to {max(counts)} balls,"
+                  f" {sum(sizes) / len(sizes):.0f} B/frame"
+                  f" (json {json_bytes / frames:.0f} B/frame)")
+            print(f"  full basket: {mean_full:.0f} B/frame, max {max(full)} B,"
+                  f" {mean_full * 60 / 1024:.1f} KiB/s at 60 Hz;"
+                  f" decode {decode_ms:.3f} ms, error {error:.3f} px"
+                  f" (quantum {1 / QUANT} px)")
+            failed |= mean_full > BUDGET or error > 0.5 / QUANT + 1e-9
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
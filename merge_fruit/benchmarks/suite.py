@@ -0,0 +1,280 @@
+# Воспроизводимый набор бенчмарков физики game.py, game_1.py и game_2.py.
+# Сценарии с фиксированным зерном, шаги в секунду, чистый прирост живых блоков
+# аллокатора за шаг (sys.getallocatedblocks после минус до, делённое на шаги:
+# выделенное и уже освобождённое за шаг сюда не попадает) и пик памяти;
+# базовая линия в JSON, сравнение с ней падает на регрессиях.
+#
+# python -m merge_fruit.benchmarks.suite                 - просто замерить
+# python -m merge_fruit.benchmarks.suite --save base.json
+# python -m merge_fruit.benchmarks.suite --compare       - с baseline.json рядом
+# python -m merge_fruit.benchmarks.suite --compare base.json
+import argparse
+import gc
+import importlib
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from merge_fruit.pool import BallPool
+from merge_fruit.world import BASKET_BOTTOM, BASKET_WIDTH, World
+
+SEED = 2024
+# Лучший из нескольких прогонов скорости, чтобы сгладить шум
+REPEATS = 5
+# Допустимое падение скорости и рост пика памяти относительно базовой линии
+TOLERANCE = 0.2
+# Базовая линия в репозитории; скорость в ней снята на одноядерной машине,
+# на другой её стоит пересохранить (--save) до сравнения
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+class ScriptVariant:
+    # game.py и game_1.py: модуль импортируется с фиктивным SDL-драйвером
+    def __init__(self, name):
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        self.module = importlib.import_module(name)
+        self.width = self.module.WIDTH
+        self.floor = self.module.HEIGHT - self.module.BASKET_HEIGHT
+        self.throws = hasattr(self.module.Ball(0, 0), 'speed_x')
+        self.pool = BallPool(self.module.Ball)
+        self.balls = self.pool.balls
+
+    def drop(self, x, size_idx, speed_x=0):
+        ball = self.pool.spawn(x, size_idx)
+        if speed_x:
+            ball.speed_x = speed_x
+        return ball
+
+    def place(self, x, y, size_idx):
+        ball = self.pool.spawn(x, size_idx)
+        ball.y = ball.prev_y = y
+        return ball
+
+    def place_many(self, rows):
+        # Шарики rows (x, y, размер) одним BallPool.spawn_many
+        balls = self.pool.spawn_many([(x, size_idx) for x, _, size_idx in rows])
+        for ball, (_, y, _) in zip(balls, rows):
+            ball.y = ball.prev_y = y
+        return balls
+
+    def remove(self, ball):
+        # Шарик уходит, как поглощённый при слиянии: пул заберёт его в compact()
+        ball.active = False
+
+    def step(self):
+        balls = self.balls
+        for ball in balls:
+            ball.update(balls)
+        self.pool.compact()
+
+
+class WorldVariant:
+    # game_2.py: безголовое ядро World
+    def __init__(self, backend="objects"):
+        self.world = World(seed=SEED, backend=backend)
+        self.width = BASKET_WIDTH
+        self.floor = BASKET_BOTTOM
+        self.throws = True
+        self.balls = self.world.balls
+
+    def drop(self, x, size_idx, speed_x=0):
+        ball = self.world.drop(x, size_idx)
+        if speed_x:
+            ball.speed_x = speed_x
+        return ball
+
+    def place(self, x, y, size_idx):
+        ball = self.world.drop(x, size_idx)
+        ball.y = y
+        return ball
+
+    def place_many(self, rows):
+        return self.world.place_many(rows)
+
+    def remove(self, ball):
+        world = self.world
+        if world.store is not None:
+            world.store.remove(ball.row())
+            return
+        # Спящий шарик держит островок: соседи, лишившись опоры, просыпаются
+        if ball.sleeping:
+            world.wake(ball)
+        ball.active = False
+
+    def step(self):
+        self.world.step()
+        # Полная корзина в бенчмарке не должна заканчивать игру
+        self.world.countdown_active = False
+
+
+VARIANTS = {
+    'game': lambda: ScriptVariant('game'),
+    'game_1': lambda: ScriptVariant('game_1'),
+    'game_2': WorldVariant,
+}
+
+
+# Сценарии: setup(variant, rng) готовит мир вне замера, run(variant, rng) - замер
+
+def drop_stream_run(variant, rng):
+    for step in range(600):
+        if step % 20 == 0:
+            variant.drop(rng.uniform(30, variant.width - 30), rng.randint(0, 3))
+        variant.step()
+    return 600
+
+
+def full_rest_setup(variant, rng):
+    # Заполняем нижнюю часть корзины решёткой шариков и даём им улечься
+    spacing = 100
+    variant.place_many([(spacing // 2 + column * spacing,
+                         variant.floor - spacing // 2 - row * spacing,
+                         rng.randint(0, 3))
+                        for row in range(3)
+                        for column in range(variant.width // spacing)])
+    for _ in range(300):
+        variant.step()
+
+
+def idle_run(variant, rng):
+    for _ in range(300):
+        variant.step()
+    return 300
+
+
+def merge_cascade_setup(variant, rng):
+    # Лесенка размеров 3, 2, 1, 0 на дне: брошенный 0 запускает цепочку слияний
+    x = 0
+    while x + 300 < variant.width:
+        left = x
+        for size_idx, radius in ((3, 50), (2, 40), (1, 30), (0, 20)):
+            left += radius
+            variant.place(left, variant.floor - radius, size_idx)
+            left += radius
+        variant.drop(left - 20, 0)
+        x += 300
+
+
+def throw_run(variant, rng):
+    for step in range(600):
+        if step % 15 == 0:
+            speed_x = rng.choice((-40, 40))
+            variant.drop(variant.width / 2, rng.randint(0, 3), speed_x)
+        variant.step()
+    return 600
+
+
+def nothing(variant, rng):
+    pass
+
+
+SCENARIOS = {
+    'drop_stream': (nothing, drop_stream_run),
+    'full_rest': (full_rest_setup, idle_run),
+    'merge_cascade': (merge_cascade_setup, idle_run),
+    'throw': (nothing, throw_run),
+}
+
+
+def measure(make_variant, scenario):
+    setup, run = SCENARIOS[scenario]
+
+    # Скорость: отдельные прогоны без трассировки памяти
+    elapsed = float('inf')
+    for _ in range(REPEATS):
+        variant = make_variant()
+        rng = random.Random(SEED)
+        setup(variant, rng)
+        start = time.perf_counter()
+        steps = run(variant, rng)
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    # Память: тот же сценарий заново под tracemalloc, без сборщика циклов
+    variant = make_variant()
+    rng = random.Random(SEED)
+    setup(variant, rng)
+    gc.collect()
+    gc.disable()
+    try:
+        tracemalloc.start()
+        blocks = sys.getallocatedblocks()
+        run(variant, rng)
+        net_blocks = sys.getallocatedblocks() - blocks
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        gc.enable()
+
+    return {
+        'steps_per_second': steps / elapsed,
+        'net_blocks_per_step': net_blocks / steps,
+        'peak_kib': peak / 1024,
+    }
+
+
+def run_suite(names):
+    results = {}
+    for name in names:
+        try:
+            make_variant = VARIANTS[name]
+            probe = make_variant()
+        except ImportError as error:
+            print(f"{name}: skipped ({error})")
+            continue
+        for scenario in SCENARIOS:
+            if scenario == 'throw' and not probe.throws:
+                continue
+            key = f"{name}/{scenario}"
+            results[key] = measure(make_variant, scenario)
+            row = results[key]
+            print(f"{key:<24} {row['steps_per_second']:>10.0f} steps/s "
+                  f"{row['net_blocks_per_step']:>8.2f} net blocks/step {row['peak_kib']:>9.1f} KiB peak")
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    failures = []
+    for key, old in baseline.items():
+        new = results.get(key)
+        if new is None:
+            continue
+        if new['steps_per_second'] < old['steps_per_second'] * (1 - tolerance):
+            failures.append(f"{key}: {new['steps_per_second']:.0f} steps/s, "
+                            f"baseline {old['steps_per_second']:.0f}")
+        if new['peak_kib'] > old['peak_kib'] * (1 + tolerance):
+            failures.append(f"{key}: {new['peak_kib']:.1f} KiB peak, "
+                            f"baseline {old['peak_kib']:.1f}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m merge_fruit.benchmarks.suite")
+    parser.add_argument('--variant', action='append', choices=sorted(VARIANTS),
+                        help="only these variants (default: all)")
+    parser.add_argument('--save', metavar='PATH', help="store results as the baseline")
+    parser.add_argument('--compare', metavar='PATH', nargs='?', const=BASELINE,
+                        help="fail on regressions against a baseline (default: the committed one)")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.variant or list(VARIANTS))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        failures = compare(results, baseline, args.tolerance)
+        for failure in failures:
+            print("REGRESSION", failure)
+        if failures:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# Бот для автоматических партий и подбора сложности: выбирает x броска
+# следующего шарика поиском вперёд. Каждый кандидат проигрывается на черновой
+# копии мира (World.snapshot/restore) на HORIZON шагов и оценивается по очкам,
+# запасу высоты до UPPER_LIMIT и тому, успокоилась ли куча. Мир детерминирован,
+# так что копия видит ровно то, что случится в игре, включая следующий шарик.
+#
+# Кандидаты делятся между процессами пула; workers=0 - поиск в этом процессе
+# (так бот работает внутри batch, где игры уже разнесены по процессам).
+import math
+
+from merge_fruit.world import BASKET_WIDTH, FPS, UPPER_LIMIT, World
+
+# Кандидатов по ширине корзины, плюс броски над шариками того же размера
+CANDIDATES = 8
+# Сколько шариков того же размера добавлять в кандидаты (самые высокие)
+MATCHES = 3
+# Шагов вперёд после броска; успокоившийся мир дальше не шагаем
+HORIZON = 150
+# Как часто проверять, что все шарики уснули, и не раньше какого шага
+SETTLE_CHECK = 10
+SETTLE_AFTER = 30
+
+# Веса оценки: очки, слияния, запас высоты в пикселях, шарики, которые ещё
+# движутся к концу горизонта, и отсчёт до конца игры
+SCORE_WEIGHT = 1.0
+MERGE_WEIGHT = 2.0
+MARGIN_WEIGHT = 0.2
+MOVING_WEIGHT = 0.5
+COUNTDOWN_PENALTY = 100.0
+LOSS = -math.inf
+
+
+def settled(world):
+    return not any(ball.active and not ball.sleeping for ball in world.balls)
+
+
+def candidates(world, count=CANDIDATES, matches=MATCHES):
+    # Равномерная сетка по ширине корзины и x самых высоких шариков того же
+    # размера, что и следующий (их можно слить)
+    size_idx = world.next_ball_idx
+    radius = world.ball_sizes[size_idx]
+    span = BASKET_WIDTH - 2 * radius
+    xs = [radius + span * (i + 0.5) / count for i in range(count)]
+    same = sorted((ball.y, ball.x) for ball in world.balls
+                  if ball.active and ball.size_idx == size_idx)
+    xs.extend(x for _, x in same[:matches])
+    return xs
+
+
+def rollout(world, x, horizon=HORIZON, dt=1.0 / FPS):
+    # Оценка броска x из текущего состояния world (world меняется)
+    score = world.score
+    merges = world.merges
+    world.drop(x)
+    for frame in range(horizon):
+        world.step(dt)
+        if world.game_over:
+            return LOSS
+        if frame >= SETTLE_AFTER and frame % SETTLE_CHECK == 0 and settled(world):
+            break
+    moving = sum(1 for ball in world.balls if ball.active and not ball.sleeping)
+    value = ((world.score - score) * SCORE_WEIGHT
+             + (world.merges - merges) * MERGE_WEIGHT
+             + (world.top() - UPPER_LIMIT) * MARGIN_WEIGHT
+             - moving * MOVING_WEIGHT)
+    if world.countdown_active:
+        value -= COUNTDOWN_PENALTY
+    return value
+
+
+def evaluate(world, state, xs, lead=0, horizon=HORIZON, dt=1.0 / FPS):
+    # Оценки бросков xs из снимка state; world - черновик, его состояние
+    # затирается. lead шагов мир идёт без бросков: решение для броска позже
+    world.restore(state)
+    if lead:
+        for _ in range(lead):
+            world.step(dt)
+        state = world.snapshot()
+    values = []
+    for x in xs:
+        world.restore(state)
+        values.append(rollout(world, x, horizon, dt))
+    return values
+
+
+# Черновой мир процесса пула, создаётся при запуске процесса
+scratch = None
+
+
+def start_worker(params):
+    global scratch
+    scratch = World(**params)
+
+
+def evaluate_in_worker(state, xs, lead, horizon, dt):
+    return evaluate(scratch, state, xs, lead, horizon, dt)
+
+
+class Decision:
+    # Выбор броска, который считается в пуле: done() не блокирует, result()
+    # ждёт. frame - шаг мира, для которого выбирали бросок
+    def __init__(self, frame, xs, parts):
+        self.frame = frame
+        self.xs = xs
+        # Части (futures или готовые списки оценок) и номера их кандидатов
+        self.parts = parts
+        self.values = None
+
+    def done(self):
+        return all(not hasattr(part, 'done') or part.done() for part, _ in self.parts)
+
+    def result(self):
+        # x с лучшей оценкой; при равенстве - раньше в списке кандидатов
+        if self.values is None:
+            values = [None] * len(self.xs)
+            for part, indices in self.parts:
+                scores = part.result() if hasattr(part, 'result') else part
+                for i, value in zip(indices, scores):
+                    values[i] = value
+            self.values = values
+        best = max(range(len(self.xs)), key=lambda i: (self.values[i], -i))
+        return self.xs[best]
+
+
+class LookaheadBot:
+    def __init__(self, workers=0, candidates=CANDIDATES, horizon=HORIZON, dt=1.0 / FPS):
+        self.workers = workers
+        self.count = candidates
+        self.horizon = horizon
+        self.dt = dt
+        self.params = None
+        self.pool = None
+        self.scratch = None
+        self.decisions = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __call__(self, world, rng):
+        # Политика batch: policy(world, rng) -> x
+        return self.choose(world)
+
+    def prepare(self, params):
+        # Черновик или пул под настройки мира; другие настройки - новый пул
+        if params == self.params:
+            return
+        self.close()
+        self.params = params
+        if self.workers:
+            # Пул процессов импортируется только здесь, как в batch
+            from concurrent.futures import ProcessPoolExecutor
+
+            self.pool = ProcessPoolExecutor(self.workers, initializer=start_worker,
+                                            initargs=(params,))
+        else:
+            self.scratch = World(**params)
+
+    def submit(self, world, frame=None):
+        # Начать выбор броска для шага frame (по умолчанию - текущего); мир
+        # до него дойдёт без бросков. Сам мир не меняется и не ждёт поиска
+        frame = world.frame if frame is None else frame
+        lead = max(0, frame - world.frame)
+        self.prepare(world.params())
+        xs = candidates(world, self.count)
+        state = world.snapshot()
+        self.decisions += 1
+        if self.pool is None:
+            values = evaluate(self.scratch, state, xs, lead, self.horizon, self.dt)
+            return Decision(frame, xs, [(values, range(len(xs)))])
+        parts = []
+        for worker in range(min(self.workers, len(xs))):
+            indices = range(worker, len(xs), self.workers)
+            future = self.pool.submit(evaluate_in_worker, state, [xs[i] for i in indices],
+                                      lead, self.horizon, self.dt)
+            parts.append((future, indices))
+        return Decision(frame, xs, parts)
+
+    def choose(self, world):
+        return self.submit(world).result()
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        self.pool = None
+        self.scratch = None
+        self.params = None
+
+
+class AutoPlayer:
+    # Бросает за игрока раз в interval шагов. Выбор начинается за lead шагов
+    # до броска, чтобы к нужному шагу он был готов; опоздавший выбор
+    # применяется, как только готов
+    def __init__(self, bot, interval, lead):
+        self.bot = bot
+        self.interval = interval
+        self.lead = lead
+        self.decision = None
+        self.next_drop = None
+
+    def reset(self):
+        self.decision = None
+        self.next_drop = None
+
+    def tick(self, world):
+        # Вызывается перед шагом мира: x броска, когда пора бросать, иначе None
+        if world.game_over:
+            return None
+        if self.next_drop is None:
+            self.next_drop = world.frame + self.lead
+        if self.decision is None:
+            if world.frame >= self.next_drop - self.lead:
+                self.decision = self.bot.submit(world, self.next_drop)
+            return None
+        if world.frame < self.decision.frame or not self.decision.done():
+            return None
+        x = self.decision.result()
+        self.decision = None
+        self.next_drop = world.frame + self.interval
+        return x
@@ -0,0 +1,71 @@
+# Равномерная сетка (spatial hash) для быстрого поиска соседних шариков
+
+
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.keys = {}
+
+    def key(self, x, y):
+        size = self.cell_size
+        return (int(x // size), int(y // size))
+
+    def clear(self):
+        self.cells.clear()
+        self.keys.clear()
+
+    def insert(self, obj):
+        key = self.key(obj.x, obj.y)
+        self.cells.setdefault(key, []).append(obj)
+        self.keys[id(obj)] = key
+
+    def remove(self, obj):
+        key = self.keys.pop(id(obj), None)
+        if key is not None:
+            self.cells[key].remove(obj)
+
+    def update(self, obj):
+        # Перекладываем объект в другую ячейку, только если он её покинул
+        key = self.key(obj.x, obj.y)
+        old = self.keys.get(id(obj))
+        if old == key:
+            return
+        if old is not None:
+            self.cells[old].remove(obj)
+        self.cells.setdefault(key, []).append(obj)
+        self.keys[id(obj)] = key
+
+    def track(self, obj):
+        # Запоминаем ячейку объекта, который попал в сетку через resting
+        self.keys[id(obj)] = self.key(obj.x, obj.y)
+
+    def rebuild(self, objects, resting=None):
+        # Полная пересборка сетки, вызывается один раз за кадр. Списки ячеек
+        # опустошаем, а не выбрасываем: корзина из кадра в кадр занимает одни
+        # и те же ячейки, и корзины с общей сеткой - тоже. resting - готовые
+        # ячейки неподвижных объектов {ключ: список}, они копируются целиком,
+        # без пересчёта ключей (их ячейку потом запоминает track)
+        for cell in self.cells.values():
+            cell.clear()
+        self.keys.clear()
+        for obj in objects:
+            if obj.active:
+                self.insert(obj)
+        if resting:
+            cells = self.cells
+            for key, cell in resting.items():
+                if cell:
+                    cells.setdefault(key, []).extend(cell)
+
+    def nearby(self, x, y):
+        # Объекты из своей и восьми соседних ячеек
+        cx, cy = self.key(x, y)
+        cells = self.cells
+        result = []
+        for i in (cx - 1, cx, cx + 1):
+            for j in (cy - 1, cy, cy + 1):
+                cell = cells.get((i, j))
+                if cell:
+                    result.extend(cell)
+        return result
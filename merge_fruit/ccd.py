@@ -0,0 +1,68 @@
+# Непрерывная проверка столкновений для быстрых шариков: время удара (0..1)
+# движущегося круга о неподвижные круги и о стенки с дном корзины.
+import math
+
+# Насколько шарик заходит в препятствие в момент удара, чтобы обычная
+# проверка перекрытия сразу обработала столкновение
+CCD_SKIN = 0.5
+
+
+def circle_toi(x, y, move_x, move_y, other_x, other_y, reach, overlap=None):
+    # Первый момент t, когда центры окажутся на расстоянии reach, или None.
+    # overlap - ответ для кругов, которые уже перекрываются и сближаются:
+    # шаг физики оставляет их обычной проверке перекрытия (None), иначе
+    # шарик замер бы на месте; предсказателю это касание в самом начале (0.0)
+    px = x - other_x
+    py = y - other_y
+    a = move_x * move_x + move_y * move_y
+    b = 2 * (px * move_x + py * move_y)
+    c = px * px + py * py - reach * reach
+    if b >= 0 or a == 0:
+        # Не сближаются
+        return None
+    if c <= 0:
+        # Уже касаются и продолжают сближаться
+        return overlap
+    disc = b * b - 4 * a * c
+    if disc < 0:
+        return None
+    t = (-b - math.sqrt(disc)) / (2 * a)
+    return t if t <= 1 else None
+
+
+def wall_toi(x, y, move_x, move_y, radius, left, right, floor):
+    # Уже лежащий на дне или прижатый к стенке шарик дальше держат обычные
+    # ограничения по координате, иначе он не смог бы катиться вдоль неё
+    t = 1.0
+    if move_x < 0 and x - radius > left:
+        t = min(t, (left + radius - x) / move_x)
+    elif move_x > 0 and x + radius < right:
+        t = min(t, (right - radius - x) / move_x)
+    if move_y > 0 and y + radius < floor:
+        t = min(t, (floor - radius - y) / move_y)
+    return max(t, 0.0)
+
+
+def sweep(ball, move_x, move_y, others, left, right, floor):
+    # Доля перемещения, которую шарик проходит до первого удара. others
+    # перебираются все подряд (так же, как в проверке столкновений game_1.py);
+    # шарики вне прямоугольника, заметаемого движением, отсекаются сравнениями
+    x = ball.x
+    y = ball.y
+    t = wall_toi(x, y, move_x, move_y, ball.radius, left, right, floor)
+    low_x = min(x, x + move_x) - ball.radius
+    high_x = max(x, x + move_x) + ball.radius
+    low_y = min(y, y + move_y) - ball.radius
+    high_y = max(y, y + move_y) + ball.radius
+    for other in others:
+        if other is ball or not other.active:
+            continue
+        r = other.radius
+        if (other.x + r < low_x or other.x - r > high_x
+                or other.y + r < low_y or other.y - r > high_y):
+            continue
+        hit = circle_toi(x, y, move_x, move_y, other.x, other.y,
+                         ball.radius + other.radius - CCD_SKIN)
+        if hit is not None and hit < t:
+            t = hit
+    return t
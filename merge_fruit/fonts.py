@@ -0,0 +1,15 @@
+# Шрифты по первому требованию: SysFont перебирает системные шрифты, и делать
+# это при импорте скрипта, до первой надписи на экране, незачем.
+import functools
+
+import pygame
+
+FONT_NAME = 'Arial'
+
+
+@functools.lru_cache(maxsize=None)
+def load_font(size, bold=False):
+    # Один объект на размер: RenderCache различает надписи по шрифту
+    if not pygame.font.get_init():
+        pygame.font.init()
+    return pygame.font.SysFont(FONT_NAME, size, bold=bold)
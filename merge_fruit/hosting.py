@@ -0,0 +1,399 @@
+# Много партий game_2 на одной машине, например для сервера турнира. У каждой
+# корзины свой World. Корзины делятся на шарды по процессам: шард шагает все
+# свои корзины по кругу с одной общей сеткой на шард. Снаружи - локальный
+# сокет: броски в корзины и изменения состояния после каждого шага.
+#
+# python -m merge_fruit.hosting --baskets 64 --workers 4 --port 8766
+#
+# Клиент шлёт строки JSON: {"drop": корзина, "x": x} и {"watch": [корзины]}
+# (null - все). Сервер шлёт поток merge_fruit.stream, тот же, что у зрителей
+# game_2: у каждой корзины свой StreamEncoder, сообщение корзины - её номер
+# (BASKET) и сообщение потока, перед записью - длина (LENGTH). Сообщения
+# приходят только от корзин, изменившихся за шаг. Запись с номером ERROR
+# несёт текст ошибки в команде клиента.
+import argparse
+import asyncio
+import json
+import os
+import random
+import struct
+import sys
+
+from merge_fruit.broadphase import SpatialHash
+from merge_fruit.runner import FramePacer
+from merge_fruit.spectator import BACKLOG, HOST, LINE_LIMIT
+from merge_fruit.stream import LENGTH, StreamDecoder, StreamEncoder
+from merge_fruit.world import BALL_SIZES, BASKET_WIDTH, FPS, World
+
+PORT = 8766
+# Корзины без игроков (bots=True) бросают случайно раз в столько шагов
+BOT_DROP_INTERVAL = 60
+# Номер корзины перед сообщением потока
+BASKET = struct.Struct('<H')
+ERROR = 0xFFFF
+
+
+class Basket:
+    def __init__(self, basket_id, world):
+        self.id = basket_id
+        self.world = world
+        self.encoder = StreamEncoder(world)
+        # x бросков, которые применятся перед следующим шагом
+        self.drops = []
+
+
+def awake(world):
+    return any(ball.active and not ball.sleeping for ball in world.balls)
+
+
+class Shard:
+    # Корзины first_id..first_id+count-1 одного процесса
+    def __init__(self, first_id, count, seed=0, params=None, bots=False, share_grid=True):
+        params = dict(params or {})
+        if share_grid:
+            params['grid'] = SpatialHash(2 * max(params.get('ball_sizes', BALL_SIZES)))
+        self.params = params
+        self.seed = seed
+        self.bots = bots
+        self.rng = random.Random(seed ^ first_id)
+        self.baskets = {basket_id: Basket(basket_id, World(seed=seed + basket_id, **params))
+                        for basket_id in range(first_id, first_id + count)}
+        self.frame = 0
+        self.steps = 0
+        # Корзины, которые пошлют полный кадр, даже если не изменились
+        self.keyframes = set()
+
+    def drop(self, basket_id, x):
+        self.baskets[basket_id].drops.append(x)
+
+    def request_keyframe(self, basket_id):
+        # Новый зритель корзины или зритель, потерявший её сообщения
+        self.baskets[basket_id].encoder.request_keyframe()
+        self.keyframes.add(basket_id)
+
+    def play_bot(self, basket):
+        world = basket.world
+        if world.game_over:
+            # Следующая партия той же корзины
+            world.reset(seed=self.rng.getrandbits(63))
+        elif (world.frame + basket.id) % BOT_DROP_INTERVAL == 0:
+            radius = world.ball_sizes[world.next_ball_idx]
+            basket.drops.append(self.rng.uniform(radius, BASKET_WIDTH - radius))
+
+    def step(self, frames=1):
+        # frames шагов всех корзин по кругу; сообщения потока от корзин,
+        # которые за это время изменились
+        changed = self.keyframes
+        self.keyframes = set()
+        for _ in range(frames):
+            for basket in self.baskets.values():
+                world = basket.world
+                if self.bots:
+                    self.play_bot(basket)
+                dropped = bool(basket.drops)
+                for x in basket.drops:
+                    world.drop(x)
+                basket.drops.clear()
+                if world.game_over:
+                    if dropped:
+                        changed.add(basket.id)
+                    continue
+                score = world.score
+                world.step()
+                self.steps += 1
+                if dropped or world.score != score or world.game_over or awake(world):
+                    changed.add(basket.id)
+            self.frame += 1
+        return {basket_id: self.baskets[basket_id].encoder.encode() for basket_id in changed}
+
+    def stats(self):
+        return {'baskets': len(self.baskets), 'frame': self.frame, 'steps': self.steps}
+
+
+def serve_shard(conn, first_id, count, seed, params, bots):
+    # Процесс шарда: команды по трубе, ответ только на step и stop
+    shard = Shard(first_id, count, seed, params, bots)
+    while True:
+        command, *args = conn.recv()
+        if command == 'step':
+            frames, drops, keyframes = args
+            for basket_id, x in drops:
+                shard.drop(basket_id, x)
+            for basket_id in keyframes:
+                shard.request_keyframe(basket_id)
+            conn.send(shard.step(frames))
+        elif command == 'stop':
+            conn.send(shard.stats())
+            break
+    conn.close()
+
+
+class ShardedEngine:
+    # baskets корзин в workers процессах; workers=0 - один шард в этом процессе
+    def __init__(self, baskets, workers=None, seed=0, params=None, bots=False):
+        if workers is None:
+            workers = os.cpu_count()
+        self.baskets = baskets
+        self.per_shard = -(-baskets // max(1, min(workers, baskets)))
+        self.shards = [(first, min(self.per_shard, baskets - first))
+                       for first in range(0, baskets, self.per_shard)]
+        self.drops = [[] for _ in self.shards]
+        self.keyframes = [set() for _ in self.shards]
+        self.local = None
+        self.pipes = []
+        self.processes = []
+        if workers == 0:
+            self.local = Shard(0, baskets, seed, params, bots)
+            return
+        # Процессы нужны только серверу и замерам, не каждому импорту
+        import multiprocessing
+
+        for first, count in self.shards:
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=serve_shard, args=(child, first, count, seed, params, bots), daemon=True)
+            process.start()
+            child.close()
+            self.pipes.append(parent)
+            self.processes.append(process)
+
+    @property
+    def workers(self):
+        return len(self.processes)
+
+    def drop(self, basket_id, x):
+        # Бросок уходит в шард вместе со следующим step()
+        if not 0 <= basket_id < self.baskets:
+            raise ValueError(f"no basket {basket_id}")
+        self.drops[basket_id // self.per_shard].append((basket_id, float(x)))
+
+    def request_keyframe(self, basket_ids=None):
+        # Полные кадры корзин basket_ids (None - всех) со следующим step()
+        if basket_ids is None:
+            basket_ids = range(self.baskets)
+        for basket_id in basket_ids:
+            if 0 <= basket_id < self.baskets:
+                self.keyframes[basket_id // self.per_shard].add(basket_id)
+
+    def step(self, frames=1):
+        # Все шарды шагают одновременно; сообщения изменившихся корзин всех шардов
+        if self.local is not None:
+            for basket_id, x in self.drops[0]:
+                self.local.drop(basket_id, x)
+            for basket_id in self.keyframes[0]:
+                self.local.request_keyframe(basket_id)
+            self.drops[0] = []
+            self.keyframes[0] = set()
+            return self.local.step(frames)
+        for i, pipe in enumerate(self.pipes):
+            pipe.send(('step', frames, self.drops[i], self.keyframes[i]))
+            self.drops[i] = []
+            self.keyframes[i] = set()
+        changed = {}
+        for pipe in self.pipes:
+            changed.update(pipe.recv())
+        return changed
+
+    def close(self):
+        stats = []
+        if self.local is not None:
+            return [self.local.stats()]
+        for pipe, process in zip(self.pipes, self.processes):
+            pipe.send(('stop',))
+            stats.append(pipe.recv())
+            pipe.close()
+            process.join()
+        self.pipes = []
+        self.processes = []
+        return stats
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EngineServer:
+    # Шаги движка с частотой hz и рассылка изменений клиентам по сокету
+    def __init__(self, engine, host=HOST, port=PORT, hz=FPS, backlog=BACKLOG):
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.pacer = FramePacer(hz)
+        self.backlog = backlog
+        self.server = None
+        # Очередь клиента -> корзины, которые он смотрит (None - все)
+        self.clients = {}
+        self.connections = {}
+        # Броски и запросы полных кадров до следующего шага: движок трогает
+        # только поток шага
+        self.pending = []
+        self.keyframes = set()
+        self.running = False
+        self.dropped = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.serve, self.host, self.port,
+                                                 limit=LINE_LIMIT)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve(self, reader, writer):
+        queue = asyncio.Queue(self.backlog)
+        self.clients[queue] = None
+        self.connections[queue] = (writer, asyncio.current_task())
+        self.request_keyframe(None)
+        sender = asyncio.create_task(self.send(queue, writer))
+        try:
+            async for line in reader:
+                try:
+                    self.command(queue, json.loads(line))
+                except (ValueError, KeyError, TypeError) as error:
+                    self.push(queue, record(ERROR, str(error).encode()))
+        except ConnectionError:
+            pass
+        finally:
+            del self.clients[queue]
+            del self.connections[queue]
+            sender.cancel()
+            writer.close()
+
+    def command(self, queue, message):
+        if 'drop' in message:
+            basket_id = int(message['drop'])
+            if not 0 <= basket_id < self.engine.baskets:
+                raise ValueError(f"no basket {basket_id}")
+            self.pending.append((basket_id, float(message['x'])))
+        elif 'watch' in message:
+            watch = message['watch']
+            watch = self.clients[queue] = None if watch is None else {int(i) for i in watch}
+            # Новым зрителям корзин нужен полный кадр
+            self.request_keyframe(watch)
+        else:
+            raise ValueError("expected 'drop' or 'watch'")
+
+    def request_keyframe(self, basket_ids):
+        if basket_ids is None:
+            basket_ids = range(self.engine.baskets)
+        self.keyframes.update(basket_ids)
+
+    def push(self, queue, data):
+        # Медленный клиент шаги не ждёт. Без пропущенных изменений его поток
+        # не сойдётся: очередь выбрасывается целиком, а корзины, которые он
+        # смотрит, следующим шагом шлют полные кадры (как SpectatorServer)
+        if queue.full():
+            while not queue.empty():
+                queue.get_nowait()
+                self.dropped += 1
+            self.request_keyframe(self.clients[queue])
+        queue.put_nowait(data)
+
+    async def send(self, queue, writer):
+        try:
+            while True:
+                writer.write(await queue.get())
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+    def step(self, drops, keyframes):
+        for basket_id, x in drops:
+            self.engine.drop(basket_id, x)
+        self.engine.request_keyframe(keyframes)
+        return self.engine.step()
+
+    async def run(self):
+        # Шаг движка блокирует на трубах шардов, поэтому он в потоке исполнителя
+        loop = asyncio.get_running_loop()
+        self.running = True
+        while self.running:
+            await self.pacer.wait()
+            drops, self.pending = self.pending, []
+            keyframes, self.keyframes = self.keyframes, set()
+            changed = await loop.run_in_executor(None, self.step, drops, keyframes)
+            records = {basket_id: record(basket_id, data) for basket_id, data in changed.items()}
+            for queue, watch in list(self.clients.items()):
+                # Всё, что клиенту досталось за шаг, - одной записью в очередь
+                data = b''.join(data for basket_id, data in records.items()
+                                if watch is None or basket_id in watch)
+                if data:
+                    self.push(queue, data)
+
+    async def close(self):
+        self.running = False
+        self.server.close()
+        # Закрытый сокет завершает чтение у обработчиков клиентов
+        tasks = []
+        for writer, task in self.connections.values():
+            writer.close()
+            tasks.append(task)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+
+def record(basket_id, data):
+    # Запись на проводе: длина, номер корзины, сообщение потока
+    return LENGTH.pack(BASKET.size + len(data)) + BASKET.pack(basket_id) + data
+
+
+async def read_record(reader):
+    # (номер корзины, сообщение) следующей записи или None, если сервер закрылся
+    try:
+        (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+        data = await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+    (basket_id,) = BASKET.unpack_from(data)
+    return basket_id, data[BASKET.size:]
+
+
+class BasketDecoders:
+    # Клиентская сторона: свой StreamDecoder у каждой корзины. apply() -
+    # номер корзины, чьё состояние обновилось, или None
+    def __init__(self, sizes=BALL_SIZES):
+        self.sizes = sizes
+        self.decoders = {}
+        self.errors = []
+
+    def apply(self, basket_id, data):
+        if basket_id == ERROR:
+            self.errors.append(data.decode())
+            return None
+        decoder = self.decoders.get(basket_id)
+        if decoder is None:
+            decoder = self.decoders[basket_id] = StreamDecoder(self.sizes)
+        return basket_id if decoder.apply(data) else None
+
+
+async def host(engine, port, hz):
+    server = EngineServer(engine, port=port, hz=hz)
+    await server.start()
+    print(f"{engine.baskets} baskets in {max(1, engine.workers)} shards"
+          f" on {server.host}:{server.port}", flush=True)
+    try:
+        await server.run()
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m merge_fruit.hosting")
+    parser.add_argument('--baskets', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="shard processes (0 - step in this process)")
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--hz', type=int, default=FPS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--bots', action='store_true', help="baskets drop by themselves")
+    args = parser.parse_args(argv)
+
+    with ShardedEngine(args.baskets, args.workers, args.seed, bots=args.bots) as engine:
+        try:
+            asyncio.run(host(engine, args.port, args.hz))
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
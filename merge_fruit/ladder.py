@@ -0,0 +1,34 @@
+# Лестница размеров: всё, что зависит только от размеров пары шариков,
+# считается один раз при создании мира. Внутренний цикл столкновений берёт
+# готовые числа по индексам размеров, так что длина лестницы и радиусы
+# на его скорость не влияют.
+
+
+class SizeLadder:
+    def __init__(self, sizes, colors, margins=()):
+        # colors короче sizes - цвета идут по кругу
+        n = len(sizes)
+        self.radius = list(sizes)
+        self.colors = [colors[i % len(colors)] for i in range(n)]
+        # Во что превращается пара шариков размера i (None - дальше некуда)
+        self.merge_into = [i + 1 if i < n - 1 else None for i in range(n)]
+        self.can_merge = [i < n - 1 for i in range(n)]
+        # Очки за шарик размера i: за приземление и за слияние в него
+        self.score = [i + 1 for i in range(n)]
+        # Пары (i, j): сумма радиусов, её квадрат и доля импульса, которую
+        # шарик i берёт у шарика j (масса пропорциональна радиусу)
+        self.reach = [[a + b for b in sizes] for a in sizes]
+        self.reach_sq = [[(a + b) ** 2 for b in sizes] for a in sizes]
+        self.share = [[b / (a + b) for b in sizes] for a in sizes]
+        # Таблицы с зазорами строим сразу: в горячем цикле - только поиск
+        self.padded = {}
+        for margin in margins:
+            self.reach_sq_with(margin)
+
+    def reach_sq_with(self, margin):
+        # Квадраты расстояний касания с зазором margin, таблица на каждый зазор
+        table = self.padded.get(margin)
+        if table is None:
+            sizes = self.radius
+            table = self.padded[margin] = [[(a + b + margin) ** 2 for b in sizes] for a in sizes]
+        return table
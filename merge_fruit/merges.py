@@ -0,0 +1,123 @@
+# Стадия слияний: Ball.update только отмечает касания шариков одного размера,
+# а слияния разбираются после обновления всех шариков. Поглощённый шарик
+# указывает на поглотивший (система непересекающихся множеств), так что
+# цепочка 40+40 -> 50, 50+50 -> 60 доигрывается в том же шаге и в порядке,
+# который не зависит от порядка обхода. Каждое слияние один раз начисляет
+# очки и уходит подписчикам: звук, частицы, статистика.
+import math
+from collections import namedtuple
+
+# Скорость, с которой выросший шарик отскакивает от места слияния
+MERGE_FORCE = 5
+
+# chain - номер слияния в цепочке этого шага (1 - обычное слияние);
+# ball_id - выросший шарик, other_id - поглощённый
+MergeEvent = namedtuple('MergeEvent', 'frame x y size_idx chain ball_id other_id')
+
+
+class MergeStage:
+    def __init__(self):
+        # Пары касающихся шариков одного размера за текущий шаг
+        self.candidates = []
+        self.listeners = []
+
+    def subscribe(self, callback):
+        # callback(event) вызывается на каждое слияние
+        self.listeners.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        self.listeners.remove(callback)
+
+    def add(self, ball, other):
+        self.candidates.append((ball, other))
+
+    def emit(self, event):
+        for callback in self.listeners:
+            callback(event)
+
+    def resolve(self, world):
+        edges = self.candidates
+        self.candidates = []
+        if not edges:
+            return
+        ladder = world.ladder
+        reach_sq = ladder.reach_sq
+        order = {id(ball): i for i, ball in enumerate(world.balls)}
+        # Поглощённый шарик -> поглотивший
+        parent = {}
+        chain = {}
+
+        def find(ball):
+            root = ball
+            while id(root) in parent:
+                root = parent[id(root)]
+            # Сжатие путей
+            while ball is not root:
+                parent[id(ball)], ball = root, parent[id(ball)]
+            return root
+
+        while edges:
+            # Раунд: каждый шарик сливается не больше одного раза, поэтому
+            # все пары раунда видят одни и те же размеры
+            edges.sort(key=lambda edge: (order[id(edge[0])], order[id(edge[1])]))
+            used = set()
+            grown = []
+            for ball, other in edges:
+                ball = find(ball)
+                other = find(other)
+                if ball is other or id(ball) in used or id(other) in used:
+                    continue
+                if (not ball.active or not other.active
+                        or ball.size_idx != other.size_idx or not ladder.can_merge[ball.size_idx]):
+                    continue
+                dx = other.x - ball.x
+                dy = other.y - ball.y
+                if dx * dx + dy * dy >= reach_sq[ball.size_idx][other.size_idx]:
+                    continue
+                used.add(id(ball))
+                used.add(id(other))
+                self.merge(world, ball, other, dx, dy)
+                parent[id(other)] = ball
+                chain[id(ball)] = max(chain.get(id(ball), 0), chain.get(id(other), 0)) + 1
+                grown.append(ball)
+                self.emit(MergeEvent(world.frame, ball.x, ball.y, ball.size_idx,
+                                     chain[id(ball)], ball.id, other.id))
+
+            # Выросший шарик мог коснуться шарика нового размера
+            edges = []
+            for ball in grown:
+                world.grid.update(ball)
+                touch_sq = reach_sq[ball.size_idx][ball.size_idx]
+                for other in world.grid.nearby(ball.x, ball.y):
+                    if (other is not ball and other.active
+                            and other.size_idx == ball.size_idx):
+                        dx = other.x - ball.x
+                        dy = other.y - ball.y
+                        if dx * dx + dy * dy < touch_sq:
+                            edges.append((ball, other))
+
+    def merge(self, world, ball, other, dx, dy):
+        # Удар или слияние будит спящие островки обоих шариков
+        if ball.sleeping:
+            world.wake(ball)
+        if other.sleeping:
+            world.wake(other)
+        ladder = world.ladder
+        ball.grow(ladder)
+        world.score += ladder.score[ball.size_idx]
+        world.merges += 1
+        other.active = False
+
+        # Эффект отталкивания при слиянии: от поглощённого шарика по единичному
+        # вектору, без углов; совпавшие центры толкают влево, как atan2(0, 0)
+        distance = math.sqrt(dx * dx + dy * dy)
+        if distance:
+            ball.speed_x = -dx / distance * MERGE_FORCE
+            ball.speed_y = -dy / distance * MERGE_FORCE
+        else:
+            ball.speed_x = -MERGE_FORCE
+            ball.speed_y = 0.0
+        ball.on_ground = False
+        # Шарики, лежавшие на слитом, теряют опору
+        world.wake_near(other.x, other.y, other.radius)
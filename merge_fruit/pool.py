@@ -0,0 +1,64 @@
+# Пул шариков: мёртвые экземпляры уходят в список свободных и переиспользуются,
+# а список живых уплотняется одним проходом раз в кадр.
+import gc
+
+# Сколько мёртвых экземпляров держать про запас
+FREE_LIMIT = 256
+
+
+class BallPool:
+    def __init__(self, factory):
+        self.factory = factory
+        self.balls = []
+        self.free = []
+
+    def acquire(self, *args):
+        # Новый шарик без добавления в список живых
+        if self.free:
+            ball = self.free.pop()
+            ball.__init__(*args)
+            return ball
+        return self.factory(*args)
+
+    def add(self, ball):
+        self.balls.append(ball)
+        return ball
+
+    def spawn(self, *args):
+        return self.add(self.acquire(*args))
+
+    def spawn_many(self, rows):
+        # Много шариков сразу для стрессовых сцен: rows - аргументы конструктора.
+        # Циклов у шариков нет, так что сборщик мусора на это время выключен,
+        # иначе он раз за разом обходит уже созданные
+        acquire = self.acquire
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            balls = [acquire(*row) for row in rows]
+        finally:
+            if collecting:
+                gc.enable()
+        self.balls.extend(balls)
+        return balls
+
+    def release(self, ball):
+        if len(self.free) < FREE_LIMIT:
+            self.free.append(ball)
+
+    def compact(self):
+        # Сдвигаем живые шарики к началу списка на месте, без копии списка
+        balls = self.balls
+        write = 0
+        for ball in balls:
+            if ball.active:
+                balls[write] = ball
+                write += 1
+            else:
+                self.release(ball)
+        del balls[write:]
+
+    def clear(self):
+        for ball in self.balls:
+            self.release(ball)
+        self.balls.clear()
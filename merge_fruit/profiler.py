@@ -0,0 +1,84 @@
+# Профилировщик кадра: время фаз главного цикла и счётчики физики в кольцевом
+# буфере, перцентили для графика на экране и выгрузка в CSV/JSON.
+import csv
+import json
+import time
+
+PHASES = ('events', 'update', 'draw', 'flip')
+COUNTERS = ('pairs', 'merges', 'iterations')
+COLUMNS = PHASES + COUNTERS + ('total',)
+# Сколько последних кадров хранить
+RING_SIZE = 600
+
+
+class FrameProfiler:
+    def __init__(self, size=RING_SIZE):
+        # Выключенный профилировщик главный цикл просто не вызывает
+        self.enabled = False
+        self.size = size
+        self.slots = {name: i for i, name in enumerate(COLUMNS)}
+        self.rows = [None] * size
+        self.index = 0
+        self.filled = 0
+        self.current = [0.0] * len(COLUMNS)
+        self.last = 0.0
+
+    def toggle(self):
+        self.enabled = not self.enabled
+
+    def begin(self):
+        self.current = [0.0] * len(COLUMNS)
+        self.last = time.perf_counter()
+
+    def resume(self):
+        # Фазы идут в разных задачах цикла: отсчёт очередной фазы начинается
+        # с её начала, а не с прошлой отметки
+        self.last = time.perf_counter()
+
+    def mark(self, phase):
+        # Время с предыдущей отметки уходит в фазу phase, миллисекунды
+        now = time.perf_counter()
+        self.current[self.slots[phase]] += (now - self.last) * 1000
+        self.last = now
+
+    def count(self, name, value):
+        self.current[self.slots[name]] += value
+
+    def end(self):
+        row = self.current
+        row[-1] = sum(row[self.slots[phase]] for phase in PHASES)
+        self.rows[self.index] = row
+        self.index = (self.index + 1) % self.size
+        self.filled = min(self.filled + 1, self.size)
+
+    def history(self):
+        # Кадры от старых к новым
+        start = (self.index - self.filled) % self.size
+        return [self.rows[(start + i) % self.size] for i in range(self.filled)]
+
+    def totals(self):
+        return [row[-1] for row in self.history()]
+
+    def percentile(self, p):
+        totals = sorted(self.totals())
+        if not totals:
+            return 0.0
+        rank = min(len(totals) - 1, int(p / 100 * len(totals)))
+        return totals[rank]
+
+    def summary(self):
+        return {f"p{p}": self.percentile(p) for p in (50, 95, 99)}
+
+    def export_csv(self, path):
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(self.history())
+
+    def export_json(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                'columns': COLUMNS,
+                'frames': self.history(),
+                'summary': self.summary(),
+            }, f)
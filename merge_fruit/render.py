@@ -0,0 +1,98 @@
+# Отрисовка с грязными прямоугольниками: статичная корзина рисуется один раз
+# в кэшированный фон, а на экран уходят только области сдвинувшихся шариков.
+import pygame
+
+from merge_fruit.timestep import interpolate
+
+
+class Renderer:
+    def __init__(self, screen, paint_background, dirty_rects=True, cache=None):
+        # paint_background(surface) рисует всё статичное: фон и корзину;
+        # cache (RenderCache) - блитить готовые спрайты вместо draw.circle
+        self.screen = screen
+        self.dirty_rects = dirty_rects
+        self.cache = cache
+        self.background = pygame.Surface(screen.get_size())
+        paint_background(self.background)
+        # Круги, нарисованные в прошлом кадре: (x, y, радиус, цвет)
+        self.circles = set()
+        self.full = True
+        self.full_frame = True
+        self.rects = []
+
+    def invalidate(self):
+        # Следующий кадр будет перерисован целиком (оверлеи, сброс игры)
+        self.full = True
+
+    def draw_balls(self, balls, alpha, hud_rects=()):
+        # Порядок кругов важен там, где шарики перекрываются
+        circles = []
+        for ball in balls:
+            if ball.active:
+                x, y = interpolate(ball, alpha)
+                circles.append((x, y, ball.radius, ball.color))
+
+        self.full_frame = self.full or not self.dirty_rects
+        self.full = False
+        if self.full_frame:
+            self.screen.blit(self.background, (0, 0))
+            for x, y, radius, color in circles:
+                self.draw_circle(color, (x, y), radius)
+            self.circles = set(circles)
+            self.rects = []
+            return
+
+        # Стираем исчезнувшие и рисуем появившиеся круги, плюс области HUD
+        current = set(circles)
+        rects = [pygame.Rect(rect) for rect in hud_rects]
+        for x, y, radius, color in current ^ self.circles:
+            rects.append(pygame.Rect(x - radius - 1, y - radius - 1,
+                                     2 * radius + 2, 2 * radius + 2))
+        # Внутри каждой области перерисовываем фон и все задевающие её шарики,
+        # отсечение не даёт испортить пиксели за её пределами
+        bounds = [pygame.Rect(x - radius, y - radius, 2 * radius, 2 * radius)
+                  for x, y, radius, color in circles]
+        screen = self.screen
+        for rect in rects:
+            screen.set_clip(rect)
+            screen.blit(self.background, rect, rect)
+            for i in rect.collidelistall(bounds):
+                x, y, radius, color = circles[i]
+                self.draw_circle(color, (x, y), radius)
+        screen.set_clip(None)
+        self.circles = current
+        self.rects = rects
+
+    def draw_circle(self, color, center, radius):
+        if self.cache is not None:
+            self.cache.draw_circle(self.screen, color, center, radius)
+        else:
+            pygame.draw.circle(self.screen, color, center, radius)
+
+    def present(self):
+        if self.full_frame or self.full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.rects)
+
+
+# Верх шкалы графика времени кадра и бюджет кадра при 60 FPS, миллисекунды
+PROFILE_SCALE_MS = 33.3
+FRAME_BUDGET_MS = 1000 / 60
+
+
+def draw_profile(screen, font, profiler, rect):
+    # График времени кадра из кольцевого буфера профилировщика и перцентили
+    rect = pygame.Rect(rect)
+    screen.fill((30, 30, 30), rect)
+    graph_height = rect.height - 24
+    bottom = rect.bottom - 1
+    for i, total in enumerate(profiler.totals()[-rect.width:]):
+        height = min(graph_height, int(total / PROFILE_SCALE_MS * graph_height))
+        color = (0, 200, 0) if total <= FRAME_BUDGET_MS else (220, 60, 60)
+        pygame.draw.line(screen, color, (rect.x + i, bottom), (rect.x + i, bottom - height))
+    budget = bottom - int(FRAME_BUDGET_MS / PROFILE_SCALE_MS * graph_height)
+    pygame.draw.line(screen, (200, 200, 200), (rect.x, budget), (rect.right - 1, budget))
+    summary = profiler.summary()
+    line = "  ".join(f"{name} {value:.1f}ms" for name, value in summary.items())
+    screen.blit(font.render(line, True, (255, 255, 255)), (rect.x + 4, rect.y + 2))
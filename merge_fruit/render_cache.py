@@ -0,0 +1,83 @@
+# Кэш отрисовки: LRU готовых надписей, постоянный оверлей и заранее
+# растеризованные спрайты шариков. Попадания и память видны в stats().
+from collections import OrderedDict
+
+import pygame
+
+# Сколько разных надписей держать в кэше
+TEXT_CACHE_SIZE = 64
+
+
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+class RenderCache:
+    def __init__(self, text_limit=TEXT_CACHE_SIZE):
+        self.text_limit = text_limit
+        self.texts = OrderedDict()
+        self.sprites = {}
+        self.overlays = {}
+        self.hits = 0
+        self.misses = 0
+
+    def text(self, font, text, color):
+        key = (font, text, color)
+        surface = self.texts.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.texts.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, True, color)
+        self.texts[key] = surface
+        if len(self.texts) > self.text_limit:
+            self.texts.popitem(last=False)
+        return surface
+
+    def sprite(self, radius, color):
+        # Круг на прозрачной поверхности 2r x 2r, блитится в (x - r, y - r)
+        key = (radius, color)
+        surface = self.sprites.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = pygame.Surface((2 * radius, 2 * radius), pygame.SRCALPHA)
+        pygame.draw.circle(surface, color, (radius, radius), radius)
+        self.sprites[key] = surface
+        return surface
+
+    def prerender(self, sizes, colors):
+        # Спрайты всей лестницы размеров заранее, до первого кадра
+        for radius, color in zip(sizes, colors):
+            self.sprite(radius, color)
+
+    def overlay(self, size, rgba):
+        key = (size, rgba)
+        surface = self.overlays.get(key)
+        if surface is not None:
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = pygame.Surface(size, pygame.SRCALPHA)
+        surface.fill(rgba)
+        self.overlays[key] = surface
+        return surface
+
+    def draw_circle(self, screen, color, center, radius):
+        screen.blit(self.sprite(radius, color), (center[0] - radius, center[1] - radius))
+
+    def stats(self):
+        total = self.hits + self.misses
+        memory = sum(surface_bytes(surface) for surface in self.texts.values())
+        memory += sum(surface_bytes(surface) for surface in self.sprites.values())
+        memory += sum(surface_bytes(surface) for surface in self.overlays.values())
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'texts': len(self.texts),
+            'sprites': len(self.sprites),
+            'bytes': memory,
+        }
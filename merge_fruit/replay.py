@@ -0,0 +1,147 @@
+# Детерминированные повторы: зерно ГСЧ, настройки мира и броски (шаг, x) в компактном
+# бинарном файле, плюс проигрыватель без экрана с перемоткой по снимкам.
+import json
+import os
+import random
+import struct
+
+from merge_fruit.world import FPS, World
+
+MAGIC = b'MFRP'
+# Версия 2: касания решает ContactSolver; версия 3: цепочки слияний
+# доигрываются за один шаг; версия 4: касания по квадратам расстояний из
+# таблиц SizeLadder, толчок слияния без тригонометрии; версия 5: шаг
+# обновляет только бодрствующих, разбуженный шарик начинает двигаться со
+# следующего шага. Старые повторы с новой физикой не сойдутся; версия 6:
+# в заголовке настройки мира
+VERSION = 6
+# magic, версия, частота физики, зерно, число шагов, число бросков, длина
+# настроек мира (World.params() в JSON, сразу за заголовком)
+HEADER = struct.Struct('<4sHHqIIH')
+# Шаг, на котором бросили шарик, и x броска
+EVENT = struct.Struct('<Id')
+# Как часто проигрыватель запоминает снимок мира для перемотки
+SNAPSHOT_EVERY = 600
+
+
+def new_seed():
+    return random.SystemRandom().getrandbits(63)
+
+
+class Replay:
+    # params - настройки конструктора World (World.params()), без них
+    # повтор играется в мире по умолчанию
+    def __init__(self, seed, hz=FPS, events=None, frames=0, params=None):
+        self.seed = seed
+        self.hz = hz
+        self.events = events if events is not None else []
+        self.frames = frames
+        self.params = dict(params) if params else {}
+
+    def to_bytes(self):
+        params = json.dumps(self.params, sort_keys=True).encode()
+        parts = [HEADER.pack(MAGIC, VERSION, self.hz, self.seed,
+                             self.frames, len(self.events), len(params)), params]
+        parts.extend(EVENT.pack(frame, x) for frame, x in self.events)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, hz, seed, frames, count, size = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a Merge Fruit replay")
+        offset = HEADER.size
+        params = json.loads(data[offset:offset + size])
+        offset += size
+        events = [EVENT.unpack_from(data, offset + i * EVENT.size)
+                  for i in range(count)]
+        return cls(seed, hz, events, frames, params)
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    # Подключается к обработке MOUSEBUTTONUP: record() после каждого броска
+    def __init__(self, seed, hz=FPS, params=None):
+        self.replay = Replay(seed, hz, params=params)
+        self.saved = False
+
+    def record(self, frame, x):
+        self.replay.events.append((frame, x))
+
+    def close(self, frame):
+        # Байты законченного повтора; None, если он уже закрыт
+        if self.saved:
+            return None
+        self.replay.frames = frame
+        self.saved = True
+        return self.replay.to_bytes()
+
+
+class ReplayPlayer:
+    def __init__(self, replay, snapshot_every=SNAPSHOT_EVERY):
+        self.replay = replay
+        self.dt = 1.0 / replay.hz
+        self.snapshot_every = snapshot_every
+        # Мир с настройками записанной партии, иначе она сыграет по-другому
+        self.world = World(seed=replay.seed, **replay.params)
+        self.next_event = 0
+        # Снимки мира по номеру шага: (снимок, индекс следующего броска)
+        self.snapshots = {0: (self.world.snapshot(), 0)}
+
+    def step(self):
+        world = self.world
+        events = self.replay.events
+        while self.next_event < len(events) and events[self.next_event][0] <= world.frame:
+            world.drop(events[self.next_event][1])
+            self.next_event += 1
+        world.step(self.dt)
+        if world.frame % self.snapshot_every == 0 and world.frame not in self.snapshots:
+            self.snapshots[world.frame] = (world.snapshot(), self.next_event)
+
+    def run(self, until=None):
+        # Пересчитываем игру так быстро, как позволяет процессор
+        until = self.replay.frames if until is None else until
+        world = self.world
+        while world.frame < until and not world.game_over:
+            self.step()
+        return world
+
+    def seek(self, frame):
+        # Ближайший снимок не позже нужного шага, дальше досчитываем
+        start = max(f for f in self.snapshots if f <= frame)
+        if not (start <= self.world.frame <= frame):
+            snapshot, next_event = self.snapshots[start]
+            self.world.restore(snapshot)
+            self.next_event = next_event
+        return self.run(frame)
+
+
+def main(argv=None):
+    # python -m merge_fruit.replay файл.mfr [шаг] - пересчитать повтор без экрана
+    import sys
+    import time
+
+    argv = sys.argv[1:] if argv is None else argv
+    replay = Replay.load(argv[0])
+    player = ReplayPlayer(replay)
+    start = time.perf_counter()
+    world = player.seek(int(argv[1])) if len(argv) > 1 else player.run()
+    elapsed = time.perf_counter() - start
+    print(f"frame {world.frame}, score {world.score}, balls {len(world.active_balls())}, "
+          f"game over {world.game_over}, {world.frame / max(elapsed, 1e-9):.0f} steps/s")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,197 @@
+# Главный цикл на asyncio: ввод, физика с фиксированной частотой и отрисовка -
+# отдельные кооперативные задачи, каждая со своим планировщиком кадров вместо
+# clock.tick. Файлы пишутся по очереди в потоке исполнителя, так что запись
+# снимков, повторов и рассылка зрителям не задерживают кадр.
+import asyncio
+import collections
+import sys
+
+from merge_fruit.timestep import MAX_SUBSTEPS, FixedTimestep
+
+# Последние миллисекунды до срока не спим, а уступаем управление: таймер
+# цикла событий будит с точностью около миллисекунды
+SPIN = 0.001
+# Сколько последних интервалов кадра хранит планировщик
+RING_SIZE = 600
+
+
+class FramePacer:
+    def __init__(self, hz, spin=SPIN, size=RING_SIZE):
+        self.hz = hz
+        self.period = 1.0 / hz
+        self.spin = spin
+        self.deadline = None
+        self.last = None
+        self.intervals = collections.deque(maxlen=size)
+        self.frames = 0
+        # Кадры, к сроку которых работа ещё не закончилась
+        self.overruns = 0
+        # Сроки, пропущенные целиком при большом отставании
+        self.skipped = 0
+
+    async def wait(self):
+        # Ждёт срока следующего кадра и возвращает реальное время с прошлого
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if self.deadline is None:
+            self.deadline = now
+            self.last = now
+        self.deadline += self.period
+        late = now - self.deadline
+        if late >= 0:
+            self.overruns += 1
+            if late > self.period:
+                # Отстали больше чем на кадр: не догоняем пачкой кадров подряд
+                missed = int(late / self.period)
+                self.skipped += missed
+                self.deadline += missed * self.period
+            # Кадр опоздал, но другие задачи всё равно получают ход
+            await asyncio.sleep(0)
+        else:
+            if -late > self.spin:
+                await asyncio.sleep(-late - self.spin)
+            while loop.time() < self.deadline:
+                await asyncio.sleep(0)
+        now = loop.time()
+        frame_time = now - self.last
+        self.last = now
+        self.frames += 1
+        self.intervals.append(frame_time)
+        return frame_time
+
+    def stats(self):
+        # Интервалы кадра в миллисекундах за последние size кадров
+        if not self.intervals:
+            return None
+        intervals = sorted(self.intervals)
+        return {
+            'frames': self.frames,
+            'mean_ms': sum(intervals) / len(intervals) * 1000,
+            'p99_ms': intervals[min(len(intervals) - 1, int(len(intervals) * 0.99))] * 1000,
+            'max_ms': intervals[-1] * 1000,
+            'overruns': self.overruns,
+            'skipped': self.skipped,
+        }
+
+
+class IOQueue:
+    # Блокирующая работа (файлы, сжатие) по порядку в потоке исполнителя:
+    # кадр только кладёт задание в очередь
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.worker = None
+        self.done = 0
+        self.errors = 0
+
+    def submit(self, function, *args):
+        self.queue.put_nowait((function, args))
+
+    async def start(self):
+        self.worker = asyncio.create_task(self.run())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            function, args = await self.queue.get()
+            try:
+                await loop.run_in_executor(None, function, *args)
+                self.done += 1
+            except Exception as error:
+                self.failed(function, error)
+            finally:
+                self.queue.task_done()
+
+    def failed(self, function, error):
+        # Не записался снимок или упало кодирование - не повод ронять игру
+        # и тем более останавливать очередь: следующие задания выполнятся
+        self.errors += 1
+        name = getattr(function, '__name__', repr(function))
+        print(f"merge_fruit: background job {name} failed: {error!r}", file=sys.stderr)
+
+    async def close(self):
+        # Дописываем всё, что успели поставить в очередь. Если исполнитель
+        # не запускался или уже завершился, join() не дождётся его:
+        # оставшиеся задания выполняем сами
+        if self.worker is None or self.worker.done():
+            while not self.queue.empty():
+                function, args = self.queue.get_nowait()
+                try:
+                    function(*args)
+                    self.done += 1
+                except Exception as error:
+                    self.failed(function, error)
+                finally:
+                    self.queue.task_done()
+            return
+        await self.queue.join()
+        self.worker.cancel()
+
+
+class GameLoop:
+    # poll() - обработка ввода (False - выйти), step(dt) - шаг физики,
+    # draw(alpha) - кадр отрисовки с долей шага для интерполяции
+    def __init__(self, fps, physics_hz, max_substeps=MAX_SUBSTEPS):
+        self.input_pacer = FramePacer(fps)
+        self.physics_pacer = FramePacer(physics_hz)
+        self.render_pacer = FramePacer(fps)
+        self.timestep = FixedTimestep(physics_hz, max_substeps)
+        # Фоновые службы: start() до первого кадра, close() после последнего
+        self.services = []
+        self.running = False
+        self.stepped_at = None
+
+    def add_service(self, service):
+        self.services.append(service)
+        return service
+
+    def stop(self):
+        self.running = False
+
+    def alpha(self):
+        # Доля шага физики, прошедшая с последнего шага
+        if self.stepped_at is None:
+            return 1.0
+        elapsed = asyncio.get_running_loop().time() - self.stepped_at
+        return min(1.0, (self.timestep.accumulator + elapsed) / self.timestep.dt)
+
+    async def input_task(self, poll):
+        while self.running:
+            await self.input_pacer.wait()
+            if poll() is False:
+                self.stop()
+
+    async def physics_task(self, step):
+        loop = asyncio.get_running_loop()
+        timestep = self.timestep
+        while self.running:
+            frame_time = await self.physics_pacer.wait()
+            for _ in range(timestep.advance(frame_time)):
+                step(timestep.dt)
+            self.stepped_at = loop.time()
+
+    async def render_task(self, draw):
+        while self.running:
+            await self.render_pacer.wait()
+            draw(self.alpha())
+
+    async def run_async(self, poll, step, draw):
+        for service in self.services:
+            await service.start()
+        self.running = True
+        try:
+            await asyncio.gather(self.input_task(poll), self.physics_task(step),
+                                 self.render_task(draw))
+        finally:
+            self.running = False
+            for service in self.services:
+                await service.close()
+
+    def run(self, poll, step, draw):
+        asyncio.run(self.run_async(poll, step, draw))
+
+    def stats(self):
+        return {
+            'input': self.input_pacer.stats(),
+            'physics': self.physics_pacer.stats(),
+            'render': self.render_pacer.stats(),
+        }
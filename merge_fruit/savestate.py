@@ -0,0 +1,293 @@
+# Сохранение и загрузка партии game_2.py: заголовок фиксированного размера,
+# состояние ГСЧ и по записи фиксированной длины на шарик. Файл читается через
+# mmap: записи разбираются прямо из отображённой памяти, без промежуточной копии,
+# а у numpy-хранилища целиком превращаются в массив одним np.frombuffer.
+# Плюс скользящие снимки для продолжения игры после падения.
+import gc
+import glob
+import mmap
+import os
+import struct
+
+MAGIC = b'MFSV'
+VERSION = 1
+# magic, версия, флаги, число шариков, зерно, счёт, шаг, время, начало отсчёта,
+# следующий шарик
+HEADER = struct.Struct('<4sHHIqqqddi')
+# Внутреннее состояние random.Random: 625 слов и запасённое gauss-значение
+RANDOM_WORDS = 625
+RANDOM = struct.Struct(f'<{RANDOM_WORDS}Id')
+# x, y, prev_x, prev_y, speed_x, speed_y, anchor_x, anchor_y, размер, флаги,
+# кадры без движения
+RECORD = struct.Struct('<8dHBxi')
+RECORDS_OFFSET = HEADER.size + RANDOM.size
+
+# Флаги заголовка
+GAME_OVER = 1
+COUNTDOWN = 2
+HAS_SEED = 4
+# Флаги шарика
+ACTIVE = 1
+ON_GROUND = 2
+ADDED_TO_SCORE = 4
+SLEEPING = 8
+
+# Скользящие снимки: раз в SAVE_EVERY шагов, по кругу в KEEP файлов
+SAVE_EVERY = 300
+KEEP = 3
+
+
+def record_dtype():
+    # Та же раскладка записи для np.frombuffer
+    import numpy as np
+    return np.dtype([
+        ('x', '<f8'), ('y', '<f8'), ('prev_x', '<f8'), ('prev_y', '<f8'),
+        ('speed_x', '<f8'), ('speed_y', '<f8'), ('anchor_x', '<f8'), ('anchor_y', '<f8'),
+        ('size_idx', '<u2'), ('flags', 'u1'), ('pad', 'u1'), ('still_frames', '<i4'),
+    ])
+
+
+# Запись
+
+def pack_header(world, count):
+    flags = ((GAME_OVER if world.game_over else 0)
+             | (COUNTDOWN if world.countdown_active else 0)
+             | (HAS_SEED if world.seed is not None else 0))
+    _, words, gauss = world.random.getstate()
+    return (HEADER.pack(MAGIC, VERSION, flags, count,
+                        world.seed if world.seed is not None else 0,
+                        world.score, world.frame, world.time,
+                        world.countdown_start, world.next_ball_idx)
+            + RANDOM.pack(*words, float('nan') if gauss is None else gauss))
+
+
+def pack_balls(balls):
+    data = bytearray(RECORD.size * len(balls))
+    pack_into = RECORD.pack_into
+    offset = 0
+    for ball in balls:
+        flags = ((ACTIVE if ball.active else 0)
+                 | (ON_GROUND if ball.on_ground else 0)
+                 | (ADDED_TO_SCORE if ball.added_to_score else 0)
+                 | (SLEEPING if ball.sleeping else 0))
+        pack_into(data, offset, ball.x, ball.y, ball.prev_x, ball.prev_y,
+                  ball.speed_x, ball.speed_y, ball.anchor_x, ball.anchor_y,
+                  ball.size_idx, flags, ball.still_frames)
+        offset += RECORD.size
+    return data
+
+
+def pack_store(store):
+    import numpy as np
+    n = store.count
+    records = np.zeros(n, dtype=record_dtype())
+    for name in ('x', 'y', 'prev_x', 'prev_y', 'speed_x', 'speed_y', 'size_idx'):
+        records[name] = getattr(store, name)[:n]
+    # У хранилища нет сна и опорных точек
+    records['anchor_x'] = records['x']
+    records['anchor_y'] = records['y']
+    records['flags'] = (store.active[:n] * ACTIVE
+                        + store.added_to_score[:n] * ADDED_TO_SCORE)
+    return records.tobytes()
+
+
+def encode(world):
+    # Весь файл снимка в памяти: его можно отдать на запись в другой поток,
+    # пока физика идёт дальше
+    if world.store is not None:
+        count = world.store.count
+        records = pack_store(world.store)
+    else:
+        count = len(world.balls)
+        records = pack_balls(world.balls)
+    return pack_header(world, count) + records
+
+
+def write_file(path, data):
+    # Пишем во временный файл и подменяем: упавшая на середине запись
+    # не портит прошлый снимок
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(data)
+    os.replace(temp, path)
+
+
+def save(world, path):
+    write_file(path, encode(world))
+
+
+# Чтение
+
+def read_header(buffer):
+    (magic, version, flags, count, seed, score, frame, time, countdown_start,
+     next_ball_idx) = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("not a Merge Fruit save")
+    if len(buffer) < RECORDS_OFFSET + count * RECORD.size:
+        raise ValueError("truncated Merge Fruit save")
+    return {
+        'flags': flags,
+        'count': count,
+        'seed': seed if flags & HAS_SEED else None,
+        'score': score,
+        'frame': frame,
+        'time': time,
+        'countdown_start': countdown_start,
+        'next_ball_idx': next_ball_idx,
+    }
+
+
+def restore_world(world, header, random_words, gauss):
+    world.seed = header['seed']
+    world.random.setstate((3, tuple(random_words), None if gauss != gauss else gauss))
+    world.score = header['score']
+    world.frame = header['frame']
+    world.time = header['time']
+    world.game_over = bool(header['flags'] & GAME_OVER)
+    world.countdown_active = bool(header['flags'] & COUNTDOWN)
+    world.countdown_start = header['countdown_start']
+    world.next_ball_idx = header['next_ball_idx']
+    world.contacts.clear()
+    world.forget_sleep()
+    if world.solver is not None:
+        # Накопленные импульсы не сохраняются, решатель начинает с нуля
+        world.solver.clear()
+
+
+def load_balls(world, view, count):
+    pool = world.pool
+    pool.clear()
+    ladder = world.ladder
+    acquire = pool.acquire
+    balls = pool.balls
+    # Сотни тысяч новых объектов без циклов: сборщик мусора тут только
+    # зря обходит их снова и снова
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        for (x, y, prev_x, prev_y, speed_x, speed_y, anchor_x, anchor_y,
+             size_idx, flags, still_frames) in RECORD.iter_unpack(view[:count * RECORD.size]):
+            ball = acquire(x, size_idx, ladder)
+            ball.y = y
+            ball.prev_x = prev_x
+            ball.prev_y = prev_y
+            ball.speed_x = speed_x
+            ball.speed_y = speed_y
+            ball.anchor_x = anchor_x
+            ball.anchor_y = anchor_y
+            ball.active = bool(flags & ACTIVE)
+            ball.on_ground = bool(flags & ON_GROUND)
+            ball.added_to_score = bool(flags & ADDED_TO_SCORE)
+            ball.sleeping = bool(flags & SLEEPING)
+            ball.still_frames = still_frames
+            # Номера в файл не пишутся: у зрителей после загрузки всё равно
+            # начинается новый поток
+            ball.id = world.new_id()
+            balls.append(ball)
+    finally:
+        if collecting:
+            gc.enable()
+
+
+def load_store(world, buffer, count):
+    import numpy as np
+    records = np.frombuffer(buffer, dtype=record_dtype(), count=count, offset=RECORDS_OFFSET)
+    store = world.store
+    while len(store.x) < count:
+        store.grow()
+    for name in ('x', 'y', 'prev_x', 'prev_y', 'speed_x', 'speed_y', 'size_idx'):
+        getattr(store, name)[:count] = records[name]
+    store.radius[:count] = np.asarray(store.sizes, dtype=np.float64)[records['size_idx']]
+    store.active[:count] = records['flags'] & ACTIVE
+    store.added_to_score[:count] = (records['flags'] & ADDED_TO_SCORE) != 0
+    store.ids[:count] = np.arange(world.next_id + 1, world.next_id + 1 + count)
+    world.next_id += count
+    store.active[count:] = 0
+    store.count = count
+    store.free = np.flatnonzero(store.active[:count] == 0).tolist()
+    store.generation += 1
+
+
+def load(world, path):
+    # Восстанавливает партию в world (бэкенд и лестница размеров берутся из world)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        header = read_header(mapped)
+        *words, gauss = RANDOM.unpack_from(mapped, HEADER.size)
+        restore_world(world, header, words, gauss)
+        count = header['count']
+        if world.store is not None:
+            load_store(world, mapped, count)
+        else:
+            view = memoryview(mapped)[RECORDS_OFFSET:]
+            try:
+                load_balls(world, view, count)
+            finally:
+                view.release()
+    return header
+
+
+# Скользящие снимки
+
+class RollingSnapshots:
+    def __init__(self, directory, every=SAVE_EVERY, keep=KEEP):
+        self.directory = directory
+        self.every = every
+        self.keep = keep
+        self.slot = 0
+
+    def paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, 'rolling-*.mfs')))
+
+    def next_path(self):
+        # Самый старый из keep файлов, его и перезаписываем
+        path = os.path.join(self.directory, f'rolling-{self.slot}.mfs')
+        self.slot = (self.slot + 1) % self.keep
+        return path
+
+    def save(self, world):
+        save(world, self.next_path())
+
+    def due(self, world):
+        # Пора ли писать снимок после этого шага: раз в every шагов
+        return bool(world.frame) and world.frame % self.every == 0 and not world.game_over
+
+    def tick(self, world):
+        # Вызывается после каждого шага физики
+        if self.due(world):
+            self.save(world)
+
+    def latest(self):
+        # Самый поздний целый снимок или None
+        best = None
+        for path in self.paths():
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read(HEADER.size)
+                    f.seek(0, os.SEEK_END)
+                    size = f.tell()
+                magic, version, _, count, _, _, frame, *_ = HEADER.unpack(data)
+            except (OSError, struct.error):
+                continue
+            if (magic != MAGIC or version != VERSION
+                    or size != RECORDS_OFFSET + count * RECORD.size):
+                continue
+            if best is None or frame > best[0]:
+                best = (frame, path)
+        return best[1] if best else None
+
+    def resume(self, world):
+        # Продолжаем игру с последнего снимка; True, если было откуда
+        path = self.latest()
+        if path is None:
+            return False
+        load(world, path)
+        return True
+
+    def clear(self):
+        # Игра закончилась штатно - продолжать нечего
+        for path in self.paths():
+            os.remove(path)
+        self.slot = 0
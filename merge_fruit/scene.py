@@ -0,0 +1,28 @@
+# Сцена корзины game_2.py, общая с окном зрителя (merge_fruit.viewer), чтобы
+# они не разошлись: статичный фон для Renderer и области HUD, которые
+# меняются каждый кадр.
+import pygame
+
+from merge_fruit.world import BASKET_TOP, BASKET_WIDTH, HEIGHT, UPPER_LIMIT
+
+BASKET_COLOR = (150, 100, 50)
+# Счёт, следующий шарик, таймер
+HUD_RECTS = (
+    (20, 20, 300, 50),
+    (BASKET_WIDTH - 80, 20, 60, 60),
+    (BASKET_WIDTH//2 - 15, 100, 60, 50),
+)
+
+
+def draw_basket(surface):
+    # Фон рисуется один раз в кэш Renderer
+    surface.fill((255, 255, 255))
+
+    # Боковые стенки
+    pygame.draw.line(surface, BASKET_COLOR, (0, BASKET_TOP), (0, HEIGHT), 5)
+    pygame.draw.line(surface, BASKET_COLOR, (BASKET_WIDTH, BASKET_TOP), (BASKET_WIDTH, HEIGHT), 5)
+
+    # Верхняя пунктирная граница
+    dash_length = 15
+    for x in range(0, BASKET_WIDTH, dash_length*2):
+        pygame.draw.line(surface, BASKET_COLOR, (x, UPPER_LIMIT), (x + dash_length, UPPER_LIMIT), 3)
@@ -0,0 +1,416 @@
+# Хранилище шариков "структура массивов" на NumPy: интегрирование, стенки,
+# дно корзины, верхняя граница и столкновения считаются пакетно по всем шарикам.
+import numpy as np
+
+from merge_fruit.ladder import SizeLadder
+from merge_fruit.merges import MERGE_FORCE, MergeEvent
+from merge_fruit.world import (
+    GRAVITY, FRICTION, BALL_SIZES, COLORS,
+    BASKET_WIDTH, BASKET_LEFT, BASKET_RIGHT, BASKET_BOTTOM, UPPER_LIMIT,
+)
+
+# Ключ ячейки сетки: cx * CELL_STRIDE + cy + CELL_OFFSET
+CELL_STRIDE = 1 << 21
+CELL_OFFSET = 1 << 20
+# Половина окрестности 3x3: каждая пара ячеек просматривается один раз
+HALF_NEIGHBOURS = [(1, -1), (1, 0), (1, 1), (0, 1)]
+
+# Все поэлементные массивы хранилища
+ARRAYS = ('x', 'y', 'prev_x', 'prev_y', 'speed_x', 'speed_y', 'radius',
+          'size_idx', 'active', 'added_to_score', 'ids')
+
+
+class BallView:
+    # Лёгкое представление одного шарика хранилища с интерфейсом Ball
+    # generation - поколение строк хранилища на момент создания: compact()
+    # и restore() переставляют строки, и старый индекс указывал бы на чужой
+    # шарик. reuse - сколько раз к тому времени add() занимал освобождённую
+    # строку index: после remove() в ней может оказаться новый шарик. Такое
+    # представление падает при первом же обращении
+    __slots__ = ('store', 'index', 'generation', 'reuse')
+    # Сон островков есть только у объектного пути
+    sleeping = False
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+        self.generation = store.generation
+        self.reuse = store.reuses[index]
+
+    def row(self):
+        store = self.store
+        if self.generation != store.generation:
+            raise RuntimeError("BallView outlived a BallStore compact() or restore()")
+        if self.reuse != store.reuses[self.index]:
+            raise RuntimeError("BallView row was removed and reused by another ball")
+        return self.index
+
+    @property
+    def x(self):
+        return float(self.store.x[self.row()])
+
+    @x.setter
+    def x(self, value):
+        self.store.x[self.row()] = value
+
+    @property
+    def y(self):
+        return float(self.store.y[self.row()])
+
+    @y.setter
+    def y(self, value):
+        self.store.y[self.row()] = value
+
+    @property
+    def prev_x(self):
+        return float(self.store.prev_x[self.row()])
+
+    @property
+    def prev_y(self):
+        return float(self.store.prev_y[self.row()])
+
+    @property
+    def speed_x(self):
+        return float(self.store.speed_x[self.row()])
+
+    @speed_x.setter
+    def speed_x(self, value):
+        self.store.speed_x[self.row()] = value
+
+    @property
+    def speed_y(self):
+        return float(self.store.speed_y[self.row()])
+
+    @speed_y.setter
+    def speed_y(self, value):
+        self.store.speed_y[self.row()] = value
+
+    @property
+    def radius(self):
+        return int(self.store.radius[self.row()])
+
+    @property
+    def size_idx(self):
+        return int(self.store.size_idx[self.row()])
+
+    @property
+    def color(self):
+        return self.store.ladder.colors[self.size_idx]
+
+    @property
+    def active(self):
+        return bool(self.store.active[self.row()])
+
+    @property
+    def id(self):
+        return int(self.store.ids[self.row()])
+
+    @id.setter
+    def id(self, value):
+        self.store.ids[self.row()] = value
+
+
+class BallStore:
+    def __init__(self, sizes=BALL_SIZES, capacity=256):
+        self.sizes = list(sizes)
+        # Цвета по размерам, как у объектных шариков
+        self.ladder = SizeLadder(self.sizes, COLORS)
+        self.cell_size = 2 * max(self.sizes)
+        self.count = 0
+        # Растёт, когда строки переставляются (BallView.row)
+        self.generation = 0
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        # Позиции на предыдущем шаге для интерполяции при отрисовке
+        self.prev_x = np.zeros(capacity, dtype=np.float64)
+        self.prev_y = np.zeros(capacity, dtype=np.float64)
+        self.speed_x = np.zeros(capacity, dtype=np.float64)
+        self.speed_y = np.zeros(capacity, dtype=np.float64)
+        self.radius = np.zeros(capacity, dtype=np.float64)
+        self.size_idx = np.zeros(capacity, dtype=np.int32)
+        self.active = np.zeros(capacity, dtype=np.int8)
+        self.added_to_score = np.zeros(capacity, dtype=np.int8)
+        # Номера шариков в партии (World.drop)
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        # Индексы освободившихся после слияния ячеек
+        self.free = []
+        # Сколько раз каждая строка бралась из free (BallView.row); строки
+        # не переезжают вместе с шариками, поэтому их нет в ARRAYS
+        self.reuses = np.zeros(capacity, dtype=np.int64)
+        # Сколько пар проверил последний поиск
+        self.tested = 0
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield BallView(self, i)
+
+    def grow(self):
+        capacity = max(1, len(self.x) * 2)
+        for name in ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        reuses = np.zeros(capacity, dtype=self.reuses.dtype)
+        reuses[:len(self.reuses)] = self.reuses
+        self.reuses = reuses
+
+    def add(self, x, size_idx, y=None):
+        if self.free:
+            i = self.free.pop()
+            self.reuses[i] += 1
+        else:
+            if self.count == len(self.x):
+                self.grow()
+            i = self.count
+            self.count += 1
+        radius = self.sizes[size_idx]
+        self.x[i] = x
+        self.y[i] = -radius if y is None else y
+        self.prev_x[i] = self.x[i]
+        self.prev_y[i] = self.y[i]
+        self.speed_x[i] = 0.0
+        self.speed_y[i] = 0.0
+        self.radius[i] = radius
+        self.size_idx[i] = size_idx
+        self.active[i] = 1
+        self.added_to_score[i] = 0
+        return BallView(self, i)
+
+    def remove(self, i):
+        # Ячейка i освобождается до следующего add или compact
+        self.active[i] = 0
+        self.free.append(i)
+
+    def step(self, world, k=1.0):
+        n = self.count
+        alive = np.flatnonzero(self.active[:n])
+        if len(alive) == 0:
+            return
+        self.prev_x[:n] = self.x[:n]
+        self.prev_y[:n] = self.y[:n]
+        self.integrate(world, alive, k)
+        self.collide(world, alive)
+        self.compact()
+
+    def compact(self):
+        # Уплотняем массивы, когда дырок стало слишком много; иначе дырки
+        # просто переиспользуются через free
+        if len(self.free) * 4 <= self.count:
+            return
+        alive = np.flatnonzero(self.active[:self.count])
+        for name in ARRAYS:
+            array = getattr(self, name)
+            array[:len(alive)] = array[alive]
+        self.count = len(alive)
+        self.active[self.count:] = 0
+        self.free = []
+        self.generation += 1
+
+    def integrate(self, world, idx, k):
+        x = self.x[idx]
+        y = self.y[idx]
+        vx = self.speed_x[idx]
+        vy = self.speed_y[idx]
+        r = self.radius[idx]
+
+        # Физика движения
+        vy += GRAVITY * k
+        y += vy * k
+        x += vx * k
+        vx *= FRICTION ** k
+
+        # Коллизии с границами (стенки корзины совпадают с краями экрана)
+        left = x - r < 0
+        right = x + r > BASKET_WIDTH
+        x[left] = r[left]
+        x[right] = BASKET_WIDTH - r[right]
+        vx[left | right] *= -world.bounce_factor
+
+        # Проверка верхней границы
+        if not world.countdown_active and np.any(y - r < UPPER_LIMIT):
+            world.countdown_active = True
+            world.countdown_start = world.time
+
+        # Коллизия с дном корзины
+        floor = (x >= BASKET_LEFT) & (x <= BASKET_RIGHT) & (y + r > BASKET_BOTTOM)
+        y[floor] = BASKET_BOTTOM - r[floor]
+        vy[floor] *= -world.bounce_factor
+        vx[floor] *= FRICTION ** k
+        vy[floor & (np.abs(vy) < 1)] = 0.0
+
+        # Новые шарики приносят очки при первом шаге
+        fresh = idx[self.added_to_score[idx] == 0]
+        if len(fresh):
+            world.score += int(np.sum(self.size_idx[fresh] + 1))
+            self.added_to_score[fresh] = 1
+
+        self.x[idx] = x
+        self.y[idx] = y
+        self.speed_x[idx] = vx
+        self.speed_y[idx] = vy
+
+    def pairs(self, idx):
+        # Все пары пересекающихся шариков через отсортированную по ячейкам сетку
+        x = self.x[idx]
+        y = self.y[idx]
+        cx = np.floor(x / self.cell_size).astype(np.int64)
+        cy = np.floor(y / self.cell_size).astype(np.int64)
+        keys = cx * CELL_STRIDE + cy + CELL_OFFSET
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+
+        firsts = []
+        seconds = []
+        # Своя ячейка: только пары a < b по позиции в сортировке
+        hi = np.searchsorted(sorted_keys, sorted_keys, 'right')
+        start = np.arange(len(sorted_keys)) + 1
+        a, b = expand(order, start, hi)
+        firsts.append(a)
+        seconds.append(b)
+        for dx, dy in HALF_NEIGHBOURS:
+            target = sorted_keys + dx * CELL_STRIDE + dy
+            lo = np.searchsorted(sorted_keys, target, 'left')
+            hi = np.searchsorted(sorted_keys, target, 'right')
+            a, b = expand(order, lo, hi)
+            firsts.append(a)
+            seconds.append(b)
+
+        a = np.concatenate(firsts)
+        b = np.concatenate(seconds)
+        self.tested = len(a)
+        dx = x[b] - x[a]
+        dy = y[b] - y[a]
+        reach = self.radius[idx][a] + self.radius[idx][b]
+        hit = dx * dx + dy * dy < reach * reach
+        a = idx[a[hit]]
+        b = idx[b[hit]]
+        # Меньший индекс - "свой" шарик, как в последовательном цикле
+        first = np.minimum(a, b)
+        second = np.maximum(a, b)
+        order = np.lexsort((second, first))
+        return first[order], second[order]
+
+    def collide(self, world, idx):
+        a, b = self.pairs(idx)
+        world.pairs_tested += self.tested
+        if len(a) == 0:
+            return
+
+        # Слияния разрешаем по порядку пар, каждый шарик - не более раза за шаг
+        same = (self.size_idx[a] == self.size_idx[b]) & (self.size_idx[a] < len(self.sizes) - 1)
+        used = set()
+        for i, j in zip(a[same].tolist(), b[same].tolist()):
+            if i in used or j in used:
+                continue
+            used.add(i)
+            used.add(j)
+            self.merge(world, i, j)
+
+        # Остальные контакты - одним пакетом (Якоби: все импульсы от старых скоростей)
+        keep = ~same
+        if used:
+            merged = np.fromiter(used, dtype=np.int64)
+            keep &= ~np.isin(a, merged) & ~np.isin(b, merged)
+        a = a[keep]
+        b = b[keep]
+        if len(a) == 0:
+            return
+
+        dx = self.x[b] - self.x[a]
+        dy = self.y[b] - self.y[a]
+        distance = np.hypot(dx, dy)
+        distance[distance == 0] = 1e-9
+        nx = dx / distance
+        ny = dy / distance
+        ra = self.radius[a]
+        rb = self.radius[b]
+        total = ra + rb
+        p = 2 * ((self.speed_x[a] - self.speed_x[b]) * nx
+                 + (self.speed_y[a] - self.speed_y[b]) * ny) / total
+
+        n = self.count
+        dvx = np.zeros(n)
+        dvy = np.zeros(n)
+        np.add.at(dvx, a, -p * rb * nx)
+        np.add.at(dvy, a, -p * rb * ny)
+        np.add.at(dvx, b, p * ra * nx)
+        np.add.at(dvy, b, p * ra * ny)
+
+        overlap = total - distance
+        dpx = np.zeros(n)
+        dpy = np.zeros(n)
+        np.add.at(dpx, a, -overlap * nx)
+        np.add.at(dpy, a, -overlap * ny)
+        np.add.at(dpx, b, overlap * nx)
+        np.add.at(dpy, b, overlap * ny)
+
+        touched = np.unique(np.concatenate((a, b)))
+        bounce = world.bounce_factor
+        self.speed_x[touched] = (self.speed_x[touched] + dvx[touched]) * bounce * FRICTION
+        self.speed_y[touched] = (self.speed_y[touched] + dvy[touched]) * bounce * GRAVITY
+        self.x[touched] += dpx[touched] * FRICTION
+        self.y[touched] += dpy[touched] * GRAVITY
+
+    def merge(self, world, i, j):
+        size_idx = int(self.size_idx[i]) + 1
+        self.size_idx[i] = size_idx
+        self.radius[i] = self.sizes[size_idx]
+        world.score += size_idx + 1
+        world.merges += 1
+        self.added_to_score[i] = 1
+        self.remove(j)
+
+        # Эффект отталкивания при слиянии
+        dx = self.x[j] - self.x[i]
+        dy = self.y[j] - self.y[i]
+        distance = float(np.hypot(dx, dy)) or 1.0
+        self.speed_x[i] = -dx / distance * MERGE_FORCE
+        self.speed_y[i] = -dy / distance * MERGE_FORCE
+        # Цепочки здесь доигрываются в следующих шагах, каждое слияние - первое
+        world.merge_stage.emit(MergeEvent(world.frame, float(self.x[i]), float(self.y[i]),
+                                          size_idx, 1, int(self.ids[i]), int(self.ids[j])))
+
+    def snapshot(self):
+        n = self.count
+        state = {name: getattr(self, name)[:n].copy() for name in ARRAYS}
+        state['count'] = n
+        state['free'] = list(self.free)
+        return state
+
+    def restore(self, state):
+        n = state['count']
+        while len(self.x) < n:
+            self.grow()
+        for name in ARRAYS:
+            getattr(self, name)[:n] = state[name]
+        self.active[n:] = 0
+        self.count = n
+        self.free = list(state['free'])
+        self.generation += 1
+
+    # Запросы состояния без обхода по представлениям
+
+    def active_indices(self):
+        return np.flatnonzero(self.active[:self.count])
+
+    def top(self):
+        idx = self.active_indices()
+        if len(idx) == 0:
+            return BASKET_BOTTOM
+        return float(np.min(self.y[idx] - self.radius[idx]))
+
+
+def expand(order, lo, hi):
+    # Разворачивает диапазоны [lo, hi) отсортированного массива в пары индексов
+    counts = np.maximum(hi - lo, 0)
+    total = int(counts.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    owners = np.repeat(np.arange(len(lo)), counts)
+    offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    return order[owners], order[np.repeat(lo, counts) + offsets]
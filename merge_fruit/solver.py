@@ -0,0 +1,351 @@
+# Решатель контактов: последовательные импульсы с тёплым стартом.
+# Вместо попарного отталкивания внутри Ball.update собирает все касания шага
+# (шарик-шарик и шарик-корзина) и несколько раз проходит по ним, накапливая
+# импульс каждой пары. Накопленные импульсы переживают кадр, поэтому стопка,
+# которая уже стоит, с первой итерации получает нужную опору.
+import math
+
+SOLVER_ITERATIONS = 8
+POSITION_ITERATIONS = 3
+# Касания в пределах этого зазора тоже попадают в список: лежащие шарики
+# не теряют контакт (и кэш импульса) из-за дрожания на доли пикселя
+CONTACT_MARGIN = 1.0
+# Перекрытие, которое не исправляем, и доля остатка, выталкиваемая за проход
+PENETRATION_SLOP = 0.5
+BAUMGARTE = 0.4
+# Удары медленнее этого не отскакивают: медленный отскок и есть вечное дрожание
+RESTITUTION_SPEED = 2.0
+# Итерации прекращаются, когда самая большая поправка импульса меньше этой
+TOLERANCE = 1e-3
+# Какая доля прошлого импульса подаётся на старте
+WARM_START = 1.0
+# Трение скольжения в контакте: без него шарики в стопке расползаются
+# друг с друга бесконечно
+CONTACT_FRICTION = 0.5
+
+FLOOR = 'floor'
+LEFT = 'left'
+RIGHT = 'right'
+
+
+class Contact:
+    __slots__ = ('a', 'b', 'key', 'nx', 'ny', 'gap', 'inv_a', 'inv_b',
+                 'mass', 'target', 'impulse', 'friction')
+
+    def __init__(self, a, b, key, nx, ny, gap, inv_a, inv_b):
+        # Нормаль (nx, ny) смотрит от a к b; b = None - стенка или дно
+        self.a = a
+        self.b = b
+        self.key = key
+        self.nx = nx
+        self.ny = ny
+        self.gap = gap
+        self.inv_a = inv_a
+        self.inv_b = inv_b
+        self.mass = 1.0 / (inv_a + inv_b)
+        self.target = 0.0
+        self.impulse = 0.0
+        self.friction = 0.0
+
+    def separation(self):
+        # Скорость расхождения вдоль нормали (< 0 - сближаются)
+        a = self.a
+        b = self.b
+        vn = -(a.speed_x * self.nx + a.speed_y * self.ny)
+        if b is not None:
+            vn += b.speed_x * self.nx + b.speed_y * self.ny
+        return vn
+
+    def sliding(self):
+        # Скорость b относительно a вдоль касательной (-ny, nx)
+        a = self.a
+        b = self.b
+        vt = a.speed_x * self.ny - a.speed_y * self.nx
+        if b is not None:
+            vt += b.speed_y * self.nx - b.speed_x * self.ny
+        return vt
+
+    def apply(self, impulse, friction=0.0):
+        # Импульс вдоль нормали и вдоль касательной
+        ix = impulse * self.nx - friction * self.ny
+        iy = impulse * self.ny + friction * self.nx
+        a = self.a
+        a.speed_x -= ix * self.inv_a
+        a.speed_y -= iy * self.inv_a
+        b = self.b
+        if b is not None and self.inv_b:
+            b.speed_x += ix * self.inv_b
+            b.speed_y += iy * self.inv_b
+
+
+def inverse_mass(ball):
+    # Масса пропорциональна площади; спящий шарик - неподвижная опора
+    if ball.sleeping:
+        return 0.0
+    return 1.0 / (ball.radius * ball.radius)
+
+
+class ContactSolver:
+    def __init__(self, left, right, bottom, gravity, iterations=SOLVER_ITERATIONS,
+                 position_iterations=POSITION_ITERATIONS):
+        self.left = left
+        self.right = right
+        self.bottom = bottom
+        self.gravity = gravity
+        self.iterations = iterations
+        self.position_iterations = position_iterations
+        # Накопленные импульсы прошлого шага: (id(a), id(b) или стенка) -> импульс
+        self.cache = {}
+        self.contacts = []
+        self.clear_stats()
+
+    def clear(self):
+        self.cache.clear()
+        self.contacts = []
+
+    def clear_stats(self):
+        self.solves = 0
+        self.iterations_total = 0
+        self.last_iterations = 0
+        self.last_residual = 0.0
+        self.last_penetration = 0.0
+        self.last_warm = 0
+
+    # Сбор контактов
+
+    def build(self, world):
+        contacts = []
+        pairs = world.contacts
+        pairs.clear()
+        # Спящие шарики сами контактов не заводят, их берут соседи
+        balls = world.awake
+        order = {id(ball): i for i, ball in enumerate(balls)}
+        grid = world.grid
+        limit_sq = world.ladder.reach_sq_with(CONTACT_MARGIN)
+        for i, a in enumerate(balls):
+            if not a.active or a.sleeping:
+                continue
+            inv_a = inverse_mass(a)
+            for b in grid.nearby(a.x, a.y):
+                if b is a or not b.active:
+                    continue
+                # Пару бодрствующих берёт шарик, который идёт раньше в списке
+                if not b.sleeping and order[id(b)] < i:
+                    continue
+                dx = b.x - a.x
+                dy = b.y - a.y
+                # Дальние пары отсекаем по квадрату расстояния, корень - только
+                # для настоящих контактов
+                if dx * dx + dy * dy > limit_sq[a.size_idx][b.size_idx]:
+                    continue
+                distance = math.sqrt(dx * dx + dy * dy)
+                gap = distance - a.radius - b.radius
+                # Нормаль берём по положениям до шага: быстрый шарик, глубоко
+                # влетевший в соседа, отскакивает туда, откуда прилетел, а не вбок
+                px = b.prev_x - a.prev_x
+                py = b.prev_y - a.prev_y
+                length = math.hypot(px, py)
+                if length:
+                    dx, dy, distance = px, py, length
+                elif distance == 0:
+                    dx, dy, distance = 0.0, 1.0, 1.0
+                contacts.append(Contact(a, b, (id(a), id(b)), dx / distance,
+                                        dy / distance, gap, inv_a,
+                                        inverse_mass(b)))
+                pairs.append((a, b))
+
+            # Стенки и дно корзины
+            gap = self.bottom - a.y - a.radius
+            if gap <= CONTACT_MARGIN:
+                contacts.append(Contact(a, None, (id(a), FLOOR), 0.0, 1.0, gap, inv_a, 0.0))
+            gap = a.x - a.radius - self.left
+            if gap <= CONTACT_MARGIN:
+                contacts.append(Contact(a, None, (id(a), LEFT), -1.0, 0.0, gap, inv_a, 0.0))
+            gap = self.right - a.x - a.radius
+            if gap <= CONTACT_MARGIN:
+                contacts.append(Contact(a, None, (id(a), RIGHT), 1.0, 0.0, gap, inv_a, 0.0))
+        self.contacts = contacts
+        return contacts
+
+    # Решение
+
+    def solve(self, world, k=1.0):
+        contacts = self.build(world)
+        bounce = world.bounce_factor
+        cache = self.cache
+        warm = 0
+        for contact in contacts:
+            cached = cache.get(contact.key)
+            vn = contact.separation()
+            if contact.gap > 0:
+                # Ещё не касаются: разрешаем сблизиться ровно до касания
+                contact.target = -contact.gap / k
+            elif cached is None and vn < -RESTITUTION_SPEED:
+                # Отскакивают только при первом ударе, внутри стопки отскок
+                # лишь раскачивает её
+                contact.target = -bounce * vn
+            if not contact.inv_b:
+                # Ball.update в следующем шаге сначала добавит тяжесть, потом
+                # сдвинет шарик: опора должна заранее погасить эту добавку
+                contact.target += self.gravity * k * contact.ny
+            if cached is not None:
+                contact.impulse = cached[0] * WARM_START
+                contact.friction = cached[1] * WARM_START
+                contact.apply(contact.impulse, contact.friction)
+                warm += 1
+
+        impulses, frictions, iterations, residual = self.iterate(contacts)
+        for contact, impulse, friction in zip(contacts, impulses, frictions):
+            contact.impulse = impulse
+            contact.friction = friction
+
+        self.cache = {contact.key: (contact.impulse, contact.friction)
+                      for contact in contacts if contact.impulse}
+        penetration = self.correct_positions(contacts)
+
+        self.solves += 1
+        self.iterations_total += iterations
+        self.last_iterations = iterations
+        self.last_residual = residual
+        self.last_penetration = penetration
+        self.last_warm = warm
+
+    def iterate(self, contacts):
+        # Итерации по скоростям. Всё, что не меняется за решение (шарики,
+        # нормаль, обратные массы, эффективная масса, цель), разбирается
+        # в кортежи один раз; накопленные импульсы - в списках, скорости
+        # шариков - в локальных переменных на время пары. Порядок операций
+        # тот же, что в separation/sliding/apply, так что результат
+        # совпадает с ними до бита
+        rows = []
+        for contact in contacts:
+            # Спящий шарик (inv_b = 0) стоит: скорость у него нулевая, толкать
+            # его тоже не нужно, так что пара решается как со стенкой
+            b = contact.b if contact.inv_b else None
+            rows.append((contact.a, b, contact.nx, contact.ny, contact.inv_a,
+                         contact.inv_b, contact.mass, contact.target))
+        impulses = [contact.impulse for contact in contacts]
+        frictions = [contact.friction for contact in contacts]
+        count = len(rows)
+        iterations = 0
+        residual = 0.0
+        for iterations in range(1, self.iterations + 1):
+            residual = 0.0
+            for i in range(count):
+                a, b, nx, ny, inv_a, inv_b, mass, target = rows[i]
+                ax = a.speed_x
+                ay = a.speed_y
+                if b is not None:
+                    bx = b.speed_x
+                    by = b.speed_y
+                    vn = -(ax * nx + ay * ny) + (bx * nx + by * ny)
+                else:
+                    vn = -(ax * nx + ay * ny)
+                impulse = impulses[i]
+                total = impulse + (target - vn) * mass
+                if total < 0.0:
+                    total = 0.0
+                change = total - impulse
+                if change:
+                    impulses[i] = impulse = total
+                    ax -= change * nx * inv_a
+                    ay -= change * ny * inv_a
+                    if b is not None:
+                        bx += change * nx * inv_b
+                        by += change * ny * inv_b
+                    if change < 0.0:
+                        change = -change
+                    if change * inv_a > residual:
+                        residual = change * inv_a
+                # Трение не больше CONTACT_FRICTION от прижимающего импульса
+                limit = CONTACT_FRICTION * impulse
+                if b is not None:
+                    vt = ax * ny - ay * nx + (by * nx - bx * ny)
+                else:
+                    vt = ax * ny - ay * nx
+                friction = frictions[i]
+                total = friction - vt * mass
+                if total > limit:
+                    total = limit
+                elif total < -limit:
+                    total = -limit
+                change = total - friction
+                if change:
+                    frictions[i] = total
+                    ax += change * ny * inv_a
+                    ay -= change * nx * inv_a
+                    if b is not None:
+                        bx -= change * ny * inv_b
+                        by += change * nx * inv_b
+                    if change < 0.0:
+                        change = -change
+                    if change * inv_a > residual:
+                        residual = change * inv_a
+                a.speed_x = ax
+                a.speed_y = ay
+                if b is not None:
+                    b.speed_x = bx
+                    b.speed_y = by
+            if residual < TOLERANCE:
+                break
+        return impulses, frictions, iterations, residual
+
+    def correct_positions(self, contacts):
+        # Гаусс-Зейдель по положениям: выталкиваем остаток перекрытия
+        penetration = 0.0
+        for _ in range(self.position_iterations):
+            penetration = 0.0
+            for contact in contacts:
+                a = contact.a
+                b = contact.b
+                nx = contact.nx
+                ny = contact.ny
+                if b is None:
+                    if ny:
+                        depth = a.y + a.radius - self.bottom
+                    elif nx < 0:
+                        depth = self.left - (a.x - a.radius)
+                    else:
+                        depth = a.x + a.radius - self.right
+                else:
+                    # Глубина вдоль нормали контакта
+                    depth = a.radius + b.radius - ((b.x - a.x) * nx + (b.y - a.y) * ny)
+                penetration = max(penetration, depth)
+                if depth <= PENETRATION_SLOP:
+                    continue
+                shift = BAUMGARTE * (depth - PENETRATION_SLOP) * contact.mass
+                a.x -= shift * contact.inv_a * nx
+                a.y -= shift * contact.inv_a * ny
+                if b is not None and contact.inv_b:
+                    b.x += shift * contact.inv_b * nx
+                    b.y += shift * contact.inv_b * ny
+        return penetration
+
+    # Статистика сходимости
+
+    def stats(self):
+        return {
+            'contacts': len(self.contacts),
+            'warm_started': self.last_warm,
+            'iterations': self.last_iterations,
+            'residual': self.last_residual,
+            'penetration': self.last_penetration,
+            'mean_iterations': self.iterations_total / self.solves if self.solves else 0.0,
+            'total_iterations': self.iterations_total,
+        }
+
+    # Снимки: ключи по id заменяем номерами шариков в списке мира
+
+    def snapshot(self, balls):
+        order = {id(ball): i for i, ball in enumerate(balls)}
+        impulses = []
+        for (a, b), impulse in self.cache.items():
+            if a in order and (b in order or isinstance(b, str)):
+                impulses.append((order[a], order.get(b, b), impulse))
+        return impulses
+
+    def restore(self, balls, impulses):
+        self.clear()
+        for a, b, impulse in impulses:
+            key_b = b if isinstance(b, str) else id(balls[b])
+            self.cache[(id(balls[a]), key_b)] = impulse
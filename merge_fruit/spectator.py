@@ -0,0 +1,120 @@
+# Зрители по локальной петле: сервер рассылает поток состояния корзины
+# (merge_fruit.stream: полные кадры и изменения между ними) всем подключённым
+# клиентам. У каждого клиента короткая своя очередь: медленный зритель теряет
+# сообщения и ждёт следующего полного кадра, а игра его не ждёт.
+# Смотреть: python -m merge_fruit watch [--port PORT] [--window]
+import asyncio
+
+from merge_fruit.stream import LENGTH, StreamDecoder, StreamEncoder
+
+HOST = '127.0.0.1'
+PORT = 8765
+# Сколько сообщений может ждать отправки одному зрителю
+BACKLOG = 4
+# Самая длинная строка, которую читает клиент построчного протокола
+LINE_LIMIT = 1 << 22
+
+
+def frame_state(world):
+    # Состояние корзины целиком в JSON: с ним сравнивается поток (benchmarks/stream)
+    balls = [[round(ball.x, 1), round(ball.y, 1), ball.size_idx]
+             for ball in world.balls if ball.active]
+    return {'frame': world.frame, 'score': world.score,
+            'game_over': world.game_over, 'balls': balls}
+
+
+class SpectatorServer:
+    def __init__(self, host=HOST, port=PORT, backlog=BACKLOG):
+        self.host = host
+        self.port = port
+        self.backlog = backlog
+        self.server = None
+        self.encoder = None
+        self.clients = {}
+        self.sent = 0
+        self.bytes = 0
+        self.dropped = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.serve, self.host, self.port)
+        # port=0 - свободный порт от системы
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def serve(self, reader, writer):
+        queue = asyncio.Queue(self.backlog)
+        self.clients[queue] = asyncio.current_task()
+        # Новому зрителю нужен полный кадр
+        if self.encoder is not None:
+            self.encoder.request_keyframe()
+        try:
+            while True:
+                data = await queue.get()
+                if data is None:
+                    break
+                writer.write(data)
+                await writer.drain()
+                self.sent += 1
+                self.bytes += len(data)
+        except ConnectionError:
+            pass
+        finally:
+            del self.clients[queue]
+            writer.close()
+
+    def publish(self, world):
+        # Вызывается после шага физики; без зрителей ничего не кодирует
+        if self.encoder is None or self.encoder.world is not world:
+            if self.encoder is not None:
+                self.encoder.close()
+            self.encoder = StreamEncoder(world)
+        if not self.clients:
+            self.encoder.skip()
+            return
+        data = self.encoder.encode()
+        data = LENGTH.pack(len(data)) + data
+        for queue in self.clients:
+            if queue.full():
+                # Без пропущенных изменений поток не сойдётся: выбрасываем
+                # очередь целиком, а следующим всем уйдёт полный кадр
+                while not queue.empty():
+                    queue.get_nowait()
+                    self.dropped += 1
+                self.encoder.request_keyframe()
+            queue.put_nowait(data)
+
+    async def close(self):
+        self.server.close()
+        tasks = list(self.clients.values())
+        for queue in self.clients:
+            # Неотправленные кадры уже не нужны, None - сигнал отключиться
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+        if self.encoder is not None:
+            self.encoder.close()
+
+
+async def read_message(reader):
+    # Следующее сообщение потока или None, если сервер закрылся
+    try:
+        (length,) = LENGTH.unpack(await reader.readexactly(LENGTH.size))
+        return await reader.readexactly(length)
+    except asyncio.IncompleteReadError:
+        return None
+
+
+async def watch(on_frame, host=HOST, port=PORT, decoder=None):
+    # on_frame(decoder) после каждого применённого сообщения; False - отключиться
+    decoder = decoder if decoder is not None else StreamDecoder()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            data = await read_message(reader)
+            if data is None:
+                break
+            if decoder.apply(data) and on_frame(decoder) is False:
+                break
+    finally:
+        writer.close()
@@ -0,0 +1,294 @@
+# Поток состояния корзины для зрителей и записи партий. Позиции квантуются
+# до четверти пикселя; раз в KEYFRAME_EVERY сообщений уходит полный кадр,
+# между ними - только изменения: появившиеся, исчезнувшие и слитые шарики
+# явно, плюс сдвиги шариков, которые не спят и сдвинулись хотя бы на квант.
+# Декодер восстанавливает шарики с интерфейсом, которого хватает Renderer.
+import struct
+
+from merge_fruit.ladder import SizeLadder
+from merge_fruit.world import BALL_SIZES, COLORS
+
+# Квантов на пиксель
+QUANT = 4
+KEYFRAME_EVERY = 60
+
+KEYFRAME = 1
+DELTA = 2
+# вид, номер сообщения, шаг, счёт, следующий шарик, флаги, остаток отсчёта
+# в десятых секунды
+HEADER = struct.Struct('<BIIIBBB')
+COUNT = struct.Struct('<H')
+# номер, x, y, размер
+BALL = struct.Struct('<HhhB')
+# выросший, поглощённый, новый размер
+MERGE = struct.Struct('<HHB')
+DESPAWN = struct.Struct('<H')
+# сдвиг в квантах
+MOVE = struct.Struct('<Hbb')
+# новое положение, если сдвиг не помещается в байт
+JUMP = struct.Struct('<Hhh')
+# Длина сообщения перед ним в записи и в сокете
+LENGTH = struct.Struct('<I')
+
+# Флаги заголовка
+GAME_OVER = 1
+COUNTDOWN = 2
+# Номера на проводе - младшие 16 бит: столько шариков одновременно не живёт
+ID_MASK = 0xFFFF
+
+
+def quantize(value):
+    return max(-0x8000, min(0x7FFF, round(value * QUANT)))
+
+
+def pack_section(item, rows):
+    # Число записей и сами записи одной секции
+    data = bytearray(COUNT.size + item.size * len(rows))
+    COUNT.pack_into(data, 0, len(rows))
+    offset = COUNT.size
+    for row in rows:
+        item.pack_into(data, offset, *row)
+        offset += item.size
+    return data
+
+
+def unpack_section(item, data, offset):
+    (count,) = COUNT.unpack_from(data, offset)
+    offset += COUNT.size
+    end = offset + count * item.size
+    return item.iter_unpack(data[offset:end]), end
+
+
+class StreamEncoder:
+    def __init__(self, world, keyframe_every=KEYFRAME_EVERY):
+        self.world = world
+        self.keyframe_every = keyframe_every
+        # То, что уже знает декодер: номер -> [x, y, размер, спал ли]
+        self.sent = {}
+        self.merges = []
+        self.seq = 0
+        self.since_keyframe = 0
+        self.force_keyframe = True
+        world.on_merge(self.on_merge)
+
+    def close(self):
+        self.world.merge_stage.unsubscribe(self.on_merge)
+
+    def on_merge(self, event):
+        self.merges.append((event.ball_id & ID_MASK, event.other_id & ID_MASK, event.size_idx))
+
+    def skip(self):
+        # Шаг без сообщения (никто не смотрит): следующим будет полный кадр
+        self.merges.clear()
+        self.force_keyframe = True
+
+    def request_keyframe(self):
+        # Новый зритель или зритель, потерявший сообщения
+        self.force_keyframe = True
+
+    def header(self, kind):
+        world = self.world
+        left = world.countdown_left()
+        flags = ((GAME_OVER if world.game_over else 0)
+                 | (COUNTDOWN if left is not None else 0))
+        tenths = min(255, int(left * 10)) if left is not None else 0
+        return HEADER.pack(kind, self.seq, world.frame, world.score,
+                           world.next_ball_idx, flags, tenths)
+
+    def encode(self):
+        # Сообщение о текущем состоянии мира, вызывается после шага
+        self.seq += 1
+        if self.force_keyframe or self.since_keyframe >= self.keyframe_every:
+            data = self.keyframe()
+        else:
+            data = self.delta()
+        self.merges.clear()
+        return data
+
+    def keyframe(self):
+        self.force_keyframe = False
+        self.since_keyframe = 0
+        sent = self.sent = {}
+        rows = []
+        for ball in self.world.balls:
+            if ball.active:
+                ball_id = ball.id & ID_MASK
+                x = quantize(ball.x)
+                y = quantize(ball.y)
+                sent[ball_id] = [x, y, ball.size_idx, ball.sleeping]
+                rows.append((ball_id, x, y, ball.size_idx))
+        return self.header(KEYFRAME) + pack_section(BALL, rows)
+
+    def delta(self):
+        self.since_keyframe += 1
+        sent = self.sent
+        alive = {ball.id & ID_MASK: ball for ball in self.world.balls if ball.active}
+
+        # Слияния, о которых декодеру есть что сказать: выросший ему известен
+        merges = []
+        for ball_id, other_id, size_idx in self.merges:
+            if ball_id in sent:
+                merges.append((ball_id, other_id, size_idx))
+                sent[ball_id][2] = size_idx
+                sent.pop(other_id, None)
+
+        despawns = [(ball_id,) for ball_id in sent if ball_id not in alive]
+        for (ball_id,) in despawns:
+            del sent[ball_id]
+
+        spawns = []
+        moves = []
+        jumps = []
+        for ball_id, ball in alive.items():
+            entry = sent.get(ball_id)
+            if entry is not None and entry[2] != ball.size_idx:
+                # Размер разошёлся (слияние между сообщениями): заменяем шарик
+                despawns.append((ball_id,))
+                entry = None
+            if entry is None:
+                x = quantize(ball.x)
+                y = quantize(ball.y)
+                sent[ball_id] = [x, y, ball.size_idx, ball.sleeping]
+                spawns.append((ball_id, x, y, ball.size_idx))
+                continue
+            sleeping = ball.sleeping
+            if sleeping and entry[3]:
+                # Спящий шарик с уже отправленным положением
+                continue
+            entry[3] = sleeping
+            x = quantize(ball.x)
+            y = quantize(ball.y)
+            dx = x - entry[0]
+            dy = y - entry[1]
+            if not dx and not dy:
+                continue
+            if -128 <= dx <= 127 and -128 <= dy <= 127:
+                moves.append((ball_id, dx, dy))
+            else:
+                jumps.append((ball_id, x, y))
+            entry[0] = x
+            entry[1] = y
+
+        return b''.join((self.header(DELTA), pack_section(MERGE, merges),
+                         pack_section(DESPAWN, despawns), pack_section(BALL, spawns),
+                         pack_section(MOVE, moves), pack_section(JUMP, jumps)))
+
+
+class RemoteBall:
+    # Шарик на стороне зрителя: ровно то, что нужно Renderer.draw_balls
+    __slots__ = ('qx', 'qy', 'x', 'y', 'prev_x', 'prev_y', 'size_idx', 'radius', 'color')
+    active = True
+
+    def __init__(self, qx, qy, size_idx, ladder):
+        self.move(qx, qy)
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.resize(size_idx, ladder)
+
+    def move(self, qx, qy):
+        self.qx = qx
+        self.qy = qy
+        self.x = qx / QUANT
+        self.y = qy / QUANT
+
+    def resize(self, size_idx, ladder):
+        self.size_idx = size_idx
+        self.radius = ladder.radius[size_idx]
+        self.color = ladder.colors[size_idx]
+
+
+class StreamDecoder:
+    def __init__(self, sizes=BALL_SIZES):
+        self.ladder = SizeLadder(sizes, COLORS)
+        self.balls = {}
+        # Номер последнего применённого сообщения; None - ждём полный кадр
+        self.seq = None
+        self.frame = 0
+        self.score = 0
+        self.next_ball_idx = 0
+        self.game_over = False
+        self.countdown_left = None
+        # Изменения, пропущенные из-за разрыва потока
+        self.skipped = 0
+
+    def apply(self, data):
+        # False, если сообщение пришлось пропустить до следующего полного кадра
+        kind, seq, frame, score, next_ball_idx, flags, tenths = HEADER.unpack_from(data)
+        if kind == DELTA and (self.seq is None or seq != self.seq + 1):
+            self.seq = None
+            self.skipped += 1
+            return False
+        self.seq = seq
+        self.frame = frame
+        self.score = score
+        self.next_ball_idx = next_ball_idx
+        self.game_over = bool(flags & GAME_OVER)
+        self.countdown_left = tenths / 10 if flags & COUNTDOWN else None
+        if kind == KEYFRAME:
+            self.apply_keyframe(data)
+        else:
+            self.apply_delta(data)
+        return True
+
+    def apply_keyframe(self, data):
+        ladder = self.ladder
+        rows, _ = unpack_section(BALL, data, HEADER.size)
+        self.balls = {ball_id: RemoteBall(x, y, size_idx, ladder)
+                      for ball_id, x, y, size_idx in rows}
+
+    def apply_delta(self, data):
+        balls = self.balls
+        ladder = self.ladder
+        for ball in balls.values():
+            ball.prev_x = ball.x
+            ball.prev_y = ball.y
+        merges, offset = unpack_section(MERGE, data, HEADER.size)
+        for ball_id, other_id, size_idx in merges:
+            balls[ball_id].resize(size_idx, ladder)
+            balls.pop(other_id, None)
+        despawns, offset = unpack_section(DESPAWN, data, offset)
+        for (ball_id,) in despawns:
+            balls.pop(ball_id, None)
+        spawns, offset = unpack_section(BALL, data, offset)
+        for ball_id, x, y, size_idx in spawns:
+            balls[ball_id] = RemoteBall(x, y, size_idx, ladder)
+        moves, offset = unpack_section(MOVE, data, offset)
+        for ball_id, dx, dy in moves:
+            ball = balls[ball_id]
+            ball.move(ball.qx + dx, ball.qy + dy)
+        jumps, offset = unpack_section(JUMP, data, offset)
+        for ball_id, x, y in jumps:
+            balls[ball_id].move(x, y)
+
+
+# Запись потока в файл: сообщения с длиной впереди, подряд
+
+class StreamRecorder:
+    def __init__(self, world, path, keyframe_every=KEYFRAME_EVERY):
+        self.encoder = StreamEncoder(world, keyframe_every)
+        self.file = open(path, 'wb')
+        self.bytes = 0
+        self.messages = 0
+
+    def record(self):
+        # После каждого шага мира
+        data = self.encoder.encode()
+        self.file.write(LENGTH.pack(len(data)))
+        self.file.write(data)
+        self.bytes += len(data)
+        self.messages += 1
+
+    def close(self):
+        self.encoder.close()
+        self.file.close()
+
+
+def read_stream(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    offset = 0
+    while offset < len(data):
+        (length,) = LENGTH.unpack_from(data, offset)
+        offset += LENGTH.size
+        yield data[offset:offset + length]
+        offset += length
@@ -0,0 +1,38 @@
+# Физика с фиксированным шагом: накопитель реального времени кадра,
+# ограничение числа подшагов и интерполяция позиций для отрисовки.
+
+# Сколько подшагов физики можно сделать за один кадр отрисовки
+MAX_SUBSTEPS = 5
+
+
+class FixedTimestep:
+    def __init__(self, hz, max_substeps=MAX_SUBSTEPS):
+        self.hz = hz
+        self.dt = 1.0 / hz
+        self.max_substeps = max_substeps
+        self.accumulator = 0.0
+        # Время, выброшенное из-за ограничения подшагов
+        self.dropped = 0.0
+
+    def advance(self, frame_time):
+        # Сколько шагов физики сделать за прошедшее время кадра
+        self.accumulator += frame_time
+        steps = int(self.accumulator / self.dt)
+        if steps > self.max_substeps:
+            # Не догоняем отставание, иначе каждый кадр будет всё длиннее
+            self.dropped += self.accumulator - self.max_substeps * self.dt
+            self.accumulator = 0.0
+            return self.max_substeps
+        self.accumulator -= steps * self.dt
+        return steps
+
+    @property
+    def alpha(self):
+        # Доля шага между предыдущим и текущим состоянием физики
+        return min(1.0, self.accumulator / self.dt)
+
+
+def interpolate(ball, alpha):
+    x = ball.prev_x + (ball.x - ball.prev_x) * alpha
+    y = ball.prev_y + (ball.y - ball.prev_y) * alpha
+    return int(x), int(y)
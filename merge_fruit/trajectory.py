@@ -0,0 +1,181 @@
+# Предсказание полёта брошенного шарика для game_1.py без пошаговой симуляции.
+# Шаг физики (скорость += g, y += скорость, x += скорость_x, скорость_x *= трение)
+# даёт замкнутые формулы для положения через n шагов, так что дуга между
+# ударами о стенки и дно считается сразу. Ломаную проверяем на касание
+# с лежащими шариками через сетку и держим в кэше, пока не сдвинется мышь
+# или шарики.
+import math
+
+from merge_fruit.broadphase import SpatialHash
+from merge_fruit.ccd import circle_toi, wall_toi
+
+# Сколько отрезков ломаной на одну дугу между ударами
+ARC_POINTS = 16
+# Больше ударов о дно не рисуем: шарик к этому времени давно лежит
+MAX_BOUNCES = 20
+# Ниже этой вертикальной скорости после удара шарик остаётся на дне
+REST_SPEED = 1
+
+
+class TrajectoryPredictor:
+    def __init__(self, gravity, bounce, friction, left, right, floor):
+        self.gravity = gravity
+        self.bounce = bounce
+        self.friction = friction
+        self.left = left
+        self.right = right
+        self.floor = floor
+        self.grid = None
+        self.radius = None
+        self.reach = None
+        self.key = None
+        self.world_key = None
+        self.points = []
+        self.end = None
+        self.hit = None
+
+    # Замкнутые формулы одного участка полёта
+
+    def position(self, x, y, speed_x, speed_y, n):
+        # Положение через n шагов без ударов (n может быть дробным)
+        g = self.gravity
+        f = self.friction
+        if f == 1:
+            dx = speed_x * n
+        else:
+            dx = speed_x * (1 - f ** n) / (1 - f)
+        return x + dx, y + speed_y * n + g * n * (n + 1) / 2
+
+    def floor_step(self, y, speed_y, radius):
+        # Первый целый шаг n >= 1, на котором шарик достаёт до дна
+        a = self.gravity / 2
+        b = speed_y + self.gravity / 2
+        c = y + radius - self.floor
+        root = (-b + math.sqrt(max(b * b - 4 * a * c, 0.0))) / (2 * a)
+        return max(1, math.ceil(root - 1e-9))
+
+    def wall_step(self, x, speed_x, radius):
+        # Первый шаг, на котором шарик заходит за стенку, или None
+        if speed_x < 0:
+            distance = x - radius - self.left
+        elif speed_x > 0:
+            distance = self.right - radius - x
+        else:
+            return None
+        if self.friction == 1:
+            return math.floor(distance / abs(speed_x)) + 1
+        rest = 1 - distance * (1 - self.friction) / abs(speed_x)
+        if rest <= 0:
+            # Трение остановит шарик раньше стенки
+            return None
+        return math.floor(math.log(rest) / math.log(self.friction)) + 1
+
+    def arcs(self, x, y, speed_x, radius):
+        # Участки полёта без ударов: (x, y, скорость_x, скорость_y, число шагов).
+        # Шаг с ударом считаем отдельно по правилам Ball.update, вместе
+        # с непрерывной проверкой стенок, поэтому конец дуги совпадает с игрой
+        speed_y = 0.0
+        for _ in range(MAX_BOUNCES):
+            steps = self.floor_step(y, speed_y, radius)
+            wall = self.wall_step(x, speed_x, radius)
+            if wall is not None and wall < steps:
+                steps = wall
+            steps -= 1
+            yield x, y, speed_x, speed_y, steps
+            x, y = self.position(x, y, speed_x, speed_y, steps)
+            speed_x *= self.friction ** steps
+            speed_y += self.gravity * steps
+            x, y, speed_x, speed_y, resting = self.impact(x, y, speed_x, speed_y, radius)
+            if resting:
+                break
+        yield x, y, speed_x, speed_y, 0
+
+    def impact(self, x, y, speed_x, speed_y, radius):
+        # Один шаг Ball.update у стенки или дна
+        speed_y += self.gravity
+        move_x = speed_x
+        move_y = speed_y
+        if abs(move_x) > radius or abs(move_y) > radius:
+            t = wall_toi(x, y, move_x, move_y, radius, self.left, self.right, self.floor)
+            move_x *= t
+            move_y *= t
+        x += move_x
+        y += move_y
+        speed_x *= self.friction
+        if x - radius < self.left:
+            x = self.left + radius
+            speed_x *= -self.bounce
+        elif x + radius > self.right:
+            x = self.right - radius
+            speed_x *= -self.bounce
+        if y + radius >= self.floor:
+            y = self.floor - radius
+            speed_y *= -self.bounce
+            speed_x *= self.friction
+            if abs(speed_y) < REST_SPEED:
+                return x, y, speed_x, 0.0, True
+        return x, y, speed_x, speed_y, False
+
+    # Ломаная и первое касание
+
+    def rebuild_grid(self, balls, radius):
+        reach = radius + max((ball.radius for ball in balls), default=radius)
+        self.grid = SpatialHash(2 * reach)
+        self.grid.rebuild(balls)
+        self.radius = radius
+        self.reach = reach
+
+    def polyline(self, x, y, speed_x, radius):
+        points = []
+        for x0, y0, sx, sy, steps in self.arcs(x, y, speed_x, radius):
+            if steps <= 0:
+                points.append((x0, y0))
+                continue
+            for i in range(ARC_POINTS + 1):
+                points.append(self.position(x0, y0, sx, sy, steps * i / ARC_POINTS))
+        return points
+
+    def cast(self, points, radius):
+        # Обрезаем ломаную на первом касании с шариком
+        grid = self.grid
+        # Сетка находит шарики не дальше клетки от середины отрезка,
+        # поэтому длинные отрезки режем на куски не длиннее reach
+        limit = self.reach
+        result = [points[0]]
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            pieces = max(1, math.ceil(math.hypot(x1 - x0, y1 - y0) / limit))
+            for i in range(pieces):
+                ax = x0 + (x1 - x0) * i / pieces
+                ay = y0 + (y1 - y0) * i / pieces
+                move_x = (x1 - x0) / pieces
+                move_y = (y1 - y0) / pieces
+                first = None
+                hit = None
+                for ball in grid.nearby(ax + move_x / 2, ay + move_y / 2):
+                    t = circle_toi(ax, ay, move_x, move_y, ball.x, ball.y,
+                                   radius + ball.radius, overlap=0.0)
+                    if t is not None and (first is None or t < first):
+                        first = t
+                        hit = ball
+                if hit is not None:
+                    result.append((ax + move_x * first, ay + move_y * first))
+                    return result, hit
+            result.append((x1, y1))
+        return result, None
+
+    def predict(self, x, y, speed_x, radius, balls):
+        # Ломаная полёта и шарик первого касания (None - до дна без касаний);
+        # пока ни бросок, ни шарики не сдвинулись на пиксель, возвращаем
+        # прошлый результат (катящиеся шарики замедляются бесконечно долго)
+        world_key = tuple((int(ball.x), int(ball.y), ball.radius)
+                          for ball in balls if ball.active)
+        key = (x, y, speed_x, radius)
+        if key == self.key and world_key == self.world_key:
+            return self.points, self.hit
+        if world_key != self.world_key or radius != self.radius:
+            self.rebuild_grid(balls, radius)
+        self.key = key
+        self.world_key = world_key
+        self.points, self.hit = self.cast(self.polyline(x, y, speed_x, radius), radius)
+        self.end = self.points[-1]
+        return self.points, self.hit
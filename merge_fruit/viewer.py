@@ -0,0 +1,47 @@
+# Окно зрителя: декодер потока merge_fruit.stream заполняет шарики, а рисует
+# их тот же Renderer на той же сцене (merge_fruit.scene), что и game_2.py,
+# только без кэша спрайтов - pygame.draw.circle.
+import asyncio
+
+import pygame
+
+from merge_fruit.fonts import load_font
+from merge_fruit.render import Renderer
+from merge_fruit.scene import HUD_RECTS, draw_basket
+from merge_fruit.spectator import read_message
+from merge_fruit.stream import StreamDecoder
+from merge_fruit.world import BASKET_WIDTH, HEIGHT
+
+
+def draw_hud(screen, decoder):
+    font = load_font(36, bold=True)
+    pygame.draw.circle(screen, decoder.ladder.colors[decoder.next_ball_idx], (BASKET_WIDTH - 50, 50), 30)
+    screen.blit(font.render(f"Score: {decoder.score}", True, (0, 0, 0)), (20, 20))
+    if decoder.countdown_left is not None and not decoder.game_over:
+        timer = int(decoder.countdown_left) + 1
+        screen.blit(font.render(str(timer), True, (255, 0, 0)), (BASKET_WIDTH//2 - 15, 100))
+
+
+async def view(host, port):
+    pygame.display.init()
+    screen = pygame.display.set_mode((BASKET_WIDTH, HEIGHT))
+    pygame.display.set_caption("Merge Fruit - spectator")
+    renderer = Renderer(screen, draw_basket)
+    decoder = StreamDecoder()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            data = await read_message(reader)
+            if data is None:
+                break
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+            if not decoder.apply(data):
+                continue
+            renderer.draw_balls(decoder.balls.values(), 1.0, HUD_RECTS)
+            draw_hud(screen, decoder)
+            renderer.present()
+    finally:
+        writer.close()
+        pygame.quit()
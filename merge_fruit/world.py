@@ -0,0 +1,555 @@
+# Безголовое ядро game_2.py: физика шариков, слияния, счёт и отсчёт до конца игры.
+# Ни дисплея, ни шрифтов: мир можно шагать сколько угодно быстро.
+import copy
+import math
+import random
+from operator import attrgetter
+
+from merge_fruit.broadphase import SpatialHash
+from merge_fruit.ladder import SizeLadder
+from merge_fruit.merges import MergeStage
+from merge_fruit.pool import BallPool
+from merge_fruit.solver import CONTACT_MARGIN, SOLVER_ITERATIONS, ContactSolver
+
+# Константы
+BASKET_WIDTH = 600
+HEIGHT = 800
+FPS = 60
+GRAVITY = 0.9
+BOUNCE_FACTOR = 0.5
+FRICTION = 0.98
+BASKET_HEIGHT = 400
+BALL_SIZES = [20, 30, 40, 50, 60, 70, 80, 90, 100, 110]
+COLORS = [
+    (255,0,0), (0,255,0), (0,0,255), (255,255,0), (255,0,255),
+    (0,255,255), (128,0,128), (255,165,0), (75,0,130), (139,69,19)
+]
+
+# Корзина
+BASKET_TOP = HEIGHT - BASKET_HEIGHT - 20
+BASKET_LEFT = 0
+BASKET_RIGHT = BASKET_WIDTH
+BASKET_BOTTOM = BASKET_TOP + BASKET_HEIGHT
+UPPER_LIMIT = BASKET_TOP +10  # Верхняя граница
+
+
+# Сколько секунд шарик может торчать над границей до конца игры
+COUNTDOWN_SECONDS = 3.0
+
+# Сон: островок касающихся шариков засыпает, если все его шарики
+# SLEEP_FRAMES шагов подряд не уходили дальше SLEEP_DRIFT пикселей от точки,
+# где начали стоять (дрожание на месте не мешает уснуть)
+SLEEP_DRIFT = 3
+SLEEP_FRAMES = 30
+# Более медленное касание не будит спящих, они служат неподвижной опорой
+WAKE_SPEED = 2
+# Зазор, при котором спящие шарики считаются касающимися
+CONTACT_SLOP = 2
+
+# Радиусы и цвета шариков со стандартной лестницей размеров
+LADDER = SizeLadder(BALL_SIZES, COLORS)
+
+# Порядок шариков в списках бодрствующих и спящих: по номеру, как в самом
+# списке шариков. От порядка зависят обход шага, пары решателя и ячейки
+# сетки, и мир из снимка должен собрать их так же, как живой
+BALL_ORDER = attrgetter('id')
+
+
+class Ball:
+    # Поля без __dict__ (python -m merge_fruit.benchmarks.balls). radius и color
+    # - ссылки на общие значения лестницы размеров, своих объектов у шарика
+    # нет. Признаки - отдельные поля, а не биты одного числа: update() читает
+    # on_ground и added_to_score на каждом шаге, active и sleeping - в каждой
+    # паре кандидатов, а биты в файле снимка собирает merge_fruit.savestate
+    __slots__ = ('size_idx', 'radius', 'color', 'x', 'y', 'prev_x', 'prev_y',
+                 'speed_x', 'speed_y', 'active', 'sleeping', 'on_ground',
+                 'added_to_score', 'still_frames', 'anchor_x', 'anchor_y', 'id')
+
+    def __init__(self, x, size_idx, ladder=LADDER):
+        self.size_idx = size_idx
+        self.radius = ladder.radius[size_idx]
+        self.color = ladder.colors[size_idx]
+        self.x = x
+        self.y = -self.radius
+        self.prev_x = self.x
+        self.prev_y = self.y
+        self.speed_y = 0
+        self.speed_x = 0
+        self.active = True
+        self.sleeping = False
+        self.on_ground = False
+        self.added_to_score = False
+        self.still_frames = 0
+        self.anchor_x = self.x
+        self.anchor_y = self.y
+        # Номер шарика в партии, его выдаёт World.drop
+        self.id = 0
+
+    def grow(self, ladder):
+        # Следующий размер после слияния
+        self.size_idx = ladder.merge_into[self.size_idx]
+        self.radius = ladder.radius[self.size_idx]
+        self.color = ladder.colors[self.size_idx]
+
+    def update(self, world, k=1.0):
+        # k - доля кадра FPS, которую занимает шаг (1.0 при dt = 1/FPS)
+        if not self.active:
+            return
+        ladder = world.ladder
+        bounce = world.bounce_factor
+        self.prev_x = self.x
+        self.prev_y = self.y
+
+        # Физика движения
+        if not self.on_ground:
+            self.speed_y += GRAVITY * k
+            self.y += self.speed_y * k
+
+        self.x += self.speed_x * k
+        self.speed_x *= FRICTION ** k
+
+        # Коллизии с границами
+        if self.x - self.radius < 0:
+            self.x = self.radius
+            self.speed_x *= -bounce
+        elif self.x + self.radius > BASKET_WIDTH:
+            self.x = BASKET_WIDTH - self.radius
+            self.speed_x *= -bounce
+
+        # Проверка верхней границы
+        if self.y - self.radius < UPPER_LIMIT and not world.countdown_active:
+            world.countdown_active = True
+            world.countdown_start = world.time
+
+        # Коллизия с дном корзины
+        if (BASKET_LEFT <= self.x <= BASKET_RIGHT
+            and self.y + self.radius > BASKET_BOTTOM):
+            self.y = BASKET_BOTTOM - self.radius
+            self.speed_y *= -bounce
+            self.speed_x *= FRICTION ** k
+
+            if abs(self.speed_y) < 1:
+                self.speed_y = 0
+        if not self.added_to_score:
+            world.score += ladder.score[self.size_idx]
+            self.added_to_score = True
+
+        # Коллизии со стенками корзины
+        if (self.x - self.radius < BASKET_LEFT
+            and BASKET_TOP <= self.y <= BASKET_BOTTOM):
+            self.x = BASKET_LEFT + self.radius
+            self.speed_x *= -bounce
+        elif (self.x + self.radius > BASKET_RIGHT
+            and BASKET_TOP <= self.y <= BASKET_BOTTOM):
+            self.x = BASKET_RIGHT - self.radius
+            self.speed_x *= -bounce
+
+        # Столкновения шариков (только соседние ячейки)
+        grid = world.grid
+        grid.update(self)
+        candidates = grid.nearby(self.x, self.y)
+        world.pairs_tested += len(candidates) - 1
+        # Строки таблиц для своего размера: дальше только индекс размера соседа
+        size_idx = self.size_idx
+        reach_sq = ladder.reach_sq[size_idx]
+        can_merge = ladder.can_merge[size_idx]
+        for other in candidates:
+            if other is not self and other.active:
+                dx = other.x - self.x
+                dy = other.y - self.y
+
+                if dx * dx + dy * dy < reach_sq[other.size_idx]:
+                    if other.size_idx == size_idx and can_merge:
+                        # Слияние разберёт MergeStage, когда обновятся все шарики
+                        world.merge_stage.add(self, other)
+                        continue
+                    # Удар будит спящий островок
+                    if other.sleeping and abs(self.speed_x) + abs(self.speed_y) > WAKE_SPEED:
+                        world.wake(other)
+                    if world.solver is not None:
+                        # Касание разрешит решатель, когда обновятся все шарики
+                        continue
+                    # Старая схема: здесь уже нужен сам корень
+                    distance = math.sqrt(dx * dx + dy * dy)
+                    reach = ladder.reach[size_idx][other.size_idx]
+                    if other.sleeping:
+                        # Спящий шарик - неподвижная опора: выталкиваем только себя
+                        world.contacts.append((self, other))
+                        nx = dx / distance
+                        ny = dy / distance
+                        overlap = reach - distance
+                        self.x -= overlap * nx
+                        self.y -= overlap * ny
+                        approach = self.speed_x * nx + self.speed_y * ny
+                        if approach > 0:
+                            self.speed_x -= (1 + bounce) * approach * nx
+                            self.speed_y -= (1 + bounce) * approach * ny
+                    else:
+                        world.contacts.append((self, other))
+                        nx = dx / distance
+                        ny = dy / distance
+                        # Обмен импульсом пропорционально радиусам: доли из таблицы
+                        p = 2 * (self.speed_x * nx + self.speed_y * ny - other.speed_x * nx - other.speed_y * ny)
+                        take = p * ladder.share[size_idx][other.size_idx]
+                        give = p - take
+
+                        self.speed_x = (self.speed_x - take * nx) * bounce * FRICTION
+                        self.speed_y = (self.speed_y - take * ny) * bounce * GRAVITY
+                        other.speed_x = (other.speed_x + give * nx) * bounce * FRICTION
+                        other.speed_y = (other.speed_y + give * ny) * bounce * GRAVITY
+
+                        # Корректировка позиций
+                        overlap = reach - distance
+                        self.x -= overlap * nx * FRICTION
+                        self.y -= overlap * ny * GRAVITY
+                        other.x += overlap * nx * FRICTION
+                        other.y += overlap * ny * GRAVITY
+
+
+class World:
+    def __init__(self, seed=None, backend="objects", ball_sizes=BALL_SIZES,
+                 bounce_factor=BOUNCE_FACTOR, spawn_weights=None,
+                 solver_iterations=SOLVER_ITERATIONS, grid=None):
+        # backend="numpy" подменяет объекты Ball хранилищем массивов BallStore;
+        # ball_sizes, bounce_factor и веса выбора следующего шарика spawn_weights
+        # можно менять для подбора баланса. solver_iterations=0 возвращает
+        # старое попарное отталкивание внутри Ball.update (у numpy свой расчёт).
+        # Сетка нужна только внутри step(), так что миры, которые шагают
+        # по очереди, могут делить одну (grid)
+        self.backend = backend
+        self.ball_sizes = list(ball_sizes)
+        self.bounce_factor = bounce_factor
+        self.spawn_weights = spawn_weights
+        self.ladder = SizeLadder(self.ball_sizes, COLORS, (CONTACT_SLOP, CONTACT_MARGIN))
+        self.grid = grid if grid is not None else SpatialHash(2 * max(self.ball_sizes))
+        self.pool = BallPool(Ball)
+        # Номера шариков не сбрасываются с партией: зритель не спутает
+        # шарик новой партии со старым
+        self.next_id = 0
+        # Подписчики на слияния переживают reset()
+        self.merge_stage = MergeStage()
+        self.solver = None
+        if solver_iterations and backend != "numpy":
+            self.solver = ContactSolver(BASKET_LEFT, BASKET_RIGHT, BASKET_BOTTOM,
+                                        GRAVITY, solver_iterations)
+        self.reset(seed)
+
+    def reset(self, seed=None):
+        self.seed = seed
+        self.random = random.Random(seed)
+        self.score = 0
+        self.game_over = False
+        self.countdown_active = False
+        self.countdown_start = 0.0
+        self.time = 0.0
+        self.frame = 0
+        # Счётчики для профилировщика: проверенные пары и слияния за всё время
+        self.pairs_tested = 0
+        self.merges = 0
+        # Пары касающихся бодрствующих шариков за текущий шаг
+        self.contacts = []
+        self.forget_sleep()
+        if self.solver is not None:
+            self.solver.clear()
+            self.solver.clear_stats()
+        if self.backend == "numpy":
+            from merge_fruit.soa import BallStore
+            self.store = BallStore(self.ball_sizes)
+            self.balls = self.store
+        else:
+            self.store = None
+            self.pool.clear()
+            self.balls = self.pool.balls
+        self.next_ball_idx = self.roll_next()
+
+    def roll_next(self):
+        if self.spawn_weights:
+            return self.random.choices(range(len(self.spawn_weights)), self.spawn_weights)[0]
+        return self.random.randint(0, len(self.ball_sizes)-2)
+
+    def drop(self, x, size_idx=None):
+        # Без size_idx бросаем "следующий" шарик и выбираем новый
+        if self.game_over:
+            return None
+        if size_idx is None:
+            size_idx = self.next_ball_idx
+            self.next_ball_idx = self.roll_next()
+        if self.store is not None:
+            ball = self.store.add(x, size_idx)
+        else:
+            ball = self.pool.spawn(x, size_idx, self.ladder)
+            if self.awake is not None:
+                self.awake.append(ball)
+        ball.id = self.new_id()
+        return ball
+
+    def place_many(self, rows):
+        # Стрессовая сцена: шарики rows (x, y, размер) сразу на своих местах,
+        # без бросков и без выбора следующего шарика
+        if self.store is not None:
+            balls = []
+            for x, y, size_idx in rows:
+                ball = self.store.add(x, size_idx)
+                ball.y = y
+                ball.id = self.new_id()
+                balls.append(ball)
+            return balls
+        ladder = self.ladder
+        balls = self.pool.spawn_many([(x, size_idx, ladder) for x, _, size_idx in rows])
+        for ball, (_, y, _) in zip(balls, rows):
+            ball.y = ball.prev_y = ball.anchor_y = y
+            ball.id = self.new_id()
+        if self.awake is not None:
+            self.awake.extend(balls)
+        return balls
+
+    def new_id(self):
+        self.next_id += 1
+        return self.next_id
+
+    def step(self, dt=1.0 / FPS):
+        if self.game_over:
+            return
+        k = dt * FPS
+
+        if self.store is not None:
+            self.store.step(self, k)
+        else:
+            if self.awake is None:
+                self.index_sleep()
+            elif self.woken:
+                # Разбуженные дописаны в конец, возвращаем их на место
+                self.awake.sort(key=BALL_ORDER)
+                self.woken = False
+            # Спящие шарики не двигаются: в сетку их ячейки попадают готовыми
+            self.grid.rebuild(self.awake, self.resting)
+            self.contacts.clear()
+            # Разбуженные по ходу шага дописываются в конец списка и начинают
+            # двигаться со следующего шага
+            awake = self.awake
+            for i in range(len(awake)):
+                awake[i].update(self, k)
+            self.merge_stage.resolve(self)
+            # Слитые шарики выбрасываем один раз за кадр
+            self.pool.compact()
+            if self.solver is not None:
+                self.solver.solve(self, k)
+            self.settle()
+
+        # Проверка высоты шариков
+        if self.top() > UPPER_LIMIT:
+            self.countdown_active = False
+
+        self.time += dt
+        self.frame += 1
+        if self.countdown_active and self.time - self.countdown_start >= COUNTDOWN_SECONDS:
+            self.game_over = True
+
+    def on_merge(self, callback):
+        # callback(MergeEvent) на каждое слияние, у обоих хранилищ
+        return self.merge_stage.subscribe(callback)
+
+    # Сон и пробуждение островков
+
+    def forget_sleep(self):
+        # Списки бодрствующих и спящих пересоберутся на следующем шаге; нужно
+        # после любой замены шариков в обход drop/place_many (restore, загрузка)
+        self.awake = None
+        self.resting = {}
+        self.woken = False
+
+    def index_sleep(self):
+        # Бодрствующие шарики по порядку и ячейки сетки со спящими: шаг и
+        # settle() проходят только первых, спящие в сетку копируются ячейками
+        self.awake = []
+        self.resting = {}
+        self.woken = False
+        key = self.grid.key
+        for ball in self.balls:
+            if not ball.active:
+                continue
+            if ball.sleeping:
+                self.resting.setdefault(key(ball.x, ball.y), []).append(ball)
+            else:
+                self.awake.append(ball)
+
+    def wake(self, ball):
+        # Будим весь островок спящих шариков, касающихся друг друга
+        stack = [ball]
+        while stack:
+            ball = stack.pop()
+            if not ball.sleeping:
+                continue
+            ball.sleeping = False
+            ball.still_frames = 0
+            if self.awake is not None:
+                self.resting[self.grid.key(ball.x, ball.y)].remove(ball)
+                self.awake.append(ball)
+                self.woken = True
+                self.grid.track(ball)
+            touch_sq = self.ladder.reach_sq_with(CONTACT_SLOP)[ball.size_idx]
+            for other in self.grid.nearby(ball.x, ball.y):
+                if other.sleeping and other.active:
+                    dx = other.x - ball.x
+                    dy = other.y - ball.y
+                    if dx * dx + dy * dy < touch_sq[other.size_idx]:
+                        stack.append(other)
+
+    def wake_near(self, x, y, radius):
+        for other in self.grid.nearby(x, y):
+            if other.sleeping and other.active:
+                dx = other.x - x
+                dy = other.y - y
+                reach = radius + other.radius + CONTACT_SLOP
+                if dx * dx + dy * dy < reach * reach:
+                    self.wake(other)
+
+    def settle(self):
+        # Считаем неподвижные шаги и усыпляем островки, где все шарики замерли.
+        # Спящих не трогаем вовсе, слитые выпадают из списка бодрствующих
+        awake = [ball for ball in self.awake if ball.active]
+        self.awake = awake
+        ready = False
+        for ball in awake:
+            if abs(ball.x - ball.anchor_x) + abs(ball.y - ball.anchor_y) < SLEEP_DRIFT:
+                ball.still_frames += 1
+                if ball.still_frames >= SLEEP_FRAMES:
+                    ready = True
+            else:
+                ball.still_frames = 0
+                ball.anchor_x = ball.x
+                ball.anchor_y = ball.y
+        # Пока никто не простоял достаточно, островки можно не собирать
+        if not ready:
+            return
+
+        parent = {}
+
+        def find(ball):
+            root = ball
+            while parent.get(root, root) is not root:
+                root = parent[root]
+            # Сжатие путей
+            while ball is not root:
+                parent[ball], ball = root, parent[ball]
+            return root
+
+        for a, b in self.contacts:
+            if a.active and b.active:
+                root_a = find(a)
+                root_b = find(b)
+                if root_a is not root_b:
+                    parent[root_a] = root_b
+
+        restless = set()
+        for ball in awake:
+            if ball.still_frames < SLEEP_FRAMES:
+                restless.add(find(ball))
+
+        still_awake = []
+        resting = self.resting
+        key = self.grid.key
+        for ball in awake:
+            if find(ball) in restless:
+                still_awake.append(ball)
+                continue
+            ball.sleeping = True
+            ball.speed_x = 0
+            ball.speed_y = 0
+            ball.prev_x = ball.x
+            ball.prev_y = ball.y
+            cell = resting.setdefault(key(ball.x, ball.y), [])
+            cell.append(ball)
+            if len(cell) > 1 and cell[-2].id > ball.id:
+                cell.sort(key=BALL_ORDER)
+        self.awake = still_awake
+
+    # Снимки состояния (перемотка повторов и т.п.)
+
+    def snapshot(self):
+        state = {
+            'seed': self.seed,
+            'random': self.random.getstate(),
+            'score': self.score,
+            'game_over': self.game_over,
+            'countdown_active': self.countdown_active,
+            'countdown_start': self.countdown_start,
+            'time': self.time,
+            'frame': self.frame,
+            'next_ball_idx': self.next_ball_idx,
+            'next_id': self.next_id,
+        }
+        if self.store is not None:
+            state['store'] = self.store.snapshot()
+        else:
+            state['balls'] = [copy.copy(ball) for ball in self.balls]
+        if self.solver is not None:
+            state['impulses'] = self.solver.snapshot(self.balls)
+        return state
+
+    def restore(self, state):
+        # Снимок не меняется, его можно восстанавливать много раз
+        self.seed = state['seed']
+        self.random.setstate(state['random'])
+        self.score = state['score']
+        self.game_over = state['game_over']
+        self.countdown_active = state['countdown_active']
+        self.countdown_start = state['countdown_start']
+        self.time = state['time']
+        self.frame = state['frame']
+        self.next_ball_idx = state['next_ball_idx']
+        self.next_id = state['next_id']
+        self.contacts.clear()
+        self.forget_sleep()
+        if self.store is not None:
+            self.store.restore(state['store'])
+        else:
+            self.pool.balls[:] = [copy.copy(ball) for ball in state['balls']]
+        if self.solver is not None:
+            self.solver.restore(self.balls, state.get('impulses', ()))
+
+    def params(self):
+        # Настройки конструктора: из них строятся копии мира и миры процессов поиска
+        return {
+            'backend': self.backend,
+            'ball_sizes': list(self.ball_sizes),
+            'bounce_factor': self.bounce_factor,
+            'spawn_weights': self.spawn_weights,
+            'solver_iterations': self.solver.iterations if self.solver is not None else 0,
+        }
+
+    def clone(self):
+        # Независимая копия мира в том же состоянии; подписчики на слияния
+        # и сетка не копируются
+        world = World(**self.params())
+        world.restore(self.snapshot())
+        return world
+
+    def solver_stats(self):
+        # Сходимость решателя на последнем шаге, None при старой схеме
+        if self.solver is None:
+            return None
+        return self.solver.stats()
+
+    def sleeping_count(self):
+        return sum(1 for ball in self.balls if ball.active and ball.sleeping)
+
+    # Запросы состояния
+
+    def active_balls(self):
+        return [ball for ball in self.balls if ball.active]
+
+    def countdown_left(self):
+        # Сколько секунд осталось до конца игры, None если отсчёта нет
+        if not self.countdown_active or self.game_over:
+            return None
+        return max(0.0, COUNTDOWN_SECONDS - (self.time - self.countdown_start))
+
+    def max_size_idx(self):
+        return max((ball.size_idx for ball in self.balls if ball.active), default=-1)
+
+    def top(self):
+        # Самая высокая точка среди шариков (меньше - выше)
+        if self.store is not None:
+            return self.store.top()
+        return min((ball.y - ball.radius for ball in self.balls if ball.active), default=BASKET_BOTTOM)